@@ -0,0 +1,85 @@
+"""Compare per-image CPU latency of a .pt detection model with its ONNX Runtime / OpenVINO exports.
+
+Run from the app directory:
+    python -m ComputerVision.benchmark_backends --model ComputerVision/CVModels/rf3v1.pt --export onnx openvino
+--export writes the exports next to the .pt first (needs the onnx / openvino packages); otherwise pass
+existing exports with --exported. Every model runs on each ComputerVision/temp sample in turn, and each
+export's detections are checked against the .pt model's.
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from ComputerVision import objectDetection
+
+
+def load_images():
+    paths = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "*.jpg")))
+    return [cv2.imread(path) for path in paths]
+
+
+def export(model_path, formats):
+    from ultralytics import YOLO
+    return [YOLO(model_path).export(format=fmt, dynamic=fmt == "onnx") for fmt in formats]
+
+
+def time_model(model_path, images, repeats):
+    model = objectDetection.load_model(model_path)
+    objectDetection.run_model_batch(model, images[:1])  # warm up outside the timings
+    latencies = []
+    detections = []
+    for _ in range(repeats):
+        for image in images:
+            start = time.perf_counter()
+            result = objectDetection.run_model_batch(model, [image])[0]
+            latencies.append(time.perf_counter() - start)
+            detections.append(result)
+    return latencies, detections[:len(images)]
+
+
+def box_iou(a, b):
+    w = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = w * h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def agreement(reference, detections):
+    """Fraction of reference detections matched by a same-class detection with IoU >= 0.5."""
+    total = matched = 0
+    for expected, found in zip(reference, detections):
+        for ref in expected:
+            total += 1
+            matched += any(d["class"] == ref["class"] and box_iou(d["bbox"], ref["bbox"]) >= 0.5 for d in found)
+    return matched / total if total else 1.0
+
+
+def describe(name, latencies, detections):
+    p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+    count = np.mean([len(d) for d in detections])
+    return (f"{name:<32} p50 {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms"
+            f"  {count:5.1f} detections/image")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(objectDetection.MODEL_DIR, objectDetection.DEFAULT_MODEL))
+    parser.add_argument("--exported", nargs="*", default=[], help=".onnx files or *_openvino_model directories")
+    parser.add_argument("--export", nargs="*", default=[], choices=["onnx", "openvino"])
+    parser.add_argument("--repeats", type=int, default=5, help="passes over the sample images")
+    args = parser.parse_args()
+
+    images = load_images()
+    exported = args.exported + export(args.model, args.export)
+    latencies, reference = time_model(args.model, images, args.repeats)
+    print(describe(os.path.basename(args.model), latencies, reference))
+    for path in exported:
+        latencies, detections = time_model(path, images, args.repeats)
+        print(describe(os.path.basename(path.rstrip("/\\")), latencies, detections)
+              + f"  agreement {agreement(reference, detections):.0%}")
@@ -0,0 +1,93 @@
+"""Benchmark batched detection through InferenceService against one-image-at-a-time model calls.
+
+Run from the app directory:
+    python -m ComputerVision.benchmark_inference --drones 4 --frames 8
+Each simulated drone submits camera frames (the ComputerVision/temp samples resized to one frame size)
+from its own thread, as the detection pipeline does, and the aggregate frames/s is compared with
+calling the model on each frame in turn. Batching only pays off where one batched forward pass is
+cheaper than the same frames one by one, so measure on the deployment machine with its model, e.g.
+    python -m ComputerVision.benchmark_inference --drones 4 --frames 16
+and check a lone drone against the pipeline's batch size for the latency it adds:
+    python -m ComputerVision.benchmark_inference --drones 1 --frames 16 --max-batch-size 4
+"""
+import argparse
+import glob
+import os
+import statistics
+import threading
+import time
+from functools import partial
+
+import cv2
+
+from ComputerVision import objectDetection
+from ComputerVision.inference_service import InferenceService
+
+
+def load_frames(width, height):
+    paths = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "*.jpg")))
+    return [cv2.resize(cv2.imread(path), (width, height)) for path in paths]
+
+
+def run_sequential(run_batch, frames, total):
+    latencies = []
+    start = time.perf_counter()
+    for k in range(total):
+        frame_start = time.perf_counter()
+        run_batch([frames[k % len(frames)]])
+        latencies.append(time.perf_counter() - frame_start)
+    return time.perf_counter() - start, latencies
+
+
+def run_service(run_batch, frames, drones, frames_per_drone, max_batch_size, max_latency):
+    service = InferenceService(run_batch, max_batch_size=max_batch_size, max_latency=max_latency).start()
+    latencies = []
+    lock = threading.Lock()
+
+    def drone(drone_id):
+        # each drone waits for its detections before sending the next frame, like a pipeline worker
+        for k in range(frames_per_drone):
+            frame_start = time.perf_counter()
+            service.detect(frames[(drone_id + k) % len(frames)])
+            with lock:
+                latencies.append(time.perf_counter() - frame_start)
+
+    threads = [threading.Thread(target=drone, args=(i,)) for i in range(drones)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stats = service.get_stats()
+    service.stop()
+    return elapsed, latencies, stats
+
+
+def describe(name, elapsed, latencies):
+    p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+    return (f"{name:<10} {len(latencies) / elapsed:7.2f} frames/s  latency p50 {statistics.median(latencies) * 1000:7.1f} ms"
+            f"  p95 {p95 * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(objectDetection.MODEL_DIR, objectDetection.DEFAULT_MODEL))
+    parser.add_argument("--drones", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=8, help="frames per drone")
+    parser.add_argument("--frame-size", type=int, nargs=2, default=[1280, 720], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--max-batch-size", type=int, help="defaults to --drones, so batches close as soon as every drone has sent a frame")
+    parser.add_argument("--max-latency", type=float, default=0.05, help="seconds")
+    args = parser.parse_args()
+
+    run_batch = partial(objectDetection.run_model_batch, objectDetection.load_model(args.model))
+    frames = load_frames(*args.frame_size)
+    max_batch_size = args.max_batch_size or args.drones
+    # warm up the model for both batch shapes outside the timings
+    run_batch(frames[:1])
+    run_batch([frames[k % len(frames)] for k in range(max_batch_size)])
+
+    total = args.drones * args.frames
+    print(describe("sequential", *run_sequential(run_batch, frames, total)))
+    elapsed, latencies, stats = run_service(run_batch, frames, args.drones, args.frames, max_batch_size, args.max_latency)
+    print(describe("batched", elapsed, latencies) + f"  mean batch {stats['mean_batch_size']:.1f}")
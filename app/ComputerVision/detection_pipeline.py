@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+# What a drone saw and where it was when the image was taken; later stages only use this snapshot
+DetectionCapture = namedtuple("DetectionCapture", ["drone_id", "image_path", "latitude", "longitude", "altitude", "heading", "captured_at", "vision_model"])
+
+
+class DetectionPipeline:
+    """
+    Image detection off the telemetry thread: capture -> detect -> geolocate -> merge -> describe.
+
+    submit() only queues a capture and returns, and when the bounded queue is full the capture is
+    dropped rather than making the caller wait. A long-lived pool of workers runs detection and
+    geolocation. Merging into the POI list is serialized. Descriptions run on their own worker, only
+    for captures the merge stage hands back, so a slow LLM never holds up detection.
+
+    Stages are plain callables:
+      detect(capture) -> (image, detections)
+      locate(capture, detections) -> (lat, lon)
+      merge(capture, position, image, detections) -> target to describe, or None
+      describe(capture, target)
+    """
+
+    def __init__(self, detect, locate, merge, describe=None, workers=2, queue_size=8):
+        self.detect = detect
+        self.locate = locate
+        self.merge = merge
+        self.describe = describe
+        self.workers = workers
+        self.captures = queue.Queue(maxsize=queue_size)
+        self.merge_lock = threading.Lock()
+        self.threads = []
+        self.describer = None
+        self.running = False
+
+        # counters
+        self.stats_lock = threading.Lock()
+        self.stats = {"submitted": 0, "dropped": 0, "processed": 0, "detected": 0, "described": 0, "errors": 0, "detect_time": 0.0}
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.describer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poi-describe")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"detection-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, wait=True):
+        if not self.running:
+            return
+        self.running = False
+        for _ in self.threads:
+            self.captures.put(None)
+        if wait:
+            for thread in self.threads:
+                thread.join()
+        self.threads = []
+        self.describer.shutdown(wait=wait)
+
+    def submit(self, capture):
+        """Queue a capture for detection. Never blocks; returns False if it was dropped."""
+        self._count("submitted")
+        if not self.running:
+            self._count("dropped")
+            return False
+        try:
+            self.captures.put_nowait(capture)
+            return True
+        except queue.Full:
+            print(f"Detection queue full, dropping image from drone {capture.drone_id}")
+            self._count("dropped")
+            return False
+
+    def _work(self):
+        while True:
+            capture = self.captures.get()
+            if capture is None:
+                return
+            try:
+                self._process(capture)
+            except Exception as e:
+                print(f"Image detection failed for drone {capture.drone_id}: {e}")
+                self._count("errors")
+
+    def _process(self, capture):
+        start = time.perf_counter()
+        image, detections = self.detect(capture)
+        self._count("detect_time", time.perf_counter() - start)
+        self._count("processed")
+        if not detections:
+            print("No objects detected in the image.")
+            return
+        self._count("detected")
+
+        position = self.locate(capture, detections)
+        with self.merge_lock:
+            target = self.merge(capture, position, image, detections)
+        if target is not None:
+            self.describe_later(capture, target)
+
+    def describe_later(self, capture, target):
+        """Queue target for the describe stage, e.g. a POI merge() could only create asynchronously."""
+        if self.describe is not None and self.running:
+            self.describer.submit(self._describe, capture, target)
+
+    def _describe(self, capture, target):
+        try:
+            self.describe(capture, target)
+            self._count("described")
+        except Exception as e:
+            print(f"Describing image from drone {capture.drone_id} failed: {e}")
+            self._count("errors")
+
+    def _count(self, name, amount=1):
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def get_stats(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats["queued"] = self.captures.qsize()
+        return stats
@@ -0,0 +1,217 @@
+"""
+CPU inference for exported YOLO detection models, without PyTorch.
+
+Export once, either with the repository's YOLOv5 exporter (from the repository root)
+    python export.py --weights app/ComputerVision/CVModels/rf3v1.pt --include onnx openvino --dynamic
+or with the Ultralytics exporter (from the app directory)
+    yolo export model=ComputerVision/CVModels/rf3v1.pt format=onnx dynamic=True
+and point a drone's visionModel at rf3v1.onnx or rf3v1_openvino_model. Both output layouts are
+decoded: YOLOv5's (n, anchors, 5 + classes) with an objectness column and YOLOv8's (n, 4 + classes,
+anchors). Letterboxing, box decoding and NMS are done here in NumPy so both runtimes give the same
+detections as the .pt path.
+"""
+import ast
+import os
+
+import cv2
+import numpy as np
+import yaml
+
+try:
+    import onnxruntime
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+
+try:
+    import openvino
+    HAS_OPENVINO = True
+except ImportError:
+    HAS_OPENVINO = False
+
+# same defaults as Ultralytics predict
+CONFIDENCE_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+MAX_WH = 7680  # class offset so one NMS pass never suppresses across classes
+PAD_VALUE = 114
+
+
+def is_exported_model(path):
+    return path.endswith(".onnx") or path.endswith(".xml") or path.rstrip("/\\").endswith("_openvino_model")
+
+
+def letterbox(images, size):
+    """
+    Resize each image to fit size (height, width) keeping its aspect ratio, pad the rest with grey
+    and stack them into one NCHW float32 batch in [0, 1].
+
+    Returns (batch, gains, pads) where gains[i] is image i's scale and pads[i] its (left, top) offset.
+    """
+    height, width = size
+    shapes = np.array([image.shape[:2] for image in images], dtype=np.float64)  # (n, 2) as (h, w)
+    gains = np.minimum(height / shapes[:, 0], width / shapes[:, 1])
+    new_sizes = np.round(shapes * gains[:, None]).astype(int)
+    pads = np.round(np.stack([(width - new_sizes[:, 1]) / 2, (height - new_sizes[:, 0]) / 2], axis=1) - 0.1).astype(int)
+
+    batch = np.full((len(images), height, width, 3), PAD_VALUE, dtype=np.uint8)
+    for i, image in enumerate(images):
+        h, w = new_sizes[i]
+        left, top = pads[i]
+        if (h, w) != image.shape[:2]:
+            image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+        batch[i, top:top + h, left:left + w] = image
+    # BGR HWC uint8 -> RGB CHW float
+    batch = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+    batch /= 255.0
+    return batch, gains, pads
+
+
+def non_max_suppression(boxes, scores, iou_threshold=IOU_THRESHOLD):
+    """Indices of the boxes (n, 4 xyxy) kept by greedy NMS, highest score first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-7)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+def normalize_names(names):
+    """Class names as {id: label}; YOLOv5 exports may store them as a list."""
+    if isinstance(names, (list, tuple)):
+        return dict(enumerate(names))
+    return {int(k): v for k, v in (names or {}).items()}
+
+
+def output_layout(shape, num_classes=None):
+    """
+    "yolov5" for (n, anchors, 5 + classes) output, "yolov8" for (n, 4 + classes, anchors).
+
+    With num_classes known the shape must match one of them exactly, otherwise a ValueError is
+    raised rather than decoding garbage. Without it the class axis is the shorter one.
+    """
+    if len(shape) != 3:
+        raise ValueError(f"Expected detection output of shape (batch, a, b), got {tuple(shape)}")
+    _, rows, columns = shape
+    if num_classes:
+        if rows == 4 + num_classes:
+            return "yolov8"
+        if columns == 5 + num_classes:
+            return "yolov5"
+        raise ValueError(f"Detection output {tuple(shape)} matches neither (n, {4 + num_classes}, anchors) nor "
+                         f"(n, anchors, {5 + num_classes}) for the model's {num_classes} classes")
+    return "yolov8" if rows < columns else "yolov5"
+
+
+def decode(output, gains, pads, image_shapes, conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD, max_det=MAX_DETECTIONS,
+           num_classes=None):
+    """
+    Turn raw YOLOv5 or YOLOv8 output (see output_layout) into (boxes, scores, class_ids) per image,
+    with boxes as xyxy in the original image's pixels.
+    """
+    layout = output_layout(output.shape, num_classes)
+    results = []
+    for i, prediction in enumerate(output):
+        if layout == "yolov8":
+            prediction = prediction.T  # (anchors, 4 + classes)
+            class_scores = prediction[:, 4:]
+        else:
+            class_scores = prediction[:, 5:] * prediction[:, 4:5]  # class probability times objectness
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        mask = scores > conf
+        xywh, scores, class_ids = prediction[mask, :4], scores[mask], class_ids[mask]
+
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+        keep = non_max_suppression(boxes + class_ids[:, None] * MAX_WH, scores, iou)[:max_det]
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+        # undo the letterbox
+        boxes[:, [0, 2]] -= pads[i, 0]
+        boxes[:, [1, 3]] -= pads[i, 1]
+        boxes /= gains[i]
+        height, width = image_shapes[i]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+        results.append((boxes, scores, class_ids))
+    return results
+
+
+class ExportedModel:
+    """
+    A detection model exported to ONNX or OpenVINO, run on CPU.
+
+    Called like an Ultralytics model with a list of BGR images, it returns (boxes, scores, class_ids)
+    arrays per image. names maps class ids to labels, as on the YOLO model.
+    """
+
+    def __init__(self, path, conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD):
+        self.path = path
+        self.conf = conf
+        self.iou = iou
+        if path.endswith(".onnx"):
+            self._load_onnx(path)
+        else:
+            self._load_openvino(path)
+
+    def _load_onnx(self, path):
+        if not HAS_ONNXRUNTIME:
+            raise RuntimeError("onnxruntime is required to run .onnx models")
+        self.runtime = "onnxruntime"
+        self.session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = normalize_names(ast.literal_eval(metadata.get("names", "{}")))
+        self._set_shape(model_input.shape, ast.literal_eval(metadata.get("imgsz", "[640, 640]")))
+        self.size = os.path.getsize(path)
+
+    def _load_openvino(self, path):
+        if not HAS_OPENVINO:
+            raise RuntimeError("openvino is required to run OpenVINO models")
+        xml = path if path.endswith(".xml") else next(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(".xml"))
+        self.runtime = "openvino"
+        core = openvino.Core()
+        model = core.read_model(xml)
+        metadata = {}
+        # Ultralytics writes metadata.yaml, YOLOv5's export.py <weights stem>.yaml next to the .xml
+        for metadata_path in (os.path.join(os.path.dirname(xml), "metadata.yaml"), xml[:-4] + ".yaml"):
+            if os.path.exists(metadata_path):
+                with open(metadata_path) as f:
+                    metadata = yaml.safe_load(f) or {}
+                break
+        self.names = normalize_names(metadata.get("names", {}))
+        shape = [dim.get_length() if dim.is_static else None for dim in model.input(0).get_partial_shape()]
+        self._set_shape(shape, metadata.get("imgsz", [640, 640]))
+        self.compiled = core.compile_model(model, "CPU", {"PERFORMANCE_HINT": "THROUGHPUT"})
+        self.size = os.path.getsize(xml) + os.path.getsize(xml[:-4] + ".bin")
+
+    def _set_shape(self, shape, imgsz):
+        # dynamic exports leave these symbolic; fall back to the export image size and any batch size
+        batch, _, height, width = shape
+        self.max_batch = batch if isinstance(batch, int) else None
+        self.imgsz = (height, width) if isinstance(height, int) and isinstance(width, int) else tuple(imgsz)
+
+    def _infer(self, batch):
+        if self.runtime == "onnxruntime":
+            return self.session.run(None, {self.input_name: batch})[0]
+        return self.compiled(batch)[0]
+
+    def __call__(self, images):
+        batch, gains, pads = letterbox(images, self.imgsz)
+        step = self.max_batch or len(images)
+        output = np.concatenate([self._infer(batch[k:k + step]) for k in range(0, len(images), step)])
+        return decode(output, gains, pads, [image.shape[:2] for image in images], self.conf, self.iou,
+                      num_classes=len(self.names))
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class InferenceService:
+    """
+    Micro-batching front end for one detection model shared by several drones.
+
+    submit() hands back a Future straight away. A single worker takes the frames already queued;
+    when there are several it keeps collecting until it has max_batch_size of them or the oldest
+    has waited max_latency seconds, while a lone frame goes to the model at once. Each batch runs
+    as one model call and each frame's future resolves with that frame's detections.
+
+    run_batch(images) -> one result per image; the service doesn't care what the model is.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_latency=0.05):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.frames = queue.Queue()
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+
+        # counters
+        self.batches = 0
+        self.frames_done = 0
+        self.inference_time = 0.0
+
+    def start(self):
+        with self.lock:
+            if not self.running:
+                self.running = True
+                self.thread = threading.Thread(target=self._run, name="inference-service", daemon=True)
+                self.thread.start()
+        return self
+
+    def stop(self):
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            self.frames.put(None)
+        self.thread.join()
+
+    def submit(self, image):
+        """Queue one frame; the returned Future resolves to its detections."""
+        future = Future()
+        with self.lock:
+            # checked under the lock so no frame lands behind stop()'s end marker
+            if not self.running:
+                future.set_exception(RuntimeError("inference service is not running"))
+                return future
+            self.frames.put((image, future, time.monotonic()))
+        return future
+
+    def detect(self, image, timeout=None):
+        return self.submit(image).result(timeout)
+
+    def _collect(self):
+        """
+        Block for the first frame and take whatever else is already queued. Only once that gives a
+        batch of two or more does it wait for more frames, until the batch is full or its deadline
+        passes, so a lone frame (e.g. one drone detecting) never sits out max_latency.
+        """
+        first = self.frames.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[2] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            # nothing else was queued with the first frame: run it now rather than wait for company
+            remaining = deadline - time.monotonic() if len(batch) > 1 else 0
+            try:
+                item = self.frames.get(timeout=remaining) if remaining > 0 else self.frames.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.frames.put(None)  # finish this batch, stop on the next collect
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            images = [image for image, _, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = self.run_batch(images)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.batches += 1
+                self.frames_done += len(batch)
+                self.inference_time += elapsed
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+        # fail whatever was queued after stop() so no caller waits forever
+        while True:
+            try:
+                item = self.frames.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("inference service stopped"))
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "batches": self.batches,
+                "frames": self.frames_done,
+                "mean_batch_size": self.frames_done / self.batches if self.batches else 0.0,
+                "inference_time": self.inference_time,
+                "queued": self.frames.qsize(),
+            }
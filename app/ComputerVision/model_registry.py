@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ComputerVision.inference_service import InferenceService
+
+
+class ModelRegistry:
+    """
+    Detection models by name (e.g. a drone's visionModel), loaded on first use and shared by every
+    drone that asks for the same one.
+
+    Each loaded model gets its own InferenceService, so frames for the same model are batched
+    together. When the loaded models add up to more than memory_budget bytes, the least recently
+    used ones are dropped, though never the one just asked for.
+
+    load(path) -> model, run_batch(model, images) -> detections per image, size_of(model) -> bytes.
+    """
+
+    def __init__(self, load, run_batch, size_of, model_dir="./ComputerVision/CVModels", memory_budget=1024 * 1024 * 1024,
+                 max_batch_size=4, max_latency=0.05):
+        self.load = load
+        self.run_batch = run_batch
+        self.size_of = size_of
+        self.model_dir = model_dir
+        self.memory_budget = memory_budget
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.entries = OrderedDict()  # name -> (model, service, size), least recently used first
+        self.lock = threading.Lock()
+        self.loading = {}  # name -> lock, so two drones asking for a new model load it once
+
+        # counters
+        self.loads = 0
+        self.evictions = 0
+
+    def resolve(self, name):
+        return name if os.path.isabs(name) or os.path.exists(name) else os.path.join(self.model_dir, name)
+
+    def _entry(self, name):
+        with self.lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+                return self.entries[name]
+            load_lock = self.loading.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self.lock:
+                if name in self.entries:
+                    self.entries.move_to_end(name)
+                    return self.entries[name]
+            print(f"Loading vision model {name}")
+            model = self.load(self.resolve(name))
+            service = InferenceService(lambda images: self.run_batch(model, images),
+                                       max_batch_size=self.max_batch_size, max_latency=self.max_latency).start()
+            entry = (model, service, self.size_of(model))
+            with self.lock:
+                self.entries[name] = entry
+                self.loads += 1
+                evicted = self._evict(keep=name)
+                self.loading.pop(name, None)
+        for evicted_name, (_, evicted_service, _) in evicted:
+            print(f"Unloading vision model {evicted_name} to stay under the memory budget")
+            evicted_service.stop()  # frames already queued still finish
+        return entry
+
+    def _evict(self, keep):
+        evicted = []
+        total = sum(size for _, _, size in self.entries.values())
+        for name in list(self.entries):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            entry = self.entries.pop(name)
+            total -= entry[2]
+            evicted.append((name, entry))
+            self.evictions += 1
+        return evicted
+
+    def get_model(self, name):
+        return self._entry(name)[0]
+
+    def submit(self, name, image):
+        """Future for the detections of image with model name."""
+        while True:
+            _, service, _ = self._entry(name)
+            future = service.submit(image)
+            # the model can be evicted between lookup and submit; its stopped service fails at once, so look again
+            if not (future.done() and future.exception() is not None and not service.running):
+                return future
+
+    def detect(self, name, image, timeout=None):
+        return self.submit(name, image).result(timeout)
+
+    def warm_up(self, names, background=True):
+        """Load models and run one blank frame through each so the first real detection isn't slow."""
+        def run():
+            for name in dict.fromkeys(names):
+                try:
+                    self.detect(name, np.zeros((640, 640, 3), dtype=np.uint8))
+                except Exception as e:
+                    print(f"Unable to warm up vision model {name}: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def loaded(self):
+        with self.lock:
+            return list(self.entries)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "loaded": list(self.entries),
+                "bytes": sum(size for _, _, size in self.entries.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
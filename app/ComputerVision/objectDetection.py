@@ -1,41 +1,88 @@
+import threading
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 
-# Load your trained YOLO model
-  # Replace with your model path
-model = YOLO("./ComputerVision/CVModels/rf3v1.pt")
+from ComputerVision.exported_model import ExportedModel, is_exported_model
+from ComputerVision.model_registry import ModelRegistry
 
+MODEL_DIR = "./ComputerVision/CVModels"
+DEFAULT_MODEL = "rf3v1.pt"  # matches Drone.visionModel
+MODEL_MEMORY_BUDGET = 1024 * 1024 * 1024  # bytes of weights kept loaded at once
 
-custom_labels = model.names  # This pulls the correct labels from the model
+# Models are loaded on first use rather than at import. The registry shares one instance per model
+# name between drones and batches concurrent frames for the same model through one InferenceService.
+_registry = None
+_lock = threading.Lock()
 
-def detect_objects(image_path):
+
+def load_model(path):
+    # .onnx files and OpenVINO export directories run on CPU without PyTorch
+    if is_exported_model(path):
+        return ExportedModel(path)
+    # Load your trained YOLO model. Imported here so exported-model deployments never import PyTorch.
+    from ultralytics import YOLO
+    return YOLO(path)
+
+
+def model_size(model):
+    """Bytes held by the model's weights, for the registry's memory budget."""
+    if isinstance(model, ExportedModel):
+        return model.size
+    return sum(p.numel() * p.element_size() for p in model.model.parameters())
+
+
+def results_to_detections(result, custom_labels):
+    detections = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = map(int, box.xyxy[0])  # Bounding box coordinates
+        class_id = int(box.cls[0])  # Class ID
+        confidence = float(box.conf[0])  # Confidence score
+
+        # Get the label name from the model if it exists
+        label_name = custom_labels[class_id] if class_id < len(custom_labels) else "Unknown"
+
+        detections.append({
+            "bbox": (x1, y1, x2, y2),
+            "class": label_name,
+            "confidence": confidence
+        })
+    return detections
+
+
+def arrays_to_detections(boxes, scores, class_ids, custom_labels):
+    return [{
+        "bbox": tuple(int(v) for v in box),
+        "class": custom_labels.get(int(class_id), "Unknown"),
+        "confidence": float(score)
+    } for box, score, class_id in zip(boxes, scores, class_ids)]
+
+
+def run_model_batch(model, images):
+    """Detections for each image, from one batched forward pass."""
+    if isinstance(model, ExportedModel):
+        return [arrays_to_detections(*result, model.names) for result in model(images)]
+    results = model(images, verbose=False)
+    return [results_to_detections(result, model.names) for result in results]
+
+
+def get_model_registry():
+    global _registry
+    with _lock:
+        if _registry is None:
+            # one batch slot per detection pipeline worker, so a batch closes as soon as every worker has sent a frame
+            _registry = ModelRegistry(load_model, run_model_batch, model_size, model_dir=MODEL_DIR,
+                                      memory_budget=MODEL_MEMORY_BUDGET, max_batch_size=4, max_latency=0.05)
+        return _registry
+
+
+def detect_objects(image_path, model_name=DEFAULT_MODEL):
 
     # Load image
     image = cv2.imread(image_path)
-    
+
     # Run inference
-    results = model(image)
-    
-    detections = []
-    
-    for result in results:
-        for box in result.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])  # Bounding box coordinates
-            class_id = int(box.cls[0])  # Class ID
-            confidence = float(box.conf[0])  # Confidence score
-            
-            # Get the label name from the model if it exists 
-            label_name = custom_labels[class_id] if class_id < len(custom_labels) else "Unknown"
-
-            detections.append({
-                "bbox": (x1, y1, x2, y2),
-                "class": label_name,
-                "confidence": confidence
-            })
-    
-    return detections
+    return get_model_registry().detect(model_name or DEFAULT_MODEL, image)
 
 # Example usage
 image_path = "temp/drone_testing5.jpg"  # Replace with your image path
@@ -45,32 +92,20 @@ image_path = "temp/drone_testing5.jpg"  # Replace with your image path
 # for detection in detections:
 #     print(f"Class: {detection['class']}, BBox: {detection['bbox']}, Confidence: {detection['confidence']}")
 
-def detect_and_draw(image_path):
+def detect_and_draw(image_path, model_name=DEFAULT_MODEL):
     image = cv2.imread(image_path)
-    results = model(image)
-
-    detections = []
-
-    for result in results:
-        for box in result.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            class_id = int(box.cls[0])
-            confidence = float(box.conf[0])
+    detections = get_model_registry().detect(model_name or DEFAULT_MODEL, image)
 
-            label_name = custom_labels[class_id] if class_id < len(custom_labels) else "Unknown"
+    for detection in detections:
+        x1, y1, x2, y2 = detection["bbox"]
 
-            # Draw bounding box
-            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            label = f"{label_name}: {confidence:.2f}"
-            cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-            detections.append({
-                "bbox": (x1, y1, x2, y2),
-                "class": label_name,
-                "confidence": confidence
-            })
+        # Draw bounding box
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        label = f"{detection['class']}: {detection['confidence']:.2f}"
+        cv2.putText(image, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
     # Show image
     return image, detections
 
 # Call function
-#detect_and_draw(image_path)
\ No newline at end of file
+#detect_and_draw(image_path)
@@ -1,10 +1,21 @@
 
 from pymavlink import mavutil
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import os
 import threading
 import time
 import math
 
+from Dispatcher.command_scheduler import CommandScheduler
+from Dispatcher.mavlink_link import LinkRouter, MavlinkLink
+from Dispatcher.mission_deployment import MissionDeployment
+from Dispatcher.mission_mirror import MissionMirror
+from Dispatcher.mission_transfer import MissionTransfer
+
+# Whitespace-separated pymavlink connection strings, e.g. "tcp:127.0.0.1:14550 udpin:0.0.0.0:14551 /dev/ttyUSB0"
+MAVLINK_LINKS = os.environ.get("VITALS_MAVLINK_LINKS", "tcp:127.0.0.1:14550").split()
+
 class mission_item:
     def __init__(self, seq, current, lat, lon, alt):
         self.seq = seq
@@ -22,13 +33,39 @@ class mission_item:
 
 
 class Dispatcher:
+    # ArduCopter custom modes
+    MODES = {
+        "GUIDED": 4,
+        "AUTO": 3,
+        "LOITER": 5,
+        "RTL": 6
+    }
+
     def __init__(self, missionState):
-        self.master = None
+        self.master = None  # first link's connection; its encoder builds messages for every link
+        self.links = LinkRouter()  # connected links and the one each drone is reached on; all sends go through it
+        self.link_timeout = 10  # seconds each link may take to show a heartbeat when connecting
         self.missionState = missionState
-        self.uploading_missions = {}
-        self.unhandled_clears = [] # list of drones that have sent a mission clear command, awaiting ack
+        self.transfers = {}  # drone_id -> MissionTransfer in progress
+        self.mission_mirror = MissionMirror()  # what each drone holds, so unchanged items aren't re-sent (mission loop)
+        self.vehicle_autopilots = {}  # drone_id -> MAV_AUTOPILOT from its heartbeats
+        self.mission_tasks = {}  # drone_id -> task running that drone's stop/upload/start sequence (mission loop)
+        self.vehicle_heartbeats = {}  # drone_id -> (custom_mode, base_mode) from its last heartbeat (mission loop)
+        self.vehicle_waiters = {}  # drone_id -> [(on_event, future)] waiting on heartbeats / command acks (mission loop)
+        self.mission_step_timeout = 1.5  # longest wait for a reply before a mission transfer step is retried
+        self.mission_step_retries = 5
+        self.command_timeout = 3  # seconds to wait for a mode change or arming to be confirmed, per attempt
+        self.command_retries = 2
         self.waiting_for_takeoff = []
+        self.deployments = []  # MissionDeployments still waiting for drones to get airborne
         self.requeted_missions = []
+        self.reader_loop = None
+        self.packet_queue = None  # (link, batch) from every link's receive worker, merged for handle_message
+        self.message_handlers = {}  # MAVLink message id -> [(handler, is_coroutine), ...]
+        self.message_stats = {}  # MAVLink message id -> [messages handled, seconds in handlers]
+        self.reader_timeout = 0.5  # seconds a link's receive worker blocks before re-checking for shutdown
+        self.read_chunk_size = 65536  # bytes pulled from a link per readiness event
+        self._register_default_handlers()
         self.loop = asyncio.new_event_loop()  # Create a separate event loop for background tasks
         self.mission_thread = threading.Thread(target=self._run_mission_loop, daemon=True)  
         self.mission_thread.start()  # Start the background thread
@@ -38,100 +75,231 @@ class Dispatcher:
         asyncio.set_event_loop(self.loop)
         self.loop.run_forever()
 
-    def connect(self):
-        try:
-            self.master = mavutil.mavlink_connection('tcp:127.0.0.1:14550', mavlink_version="2.0")
-            self.master.wait_heartbeat()
-            print("Connected to MAVLink")
-            return True
-        except Exception as e:
-            print(f"Error connecting to MAVLink: {e}")
+    def connect(self, connection_strings=None, link_rate=None, baud=57600):
+        """Connect to one link or a list of them (default VITALS_MAVLINK_LINKS) at once.
+
+        link_rate caps each link's outbound bytes per second; serial links default to their baud rate.
+        Returns True if at least one link showed a heartbeat."""
+        if connection_strings is None:
+            connection_strings = MAVLINK_LINKS
+        elif isinstance(connection_strings, str):
+            connection_strings = [connection_strings]
+        links = [MavlinkLink(connection_string, link_rate, baud, self.reader_timeout, self.read_chunk_size)
+                 for connection_string in connection_strings]
+        with ThreadPoolExecutor(max_workers=len(links)) as pool:
+            connected = list(pool.map(lambda link: link.connect(self.link_timeout), links))
+        for link, ok in zip(links, connected):
+            if ok:
+                self.links.add(link)
+                print(f"Connected to MAVLink on {link.name}")
+        if not self.links.links:
+            print("Error connecting to MAVLink: no link showed a heartbeat")
             self.master = None
             return False
+        self.master = self.links.links[0].connection
+        return True
     
 
     async def receive_packets(self):
-        """Continuously process MAVLink messages with minimal latency."""
-        if not self.master:
+        """Handle the messages from every link, as soon as each link has data, until they all close."""
+        if not self.links.links:
             print("No MAVLink connection established.")
             return
 
+        self.reader_loop = asyncio.get_running_loop()
+        self.packet_queue = asyncio.Queue()
+        open_links = set(self.links.links)
+        for link in open_links:
+            link.start(self._deliver_batch)
+
         try:
-            while True:
-                # Process ALL available messages before sleeping
-                messages_processed = 0
-                
-                while True:
-                    msg = self.master.recv_match(blocking=False)
-                    if not msg:
-                        break  # No more messages, exit loop
-
-                    messages_processed += 1
-                    drone_id = msg.get_srcSystem()
-                    msg_type = msg.get_type()
-
-                    if msg_type == "HEARTBEAT":
-                        self.missionState.updateDroneStatus(drone_id, msg.system_status)
-
-                    elif msg_type == "GLOBAL_POSITION_INT":
-                        for x in self.waiting_for_takeoff:
-                            if x[0] == drone_id:
-                                await self.handle_check_if_takeoff_complete(drone_id, msg.relative_alt / 1000, x[1])
-                        self.missionState.updateDronePosition(
-                            drone_id, msg.lat, msg.lon, msg.alt, msg.relative_alt,
-                            msg.hdg, msg.vx, msg.vy, msg.vz
-                        )
-                    elif msg_type == "MISSION_COUNT":
-                        print(f"Drone {drone_id} has {msg.count} waypoints stored.")
-                        self.requeted_missions.insert(drone_id, {
-                            "waypoints": [],
-                            "expected_count": msg.count,
-                            })
-
-                    elif msg_type == "ATTITUDE":
-                        self.missionState.updateDroneTelemetry(
-                            drone_id, msg.roll, msg.pitch, msg.yaw
-                        )
-                    elif msg_type == "MISSION_REQUEST":
-                            print(f"Received mission request {msg.seq} from drone {drone_id}")
-                            await self.handle_mission_request(drone_id, msg.seq)
-
-                    elif msg_type == "MISSION_ACK":
-                            print(f"Mission acknowledgment received from drone {drone_id}: {msg.type}")
-                            await self.handle_mission_ack(drone_id, msg.type)
-
-                    elif msg_type == "COMMAND_ACK":
-                            print(f"Command acknowledgment received for drone {drone_id}: {msg.command} - {msg.result}")
-                    elif msg_type == "MISSION_ITEM_REACHED":
-                            self.missionState.handle_reached_waypoint(drone_id, msg.seq)
-                    
-                    elif msg_type == "MISSION_ITEM":
-                            print(f"Received waypoint {msg.seq} from drone {drone_id}: ({msg.x / 1e7}, {msg.y / 1e7}, {msg.z})")
-                    elif msg_type == "MISSION_CURRENT":
-                            # print(f"Current waypoint count for drone {drone_id}: {msg.total}")
-                            self.missionState.handle_mission_state_update(drone_id, msg.mission_state)
-                    elif msg_type == "CAMERA_TRIGGER":
-                            print(f"Camera triggered by drone {drone_id} at time {msg.time_usec}")
-
-                if messages_processed == 0:
-                    await asyncio.sleep(0.001)  # Only sleep if no messages were processed
+            while open_links:
+                # Each batch holds every frame that was buffered on one link when it became readable
+                link, batch = await self.packet_queue.get()
+                if link is None:
+                    break  # stop_receiving
+                if batch is None:
+                    open_links.discard(link)  # link closed
+                    continue
+                for msg in batch:
+                    self.links.route(msg.get_srcSystem(), link)
+                    await self.handle_message(msg)
 
         except Exception as e:
             print(f"Dispatcher error: {e}")
         finally:
-            if self.master:
-                self.master.close()
+            self.links.close()
+
+    def stop_receiving(self):
+        """Stop the link workers and end receive_packets. Safe to call from any thread."""
+        if self.reader_loop is not None and not self.reader_loop.is_closed():
+            self.reader_loop.call_soon_threadsafe(self.packet_queue.put_nowait, (None, None))
+
+    def _deliver_batch(self, link, batch):
+        """Link worker thread: queue a parsed batch (None once the link closed) for the receive loop."""
+        try:
+            self.reader_loop.call_soon_threadsafe(self.packet_queue.put_nowait, (link, batch))
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def subscribe(self, msg_id, handler):
+        """Register handler(msg) for a MAVLink message id. Coroutine functions are awaited."""
+        self.message_handlers.setdefault(msg_id, []).append((handler, asyncio.iscoroutinefunction(handler)))
+        self.message_stats.setdefault(msg_id, [0, 0.0])
+
+    def unsubscribe(self, msg_id, handler):
+        handlers = self.message_handlers.get(msg_id, [])
+        handlers[:] = [h for h in handlers if h[0] != handler]
+        if not handlers:
+            self.message_handlers.pop(msg_id, None)
+
+    def _register_default_handlers(self):
+        mavlink = mavutil.mavlink
+        self.subscribe(mavlink.MAVLINK_MSG_ID_HEARTBEAT, self._on_heartbeat)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_GLOBAL_POSITION_INT, self._on_global_position_int)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_MISSION_COUNT, self._on_mission_count)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_ATTITUDE, self._on_attitude)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_MISSION_REQUEST, self._on_mission_request)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_MISSION_REQUEST_INT, self._on_mission_request)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_MISSION_ACK, self._on_mission_ack)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_COMMAND_ACK, self._on_command_ack)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_MISSION_ITEM_REACHED, self._on_mission_item_reached)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_MISSION_ITEM, self._on_mission_item)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_MISSION_CURRENT, self._on_mission_current)
+        self.subscribe(mavlink.MAVLINK_MSG_ID_CAMERA_TRIGGER, self._on_camera_trigger)
+
+    async def handle_message(self, msg):
+        """Route a single MAVLink message to its subscribed handlers."""
+        msg_id = msg.get_msgId()
+        handlers = self.message_handlers.get(msg_id)
+        if handlers is None:
+            return
+
+        start = time.perf_counter()
+        for handler, is_coroutine in handlers:
+            if is_coroutine:
+                await handler(msg)
+            else:
+                handler(msg)
+        stats = self.message_stats[msg_id]
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+    def get_message_stats(self):
+        """Messages handled and total seconds spent in handlers, per message type."""
+        return {
+            mavutil.mavlink.mavlink_map[msg_id].msgname: {"count": count, "handler_time": handler_time}
+            for msg_id, (count, handler_time) in self.message_stats.items() if count
+        }
+
+    def _on_heartbeat(self, msg):
+        self.missionState.updateDroneStatus(msg.get_srcSystem(), msg.system_status)
+        if msg.type != mavutil.mavlink.MAV_TYPE_GCS and msg.autopilot != mavutil.mavlink.MAV_AUTOPILOT_INVALID:
+            self.vehicle_autopilots[msg.get_srcSystem()] = msg.autopilot
+            self.loop.call_soon_threadsafe(self._on_vehicle_heartbeat, msg.get_srcSystem(), msg.custom_mode, msg.base_mode)
+
+    async def _on_global_position_int(self, msg):
+        drone_id = msg.get_srcSystem()
+        for x in self.waiting_for_takeoff:
+            if x[0] == drone_id:
+                await self.handle_check_if_takeoff_complete(drone_id, msg.relative_alt / 1000, x[1])
+        self.missionState.updateDronePosition(
+            drone_id, msg.lat, msg.lon, msg.alt, msg.relative_alt,
+            msg.hdg, msg.vx, msg.vy, msg.vz
+        )
+
+    def _on_mission_count(self, msg):
+        drone_id = msg.get_srcSystem()
+        print(f"Drone {drone_id} has {msg.count} waypoints stored.")
+        self.requeted_missions.insert(drone_id, {
+            "waypoints": [],
+            "expected_count": msg.count,
+            })
+
+    def _on_attitude(self, msg):
+        self.missionState.updateDroneTelemetry(msg.get_srcSystem(), msg.roll, msg.pitch, msg.yaw)
+
+    async def _on_mission_request(self, msg):
+        drone_id = msg.get_srcSystem()
+        print(f"Received mission request {msg.seq} from drone {drone_id}")
+        await self.handle_mission_request(drone_id, msg.seq)
+
+    async def _on_mission_ack(self, msg):
+        drone_id = msg.get_srcSystem()
+        print(f"Mission acknowledgment received from drone {drone_id}: {msg.type}")
+        await self.handle_mission_ack(drone_id, msg.type)
+
+    def _on_command_ack(self, msg):
+        print(f"Command acknowledgment received for drone {msg.get_srcSystem()}: {msg.command} - {msg.result}")
+        self.links.on_command_ack(msg.get_srcSystem(), msg.command, msg.result)
+        self.loop.call_soon_threadsafe(self._notify_waiters, msg.get_srcSystem(), "command_ack", msg.command, msg.result)
+
+    def _on_mission_item_reached(self, msg):
+        self.missionState.handle_reached_waypoint(msg.get_srcSystem(), msg.seq)
+
+    def _on_mission_item(self, msg):
+        print(f"Received waypoint {msg.seq} from drone {msg.get_srcSystem()}: ({msg.x / 1e7}, {msg.y / 1e7}, {msg.z})")
+
+    def _on_vehicle_heartbeat(self, drone_id, custom_mode, base_mode):
+        self.vehicle_heartbeats[drone_id] = (custom_mode, base_mode)
+        self._notify_waiters(drone_id, "heartbeat", custom_mode, base_mode)
+
+    def _notify_waiters(self, drone_id, kind, *values):
+        """Mission loop: resolve waiters for drone_id whose on_event(kind, *values) gives True or False."""
+        for on_event, future in list(self.vehicle_waiters.get(drone_id, ())):
+            if future.done():
+                continue
+            outcome = on_event(kind, *values)
+            if outcome is not None:
+                future.set_result(outcome)
+
+    async def wait_for_vehicle(self, drone_id, on_event, timeout):
+        """Wait on the mission loop for a heartbeat or COMMAND_ACK from drone_id that settles on_event.
+
+        on_event(kind, *values) gets ("heartbeat", custom_mode, base_mode), ("command_ack", command, result)
+        or ("mission_current", seq, total) and returns True or False to finish, or None to keep waiting.
+        Returns None on timeout."""
+        last = self.vehicle_heartbeats.get(drone_id)
+        if last is not None and on_event("heartbeat", *last):
+            return True
+        waiter = (on_event, self.loop.create_future())
+        waiters = self.vehicle_waiters.setdefault(drone_id, [])
+        waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters.remove(waiter)
+
+    def _on_mission_current(self, msg):
+        # mission_state and total are MAVLink 2 extensions, missing from MAVLink 1 dialects
+        self.missionState.handle_mission_state_update(msg.get_srcSystem(), getattr(msg, "mission_state", None))
+        self.loop.call_soon_threadsafe(self._on_vehicle_mission_current, msg.get_srcSystem(), msg.seq, getattr(msg, "total", 0))
+
+    def _on_vehicle_mission_current(self, drone_id, seq, total):
+        # total is 0 when the autopilot doesn't send it, UINT16_MAX when it has no mission
+        if total not in (0, 65535) and drone_id not in self.transfers:
+            if self.vehicle_autopilots.get(drone_id) == mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA:
+                total += 1  # ArduPilot leaves its home item out of the total
+            self.mission_mirror.check_count(drone_id, total)
+        self._notify_waiters(drone_id, "mission_current", seq, total)
+
+    def _on_camera_trigger(self, msg):
+        print(f"Camera triggered by drone {msg.get_srcSystem()} at time {msg.time_usec}")
 
     def clear_mission(self, drone_id):
-        self.master.target_system = drone_id
-        #self.master.waypoint_clear_all_send()
+        pass
+        #self.links.send(drone_id, self.master.mav.mission_clear_all_encode(drone_id, 0))
     
     def arm_drone(self, drone_id):
         print(f"Arming drone {drone_id}")
-        print(f"target_component: {self.master.target_component}")
-        self.master.target_system = drone_id
-        self.master.set_mode(216)
-        self.master.arducopter_arm()
+        # what master.set_mode(216) and master.arducopter_arm() sent, addressed to drone_id
+        self.links.send_command(
+            drone_id, mavutil.mavlink.MAV_CMD_DO_SET_MODE,
+            (mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, 216), CommandScheduler.SAFETY
+        )
+        self.links.send_command(drone_id, mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, (1,))
     
     def send_mission(self, drone_id, waypoints):
         """Stop current mission and upload new waypoints for a specific drone."""
@@ -140,68 +308,211 @@ class Dispatcher:
             return
 
         async def mission_task():
-            await self.stop_current_mission(drone_id)  # Stop the current mission
+            if not await self.stop_current_mission(drone_id):  # Stop the current mission
+                return
             await self.upload_mission(drone_id, waypoints)
 
-        asyncio.run_coroutine_threadsafe(mission_task(), self.loop)  # Run coroutine in separate event loop
+        self.loop.call_soon_threadsafe(self._start_mission_task, drone_id, mission_task())  # Run in the mission loop
+
+    def _start_mission_task(self, drone_id, coroutine):
+        """Mission loop: run coroutine as drone_id's mission sequence, replacing any still in progress."""
+        previous = self.mission_tasks.get(drone_id)
+        if previous is not None and not previous.done():
+            print(f"Cancelling the mission transfer still in progress for drone {drone_id}")
+            previous.cancel()
+        self.mission_tasks[drone_id] = self.loop.create_task(coroutine)
+
+    def deploy_missions(self, missions):
+        """Upload missions ({drone_id: waypoints}) to every drone at once and launch them together.
+
+        Returns the MissionDeployment tracking per-drone progress."""
+        if not self.master:
+            print(f"Cannot deploy missions: MAVLink is not connected!")
+            return None
+        deployment = MissionDeployment(missions)
+        self.deployments.append(deployment)
+        for drone_id, waypoints in missions.items():
+            self.loop.call_soon_threadsafe(self._start_mission_task, drone_id, self._deploy_mission(deployment, drone_id, waypoints))
+        return deployment
+
+    async def _deploy_mission(self, deployment, drone_id, waypoints):
+        """One drone's part of a deployment: stop, upload, wait for the others, then launch."""
+        try:
+            deployment.set_phase(drone_id, deployment.SWITCHING_MODE)
+            accepted = False
+            if await self.stop_current_mission(drone_id):
+                def on_transfer(transfer):
+                    deployment.set_transfer(drone_id, transfer)
+                    deployment.set_phase(drone_id, deployment.UPLOADING)
+
+                accepted = await self.update_mission(drone_id, waypoints, on_transfer)
+            if not accepted:
+                deployment.set_phase(drone_id, deployment.FAILED)
+                return
+            deployment.set_phase(drone_id, deployment.UPLOADED)
+
+            await deployment.uploads_done.wait()
+            deployment.set_phase(drone_id, deployment.LAUNCHING)
+            if not await self.start_mission(drone_id):
+                deployment.set_phase(drone_id, deployment.FAILED)
+            elif any(waiting[0] == drone_id for waiting in self.waiting_for_takeoff):
+                deployment.set_phase(drone_id, deployment.TAKING_OFF)
+            else:
+                deployment.set_phase(drone_id, deployment.AIRBORNE)  # was already flying
+        except asyncio.CancelledError:
+            deployment.set_phase(drone_id, deployment.CANCELLED)  # a newer mission for this drone took over
+            raise
+        finally:
+            if deployment.finished.is_set() and deployment in self.deployments:
+                self.deployments.remove(deployment)
+                self._report_deployment(deployment)
+
+    def _on_airborne(self, drone_id):
+        """Mission loop: drone_id reached its takeoff altitude."""
+        for deployment in list(self.deployments):
+            deployment.mark_airborne(drone_id)
+            if deployment.finished.is_set():
+                self.deployments.remove(deployment)
+                self._report_deployment(deployment)
+
+    def _report_deployment(self, deployment):
+        progress = deployment.get_progress()
+        print(f"Deployment of {len(progress['drones'])} drones finished in {progress['elapsed']:.2f}s")
+        for drone_id, drone in progress["drones"].items():
+            print(f"  drone {drone_id}: {drone['phase']}, {drone['items_sent']}/{drone['items']} items sent, "
+                  f"{drone['retries']} retries, airborne after {drone['time_to_airborne']}s")
 
     async def upload_mission(self, drone_id, waypoints):
-        """Initiate mission upload using the correct MAVLink protocol."""
-        print(f"Uploading mission to drone {drone_id} with {len(waypoints)} waypoints...")
-        print(f"Waypoints: {waypoints}")
-        #append home waypoint to the mission
+        """Put waypoints on the drone and start the mission once it holds them."""
+        if not await self.update_mission(drone_id, waypoints):
+            return False
+        await self.start_mission(drone_id)
+        return True
+
+    def mission_items(self, drone_id, waypoints):
+        """The items uploaded for waypoints: the drone's home as the takeoff item, then the waypoints."""
         drone = self.missionState.get_drone(drone_id)
         if not drone:
             print(f"Drone {drone_id} not found.")
-            return
+            return None
+        #append home waypoint to the mission
         home_lat, home_lon = drone.get_home()
-        waypoints.insert(0, (home_lat, home_lon, 10, 1)) # add home waypoint to the start of the mission
-
-            
+        return [(home_lat, home_lon, 10, 1)] + [tuple(waypoint) for waypoint in waypoints] # add home waypoint to the start of the mission
 
-        # Clear existing mission
-        self.master.mav.mission_clear_all_send(drone_id, 0)
-        self.unhandled_clears.append(drone_id)
-        await asyncio.sleep(1)  # Allow time for clearing
+    async def update_mission(self, drone_id, waypoints, on_transfer=None):
+        """Make the drone hold waypoints, ready to fly them from the first one, sending as little as possible.
 
-        self.uploading_missions[drone_id] = {
-            "waypoints": [],  # Clear old waypoints before storing new ones
-            "next_seq": 0,
-            "waiting_for_request": True
-        }
-        self.uploading_missions[drone_id]["waypoints"] = waypoints.copy()
-        print( f"uploading waypoints: {self.uploading_missions[drone_id]["waypoints"]}")
+        The mission mirror decides between MISSION_SET_CURRENT (the drone already holds these waypoints,
+        e.g. a resumed job), a partial write of the items that changed (ArduPilot, same length) and a
+        full upload. on_transfer(transfer) is called for each MissionTransfer started. Returns True
+        once the drone holds the mission."""
+        print(f"Uploading mission to drone {drone_id} with {len(waypoints)} waypoints...")
+        print(f"Waypoints: {waypoints}")
+        items = self.mission_items(drone_id, waypoints)
+        if items is None:
+            return False
+        partial_write = self.vehicle_autopilots.get(drone_id) == mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA
+        update = self.mission_mirror.plan(drone_id, items, partial_write)
+
+        if update.kind == MissionMirror.SET_CURRENT:
+            print(f"Drone {drone_id} already holds this mission, resuming at item {update.start}")
+            if await self.set_current_item(drone_id, update.start):
+                return True
+            self.mission_mirror.invalidate(drone_id)
+        elif update.kind == MissionMirror.PARTIAL:
+            print(f"Rewriting mission items {update.start}-{update.end} of {len(items)} on drone {drone_id}")
+            transfer = self.make_transfer(drone_id, items, update.start, update.end)
+            if on_transfer is not None:
+                on_transfer(transfer)
+            if await self.run_transfer(transfer, items) and await self.set_current_item(drone_id, 1):
+                return True
+            self.mission_mirror.invalidate(drone_id)
+
+        # full upload, also the fallback when the cheaper update didn't take
+        transfer = self.make_transfer(drone_id, items)
+        if on_transfer is not None:
+            on_transfer(transfer)
+        if await self.run_transfer(transfer, items):
+            return True
+        self.missionState.handle_mission_upload_failed(drone_id)
+        return False
 
-        # Send mission count
-        mission_count = len(waypoints)
-        print(f"Sending MISSION_COUNT for {mission_count} waypoints to drone {drone_id}")
-        
-        self.master.mav.mission_count_send(drone_id, 0, mission_count)
-        await asyncio.sleep(2)  # Allow drone time to process
+    def make_transfer(self, drone_id, items, start=0, end=None):
+        """MissionTransfer uploading items, or with start > 0 rewriting items start..end of the mission on board."""
+        if start:
+            # MISSION_WRITE_PARTIAL_LIST keeps the drone's item count and overwrites start..end
+            send_count = lambda count: self.links.send(
+                drone_id, self.master.mav.mission_write_partial_list_encode(drone_id, 0, start, end))
+        else:
+            # MISSION_COUNT replaces whatever mission the drone holds, so no separate clear is needed
+            send_count = lambda count: self.links.send(drone_id, self.master.mav.mission_count_encode(drone_id, 0, count))
+        return MissionTransfer(
+            drone_id, len(items) if end is None else end + 1,
+            send_count=send_count,
+            send_item=lambda seq: self.send_waypoint(drone_id, seq, *items[seq]),
+            timeout=self.mission_step_timeout,
+            retries=self.mission_step_retries,
+            start=start,
+        )
 
-        #Wait for mission requests and respond accordingly
-       
+    async def run_transfer(self, transfer, items):
+        """Run a transfer with the drone's replies routed to it. Returns True once the drone accepts the items."""
+        drone_id = transfer.drone_id
+        self.transfers[drone_id] = transfer
+        self.mission_mirror.invalidate(drone_id)  # unknown until the drone accepts
+        print(f"Sending mission items {transfer.start}-{transfer.count - 1} to drone {drone_id}")
+        try:
+            accepted = await transfer.run()
+        finally:
+            if self.transfers.get(drone_id) is transfer:
+                del self.transfers[drone_id]
 
+        progress = transfer.get_progress()
+        if not accepted:
+            print(f"Mission upload failed for drone {drone_id}: {progress['error']}")
+            return False
+        print(f"Mission upload to drone {drone_id} completed successfully in {progress['latency']:.2f}s "
+              f"({progress['retries']} retries)")
+        self.mission_mirror.set(drone_id, items)
+        return True
+
+    async def set_current_item(self, drone_id, seq):
+        """Make seq the drone's current mission item, confirmed by its MISSION_CURRENT."""
+        for attempt in range(self.command_retries + 1):
+            reports = []
+
+            def current_is_seq(kind, *values):
+                if kind != "mission_current":
+                    return None
+                if values[0] == seq:
+                    return True
+                reports.append(values[0])
+                # one report may already have been on its way; a second means the drone kept its item
+                return False if len(reports) >= 2 else None
+
+            self.links.send(drone_id, self.master.mav.mission_set_current_encode(drone_id, 0, seq))
+            outcome = await self.wait_for_vehicle(drone_id, current_is_seq, self.command_timeout)
+            if outcome:
+                return True
+            if outcome is False:
+                break
+        print(f"Drone {drone_id} did not confirm mission item {seq} as current")
+        return False
 
     async def handle_mission_request(self, drone_id, seq):
-        """Respond to mission requests from the drone."""
-        mission = self.uploading_missions.get(drone_id)
-        print(f"Received mission request {seq} from drone {drone_id}")
-
-        if mission and seq < len(mission["waypoints"]):
-            lat, lon, alt, type = mission["waypoints"][seq]
-            self.send_waypoint(drone_id, seq, lat, lon, alt, type)
-            mission["next_seq"] = seq + 1
-            mission["waiting_for_request"] = False
-        else:
+        """Hand a mission request from the drone to its transfer."""
+        transfer = self.transfers.get(drone_id)
+        if transfer is None:
             print(f"Received unexpected mission request {seq} from drone {drone_id}")
+            return
+        self.loop.call_soon_threadsafe(transfer.on_request, seq)
 
     def send_waypoint(self, drone_id, index, lat, lon, alt, waypoint_type=0):
         """Send a specific waypoint in response to a mission request."""
         
         print(f"Sending waypoint {index} to drone {drone_id}: {lat}, {lon}, {alt}")
         if waypoint_type == 0: # Normal Waypoint
-            self.master.mav.mission_item_int_send(
+            self.links.send(drone_id, self.master.mav.mission_item_int_encode(
                 drone_id,  # Target drone
                 0,  # Target component
                 index,  # Waypoint index
@@ -211,10 +522,10 @@ class Dispatcher:
                 1,  # Auto-continue
                 0, 2.0, 0, 0,  # Empty params
                 int(lat * 1e7), int(lon * 1e7), alt
-            )
+            ))
             print(f"Waypoint {index} sent to drone {drone_id}: {lat}, {lon}, {alt}")
         elif waypoint_type == 1: # Takeoff Command
-            self.master.mav.mission_item_int_send(
+            self.links.send(drone_id, self.master.mav.mission_item_int_encode(
                 drone_id,  # Target drone
                 0,  # Target component
                 index,  # Waypoint index
@@ -226,10 +537,10 @@ class Dispatcher:
                 0, 0,  # Empty params
                 0, #yaw
                 lat, lon, alt
-            )
+            ))
             print(f"Waypoint {index} sent to drone {drone_id}: {lat}, {lon}, {alt}")
         elif waypoint_type == 2: # Loiter turns Command
-            self.master.mav.mission_item_int_send(
+            self.links.send(drone_id, self.master.mav.mission_item_int_encode(
                 drone_id,  # Target drone
                 0,  # Target component
                 index,  # Waypoint index
@@ -242,86 +553,98 @@ class Dispatcher:
                 12, #Radius (m)
                 0,  #NA for copters
                 int(lat * 1e7), int(lon * 1e7), alt
-            )
+            ))
             print(f"Waypoint {index} sent to drone {drone_id}: {lat}, {lon}, {alt}")
 
 
     async def handle_mission_ack(self, drone_id, ack_type):
-        """Handle final mission acknowledgment."""
-        if drone_id in self.unhandled_clears:
-            self.unhandled_clears.remove(drone_id)
-            print(f"Mission cleared for drone {drone_id}.")
+        """Hand a mission acknowledgment from the drone to its transfer."""
+        transfer = self.transfers.get(drone_id)
+        if transfer is None:
+            print(f"Mission acknowledgment from drone {drone_id} with no upload in progress: {ack_type}")
             return
-        if ack_type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
-            print(f"Mission upload to drone {drone_id} completed successfully!")
-            await self.start_mission(drone_id)
-        else:
-            print(f"Mission upload failed for drone {drone_id} with error code {ack_type}")
+        self.loop.call_soon_threadsafe(transfer.on_ack, ack_type)
 
     async def wait_for_arming(self, drone_id, timeout=10):
         """Wait until the drone is armed before continuing."""
         print(f"Waiting for drone {drone_id} to arm...")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            msg = self.master.recv_match(type="HEARTBEAT", blocking=False)
-            if msg and msg.get_srcSystem() == drone_id:
-                if msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED:
-                    print(f"Drone {drone_id} is now armed!")
-                    return True
-            await asyncio.sleep(0.5)
-        print(f"Warning: Drone {drone_id} did not arm within timeout!")
+
+        def armed(kind, *values):
+            if kind == "heartbeat":
+                return True if values[1] & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED else None
+            if kind != "command_ack":
+                return None
+            command, result = values
+            if command == mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM and result != mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+                return result == mavutil.mavlink.MAV_RESULT_ACCEPTED
+            return None
+
+        outcome = await self.wait_for_vehicle(drone_id, armed, timeout)
+        if outcome:
+            print(f"Drone {drone_id} is now armed!")
+            return True
+        if outcome is None:
+            print(f"Warning: Drone {drone_id} did not arm within timeout!")
+        else:
+            print(f"Warning: Drone {drone_id} refused to arm!")
         return False
-    
+
     async def wait_for_mode(self, drone_id, target_mode, timeout=10):
         """Wait until the drone changes to the desired mode."""
         print(f"Waiting for drone {drone_id} to switch to {target_mode} mode...")
-        start_time = time.time()
-        mode_mapping = {
-            "GUIDED": 4,
-            "AUTO": 3,
-            "LOITER": 5,
-            "RTL": 6
-        }
-        target_mode_id = mode_mapping.get(target_mode)
+        target_mode_id = self.MODES.get(target_mode)
         if target_mode_id is None:
             print(f"Invalid target mode: {target_mode}")
             return False
-        
-        while time.time() - start_time < timeout:
-            msg = self.master.recv_match(type="HEARTBEAT", blocking=False)
-            if msg and msg.get_srcSystem() == drone_id:
-                if msg.custom_mode == target_mode_id:
-                    print(f"Drone {drone_id} is now in {target_mode} mode!")
-                    return True
-            await asyncio.sleep(0.5)
-        print(f"Warning: Drone {drone_id} did not switch to {target_mode} mode within timeout!")
+
+        def in_mode(kind, *values):
+            if kind == "heartbeat":
+                return True if values[0] == target_mode_id else None
+            if kind != "command_ack":
+                return None
+            command, result = values
+            if command == mavutil.mavlink.MAV_CMD_DO_SET_MODE and result != mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+                return result == mavutil.mavlink.MAV_RESULT_ACCEPTED
+            return None
+
+        outcome = await self.wait_for_vehicle(drone_id, in_mode, timeout)
+        if outcome:
+            print(f"Drone {drone_id} is now in {target_mode} mode!")
+            return True
+        if outcome is None:
+            print(f"Warning: Drone {drone_id} did not switch to {target_mode} mode within timeout!")
+        else:
+            print(f"Warning: Drone {drone_id} refused to switch to {target_mode} mode!")
+        return False
+
+    async def set_mode(self, drone_id, mode):
+        """Switch the drone's mode and wait for its COMMAND_ACK or heartbeat to confirm it, retrying if neither comes."""
+        for attempt in range(self.command_retries + 1):
+            # retried here rather than by the scheduler, the heartbeat can confirm the mode without an ack
+            self.links.send_command(
+                drone_id, mavutil.mavlink.MAV_CMD_DO_SET_MODE,
+                (mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, self.MODES[mode]), CommandScheduler.SAFETY
+            )
+            if await self.wait_for_mode(drone_id, mode, self.command_timeout):
+                return True
         return False
 
     async def start_mission(self, drone_id, takeoff_altitude=10):
+        """Start the uploaded mission, taking off first if the drone is on the ground. Returns False if it was aborted."""
         drone = self.missionState.get_drone(drone_id)
-        takeoff_altitude = drone.operatingAltitude
         if not drone:
             print(f"Drone {drone_id} not found.")
-            return 
+            return False
+        takeoff_altitude = drone.operatingAltitude
         if drone.system_status == 3: #drone is grounded need to add takeoff
-            await  self.takeoff(drone_id, takeoff_altitude)
-            
-            return
+            return await self.takeoff(drone_id, takeoff_altitude)
         # Set mode to AUTO
-        self.master.mav.set_mode_send(
-            drone_id,
-            mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-            3  # AUTO mode
-        )
-        if not await self.wait_for_mode(drone_id, "AUTO"):
+        if not await self.set_mode(drone_id, "AUTO"):
             print(f"Mission aborted: Drone {drone_id} failed to switch to AUTO mode.")
-            return
+            return False
         # Start the mission
-        self.master.mav.command_long_send(
-            drone_id, 0,
-            mavutil.mavlink.MAV_CMD_MISSION_START,
-            0, 0, 0, 0, 0, 0, 0, 0
-        )
+        self.links.send_command(drone_id, mavutil.mavlink.MAV_CMD_MISSION_START)
+        return True
 
         
     
@@ -329,50 +652,38 @@ class Dispatcher:
     async def takeoff(self, drone_id, altitude):
         """Send the takeoff command to the drone."""
         # Step 1: Set mode to GUIDED
-        self.master.mav.set_mode_send(
-            drone_id,
-            mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-            4  # GUIDED mode
-        )
-        if not await self.wait_for_mode(drone_id, "GUIDED"):
+        if not await self.set_mode(drone_id, "GUIDED"):
             print(f"Mission aborted: Drone {drone_id} failed to switch to GUIDED mode.")
-            return
+            return False
         # Step 2: Arm the drone and wait for confirmation
-        self.master.mav.command_long_send(
-            drone_id, 0,
-            mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
-            0, 1, 21196, 0, 0, 0, 0, 0
-        )
-        if not await self.wait_for_arming(drone_id):
+        for attempt in range(self.command_retries + 1):
+            self.links.send_command(drone_id, mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, (1, 21196))
+            if await self.wait_for_arming(drone_id, self.command_timeout):
+                break
+        else:
             print(f"Mission aborted: Drone {drone_id} failed to arm.")
-            return
+            return False
         
         # Step 3: Takeoff
         drone = self.missionState.get_drone(drone_id)
         if not drone:
             print(f"Drone {drone_id} not found.")
-            return 
-        self.master.mav.command_long_send(
-            drone_id,
-            0,
-            mavutil.mavlink.MAV_CMD_NAV_TAKEOFF,
-            0,
-            0,
-            0,
-            0,
-            0,
-            drone.latitude,
-            drone.longitude,
-            altitude
+            return False
+        self.links.send_command(
+            drone_id, mavutil.mavlink.MAV_CMD_NAV_TAKEOFF,
+            (0, 0, 0, 0, drone.latitude, drone.longitude, altitude)
         )
         self.waiting_for_takeoff.append((drone_id, altitude))
+        return True
     
     async def handle_check_if_takeoff_complete(self, drone_id, rel_alt, target_alt, tolerance=.5):
         """Check if the drone has reached the target altitude after takeoff."""
         if abs(rel_alt - target_alt) <= tolerance:
             print(f"Drone {drone_id} has taken off to the target altitude of {target_alt}m.")
             self.waiting_for_takeoff.remove((drone_id, target_alt))
-            await self.start_mission(drone_id)
+            # Mode changes wait on messages from this receive loop, so they run in the mission loop
+            self.loop.call_soon_threadsafe(self._on_airborne, drone_id)
+            self.loop.call_soon_threadsafe(self._start_mission_task, drone_id, self.start_mission(drone_id))
         else:
             print(f"Drone {drone_id} is still climbing. Current altitude: {rel_alt}m, Target altitude: {target_alt}m.")
         
@@ -385,14 +696,21 @@ class Dispatcher:
             return
 
         print(f"Sending RTL command to drone {drone_id}...")
-        self.master.mav.command_long_send(
-            drone_id,
-            0,  # Target component
-            mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH,
-            0,  # Confirmation
-            0,  # No parameters needed
-            0, 0, 0, 0, 0, 0
+        # jumps every queued mission item, and is resent until the drone acknowledges it
+        rtl = self.links.send_command(
+            drone_id, mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH,
+            priority=CommandScheduler.SAFETY, retries=self.command_retries
         )
+        rtl.add_done_callback(lambda future: self._report_rtl(drone_id, future))
+        return rtl
+
+    def _report_rtl(self, drone_id, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"Warning: Drone {drone_id} never acknowledged RTL: {future.exception()}")
+        elif future.result() != mavutil.mavlink.MAV_RESULT_ACCEPTED:
+            print(f"Warning: Drone {drone_id} refused RTL with result {future.result()}")
     
     def ack(self, keyword):
         """wait for the drone to acknowledge a command"""
@@ -405,7 +723,7 @@ class Dispatcher:
             return
 
         print(f"Requesting mission list from drone {drone_id}...")
-        self.master.mav.mission_request_list_send(drone_id, 0)
+        self.links.send(drone_id, self.master.mav.mission_request_list_encode(drone_id, 0))
 
 
     async def stop_current_mission(self, drone_id):
@@ -413,27 +731,23 @@ class Dispatcher:
         print(f"Stopping current mission for drone {drone_id}...")
 
         # Switch to GUIDED mode (manual control to prevent mission resuming)
-        self.master.mav.set_mode_send(
-            drone_id,
-            mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-            4  # GUIDED mode
-        )
-        
-        if not await self.wait_for_mode(drone_id, "GUIDED"):
+        if not await self.set_mode(drone_id, "GUIDED"):
             print(f"Failed to switch drone {drone_id} to GUIDED mode before mission upload!")
-            return
-
-        # Clear current mission
-        print(f"Clearing current mission for drone {drone_id}...")
-        self.master.mav.mission_clear_all_send(drone_id, 0)
-        self.unhandled_clears.append(drone_id)
+            return False
+        return True
 
-        await asyncio.sleep(1)  # Allow time for mission clearing
+    async def _cancel_mission_tasks(self):
+        tasks = [task for task in self.mission_tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     def shutdown(self):
         """Cleanly stops the background event loop and thread."""
+        asyncio.run_coroutine_threadsafe(self._cancel_mission_tasks(), self.loop).result(timeout=5)
         self.loop.call_soon_threadsafe(self.loop.stop)
         self.mission_thread.join()
+        self.links.close()
     
    
 
@@ -0,0 +1,164 @@
+"""Time from "start search" to every drone airborne, against simulated drones.
+
+Run from the app directory:
+    python -m Dispatcher.benchmark_deploy --drones 6 --waypoints 100 --latency 0.05 --loss 0.02
+"individual" sends each drone's mission with send_mission, as jobs did before, so each drone takes
+off as soon as its own upload lands. "batch" uses deploy_missions, so the drones upload together
+and take off together. Both report time to all airborne and the spread between the first and last takeoff.
+--links tcp udp pty splits the drones across one simulated link of each kind, as with several radios.
+"""
+import argparse
+import asyncio
+import builtins
+import contextlib
+import threading
+import time
+
+from Dispatcher.Dispatcher import Dispatcher
+from Dispatcher.simulated_vehicles import SimulatedSwarm
+
+
+class SimulatedDrone:
+    def __init__(self, drone_id, operatingAltitude):
+        self.drone_id = drone_id
+        self.operatingAltitude = operatingAltitude
+        self.system_status = None
+        self.latitude = None
+        self.longitude = None
+        self.active_job = None
+
+    def get_home(self):
+        return (self.latitude, self.longitude)
+
+
+class DroneTracker:
+    """Minimal stand-in for missionState: keeps the drone fields the dispatcher reads."""
+
+    def __init__(self, operatingAltitude):
+        self.operatingAltitude = operatingAltitude
+        self.drones = {}
+        self.failed_uploads = []
+
+    def get_drone(self, drone_id):
+        return self.drones.get(drone_id)
+
+    def updateDroneStatus(self, drone_id, system_status):
+        self.drones.setdefault(drone_id, SimulatedDrone(drone_id, self.operatingAltitude)).system_status = system_status
+
+    def updateDronePosition(self, drone_id, lat, lon, *args):
+        drone = self.drones.get(drone_id)
+        if drone is not None and drone.latitude is None:
+            drone.latitude, drone.longitude = lat, lon
+
+    def updateDroneTelemetry(self, drone_id, roll, pitch, yaw):
+        pass
+
+    def handle_mission_upload_failed(self, drone_id):
+        self.failed_uploads.append(drone_id)
+
+    def handle_reached_waypoint(self, drone_id, waypoint):
+        pass
+
+    def handle_mission_state_update(self, drone_id, mission_state):
+        pass
+
+
+@contextlib.contextmanager
+def quiet():
+    """The dispatcher prints every waypoint; keep the benchmark output readable."""
+    original = builtins.print
+    builtins.print = lambda *args, **kwargs: None
+    try:
+        yield
+    finally:
+        builtins.print = original
+
+
+def make_missions(num_drones, num_waypoints, origin=(28.6026251, -81.1999887)):
+    return {
+        drone_id: [(origin[0] + 0.0001 * k, origin[1] + 0.0002 * drone_id, 20, 0) for k in range(num_waypoints)]
+        for drone_id in range(1, num_drones + 1)
+    }
+
+
+def start_swarms(args):
+    """One simulated swarm per --links entry, with the drones split between them."""
+    swarms = []
+    first_sysid = 1
+    for i, link in enumerate(args.links):
+        num_drones = args.drones // len(args.links) + (1 if i < args.drones % len(args.links) else 0)
+        swarms.append(SimulatedSwarm(num_drones=num_drones, latency=args.latency, loss=args.loss,
+                                     climb_rate=args.climb_rate, link=link, first_sysid=first_sysid))
+        first_sysid += num_drones
+    return swarms, [swarm.start() for swarm in swarms]
+
+
+def run_mode(mode, args):
+    swarms, connection_strings = start_swarms(args)
+    tracker = DroneTracker(args.altitude)
+    dispatcher = Dispatcher(tracker)
+    if not dispatcher.connect(connection_strings):
+        for swarm in swarms:
+            swarm.stop()
+        raise RuntimeError("Could not connect to the simulated drones")
+    loop = asyncio.new_event_loop()
+    receive_thread = threading.Thread(target=loop.run_until_complete, args=(dispatcher.receive_packets(),), daemon=True)
+    receive_thread.start()
+
+    # wait until every drone has reported its status and home position
+    while len([d for d in tracker.drones.values() if d.latitude is not None]) < args.drones:
+        time.sleep(0.05)
+
+    missions = make_missions(args.drones, args.waypoints)
+    airborne_at = {}
+    deployment = None
+    with quiet():
+        start = time.monotonic()
+        if mode == "batch":
+            deployment = dispatcher.deploy_missions(missions)
+        else:
+            for drone_id, waypoints in missions.items():
+                dispatcher.send_mission(drone_id, waypoints)
+        while len(airborne_at) < args.drones and time.monotonic() - start < args.timeout:
+            now = time.monotonic()
+            for swarm in swarms:
+                for drone_id in swarm.airborne(args.altitude - 0.5):
+                    airborne_at.setdefault(drone_id, now - start)
+            time.sleep(0.01)
+
+    dispatcher.stop_receiving()
+    receive_thread.join(timeout=2)
+    for swarm in swarms:
+        swarm.stop()
+    dispatcher.shutdown()
+    return airborne_at, deployment, tracker.failed_uploads
+
+
+def report(mode, airborne_at, deployment, failed_uploads, num_drones):
+    if len(airborne_at) < num_drones:
+        print(f"{mode:>10}: only {len(airborne_at)}/{num_drones} drones airborne before the timeout "
+              f"(failed uploads: {failed_uploads})")
+        return
+    times = sorted(airborne_at.values())
+    print(f"{mode:>10}: all {num_drones} airborne after {times[-1]:.2f}s, takeoff spread {times[-1] - times[0]:.2f}s")
+    if deployment is not None:
+        for drone_id, drone in deployment.get_progress()["drones"].items():
+            print(f"{'':>12}drone {drone_id}: {drone['items_sent']}/{drone['items']} items sent, {drone['retries']} retries, "
+                  f"upload {drone['upload_latency']:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drones", type=int, default=6)
+    parser.add_argument("--waypoints", type=int, default=100, help="waypoints per drone")
+    parser.add_argument("--latency", type=float, default=0.05, help="one-way link latency in seconds")
+    parser.add_argument("--loss", type=float, default=0.02, help="probability each message is lost")
+    parser.add_argument("--altitude", type=float, default=10, help="takeoff altitude in metres")
+    parser.add_argument("--climb-rate", type=float, default=2.5, help="metres per second")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--links", nargs="+", default=["tcp"], choices=["tcp", "udp", "pty"],
+                        help="one simulated link of each kind listed, the drones split between them")
+    args = parser.parse_args()
+
+    for mode in ("individual", "batch"):
+        report(mode, *run_mode(mode, args), args.drones)
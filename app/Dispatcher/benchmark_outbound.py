@@ -0,0 +1,89 @@
+"""How long an RTL takes to reach drones that are busy uploading missions over a slow link.
+
+Run from the app directory:
+    python -m Dispatcher.benchmark_outbound --drones 6 --waypoints 100 --link-rate 2000
+Every drone gets a mission through deploy_missions on a link paced at --link-rate bytes per second,
+and once the uploads are under way every drone is sent RTL. "priority" uses return_to_launch, which
+queues RTL as a safety command; "fifo" queues the same command behind the mission items, as when
+every send went straight to the link in call order. Reports the time from the RTL call until each
+simulated drone is in RTL, and the throughput the link actually carried.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from pymavlink import mavutil
+
+from Dispatcher.Dispatcher import Dispatcher
+from Dispatcher.benchmark_deploy import DroneTracker, make_missions, quiet
+from Dispatcher.command_scheduler import CommandScheduler
+from Dispatcher.simulated_vehicles import SimulatedSwarm
+
+RTL_MODE = Dispatcher.MODES["RTL"]
+
+
+def run_mode(mode, args):
+    swarm = SimulatedSwarm(num_drones=args.drones, latency=args.latency, loss=0.0)
+    connection_string = swarm.start()
+    tracker = DroneTracker(10)
+    dispatcher = Dispatcher(tracker)
+    if not dispatcher.connect(connection_string, link_rate=args.link_rate):
+        swarm.stop()
+        raise RuntimeError("Could not connect to the simulated drones")
+    loop = asyncio.new_event_loop()
+    receive_thread = threading.Thread(target=loop.run_until_complete, args=(dispatcher.receive_packets(),), daemon=True)
+    receive_thread.start()
+    while len([d for d in tracker.drones.values() if d.latitude is not None]) < args.drones:
+        time.sleep(0.05)
+
+    rtl_at = {}
+    with quiet():
+        deployment = dispatcher.deploy_missions(make_missions(args.drones, args.waypoints))
+        # let the uploads fill the link before calling everyone home
+        while sum(drone["items_sent"] for drone in deployment.get_progress()["drones"].values()) < args.drones * 10:
+            time.sleep(0.01)
+        queued = dispatcher.links.queued()
+        start = time.monotonic()
+        for drone_id in range(1, args.drones + 1):
+            if mode == "priority":
+                dispatcher.return_to_launch(drone_id)
+            else:
+                dispatcher.links.send_command(drone_id, mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH,
+                                              priority=CommandScheduler.MISSION)
+        while len(rtl_at) < args.drones and time.monotonic() - start < args.timeout:
+            now = time.monotonic()
+            for drone_id in swarm.in_mode(RTL_MODE):
+                rtl_at.setdefault(drone_id, now - start)
+            time.sleep(0.002)
+        stats = dispatcher.links.links[0].outbound.get_stats()
+
+        dispatcher.stop_receiving()
+        receive_thread.join(timeout=2)
+        swarm.stop()
+        dispatcher.shutdown()  # reports the cancelled deployment
+    return rtl_at, queued, stats
+
+
+def report(mode, rtl_at, queued, stats, args):
+    if len(rtl_at) < args.drones:
+        print(f"{mode:>10}: only {len(rtl_at)}/{args.drones} drones in RTL before the timeout")
+        return
+    times = sorted(rtl_at.values())
+    print(f"{mode:>10}: {queued} messages queued, RTL reached every drone after {times[-1] * 1000:.0f}ms "
+          f"(median {times[len(times) // 2] * 1000:.0f}ms); "
+          f"link carried {stats['bytes_per_second']:.0f} B/s, longest mission item wait "
+          f"{stats['max_queue_wait']['mission'] * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drones", type=int, default=6)
+    parser.add_argument("--waypoints", type=int, default=100, help="waypoints per drone")
+    parser.add_argument("--latency", type=float, default=0.05, help="one-way link latency in seconds")
+    parser.add_argument("--link-rate", type=float, default=2000, help="outbound bytes per second, e.g. a telemetry radio")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    for mode in ("fifo", "priority"):
+        report(mode, *run_mode(mode, args), args)
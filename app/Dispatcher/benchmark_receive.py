@@ -0,0 +1,139 @@
+"""Compare the old 1 ms polling receive loop with the readiness-driven one.
+
+Run from the app directory:
+    python -m Dispatcher.benchmark_receive --drones 10 --rate 50 --links 3
+With --links N above 1, a third run splits the same drones across N mirrors, each read by its own link worker.
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from Dispatcher.Dispatcher import Dispatcher
+from Dispatcher.mavlink_replay import MavlinkReplayServer
+
+
+class LatencyRecorder:
+    """Minimal stand-in for missionState that timestamps every handled telemetry packet."""
+
+    def __init__(self):
+        self.sent_at = {}
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def on_send(self, sysid, seq, send_time):
+        with self.lock:
+            self.sent_at[(sysid, seq)] = send_time
+
+    def _record(self, drone_id, msg_seq):
+        now = time.perf_counter()
+        with self.lock:
+            sent = self.sent_at.pop((drone_id, msg_seq), None)
+        if sent is not None:
+            self.latencies.append(now - sent)
+
+    def updateDroneStatus(self, drone_id, system_status):
+        pass
+
+    def updateDronePosition(self, drone_id, *args):
+        pass
+
+    def updateDroneTelemetry(self, drone_id, roll, pitch, yaw):
+        pass
+
+    def get_drone(self, drone_id):
+        return None
+
+
+class TimedDispatcher(Dispatcher):
+    """Dispatcher that reports when each message reaches its handler."""
+
+    async def handle_message(self, msg):
+        self.missionState._record(msg.get_srcSystem(), msg.get_seq())
+        await super().handle_message(msg)
+
+
+async def legacy_receive_packets(dispatcher, stop_event):
+    """The receive loop as it was before: non-blocking recv_match with a 1 ms sleep when idle."""
+    while not stop_event.is_set():
+        messages_processed = 0
+        while True:
+            msg = dispatcher.master.recv_match(blocking=False)
+            if not msg:
+                break
+            messages_processed += 1
+            await dispatcher.handle_message(msg)
+        if messages_processed == 0:
+            await asyncio.sleep(0.001)
+
+
+def run_mode(mode, num_drones, rate_hz, active_seconds, idle_seconds, num_links=1):
+    recorder = LatencyRecorder()
+    servers = []
+    for i in range(num_links):
+        share = num_drones // num_links + (1 if i < num_drones % num_links else 0)
+        servers.append(MavlinkReplayServer(port=0, num_drones=share, rate_hz=rate_hz, on_send=recorder.on_send,
+                                           first_sysid=1 + sum(server.num_drones for server in servers)))
+    ports = [server.start() for server in servers]
+
+    dispatcher = TimedDispatcher(recorder)
+    if not dispatcher.connect([f"tcp:127.0.0.1:{port}" for port in ports]):
+        for server in servers:
+            server.stop()
+        raise RuntimeError("Could not connect to the replay server")
+
+    loop = asyncio.new_event_loop()
+    stop_event = threading.Event()
+    if mode == "legacy":
+        receive = legacy_receive_packets(dispatcher, stop_event)
+    else:
+        receive = dispatcher.receive_packets()
+    receive_thread = threading.Thread(target=loop.run_until_complete, args=(receive,), daemon=True)
+    receive_thread.start()
+
+    time.sleep(active_seconds)
+    latencies = list(recorder.latencies)
+
+    for server in servers:
+        server.pause()
+    time.sleep(0.2)  # let in-flight packets drain
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+
+    stop_event.set()
+    dispatcher.stop_receiving()
+    receive_thread.join(timeout=2)
+    for server in servers:
+        server.stop()
+    dispatcher.shutdown()
+
+    return latencies, idle_cpu, dispatcher.get_message_stats()
+
+
+def report(mode, latencies, idle_cpu):
+    if not latencies:
+        print(f"{mode:>8}: no packets handled")
+        return
+    latencies_ms = sorted(x * 1000 for x in latencies)
+    p99 = latencies_ms[int(0.99 * (len(latencies_ms) - 1))]
+    print(f"{mode:>8}: {len(latencies_ms)} packets, latency p50 {statistics.median(latencies_ms):.3f} ms, "
+          f"p99 {p99:.3f} ms, max {latencies_ms[-1]:.3f} ms, idle CPU {idle_cpu * 100:.1f}% of one core")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drones", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=50, help="telemetry rate per drone in Hz")
+    parser.add_argument("--active", type=float, default=5, help="seconds of streaming telemetry")
+    parser.add_argument("--idle", type=float, default=3, help="seconds of silent link for the idle CPU measurement")
+    parser.add_argument("--links", type=int, default=1, help="also split the drones across this many mirrors")
+    args = parser.parse_args()
+
+    runs = [("legacy", 1), ("event", 1)] + ([(f"{args.links} links", args.links)] if args.links > 1 else [])
+    for mode, num_links in runs:
+        latencies, idle_cpu, message_stats = run_mode(mode, args.drones, args.rate, args.active, args.idle, num_links)
+        report(mode, latencies, idle_cpu)
+        for msg_type, stats in message_stats.items():
+            print(f"{'':>10}{msg_type}: {stats['count']} handled, {stats['handler_time'] / stats['count'] * 1e6:.1f} us per message")
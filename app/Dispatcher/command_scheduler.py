@@ -0,0 +1,225 @@
+import collections
+import concurrent.futures
+import threading
+import time
+
+from pymavlink import mavutil
+
+
+class CommandScheduler:
+    """
+    The single writer of messages to the drones.
+
+    Every outbound message is queued per drone at a priority and written by one sender thread, so
+    the GUI, receive and mission threads never race on the encoder's sequence number or the socket,
+    and nothing has to point master.target_system at a drone first. A higher priority always goes
+    first: an RTL or mode change waits for at most the one message already being written, however
+    many mission items are queued. Within a priority the drones take turns and each drone's messages
+    keep their order.
+
+    A token bucket of `rate` bytes per second, holding up to `burst` bytes, paces the link (None
+    leaves it unpaced). SAFETY messages go out even when the bucket is empty and the lower
+    priorities wait for the debt to be paid back, so a busy link slows uploads but never an RTL.
+    Each drone's queue holds at most max_queue messages per priority; past that the oldest is dropped.
+
+    send_command() tracks a COMMAND_LONG until its COMMAND_ACK: the returned Future resolves to the
+    MAV_RESULT, or fails with TimeoutError once `retries` resends (confirmation + 1 each) have gone
+    unanswered for ack_timeout seconds. on_command_ack() must be fed every COMMAND_ACK received.
+    """
+
+    SAFETY = 0  # RTL and mode changes
+    COMMAND = 1  # arming, takeoff, mission start
+    MISSION = 2  # mission protocol
+    PRIORITIES = (SAFETY, COMMAND, MISSION)
+    PRIORITY_NAMES = {SAFETY: "safety", COMMAND: "command", MISSION: "mission"}
+
+    def __init__(self, mav, rate=None, burst=None, max_queue=256, ack_timeout=1.0):
+        self.mav = mav  # pymavlink encoder, writes to the link
+        self.rate = rate
+        self.burst = burst if burst is not None else (rate or 0) / 4  # a quarter second of traffic
+        self.tokens = self.burst
+        self.refilled_at = time.monotonic()
+        self.max_queue = max_queue
+        self.ack_timeout = ack_timeout
+        self.queues = {priority: collections.OrderedDict() for priority in self.PRIORITIES}  # drone_id -> deque
+        self.pending_acks = {}  # (drone_id, command) -> entry waiting for its COMMAND_ACK
+        self.condition = threading.Condition(threading.RLock())  # Future callbacks may queue more messages
+        self.stopped = False
+
+        # stats
+        self.sent = {priority: 0 for priority in self.PRIORITIES}
+        self.sent_bytes = 0
+        self.dropped = 0
+        self.max_wait = {priority: 0.0 for priority in self.PRIORITIES}  # longest time a message sat queued
+        self.acks = 0
+        self.ack_time = 0.0  # summed seconds from first send to COMMAND_ACK
+        self.resends = 0
+        self.ack_timeouts = 0
+        self.started_at = time.monotonic()
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def send(self, drone_id, msg, priority=MISSION):
+        """Queue an encoded message (e.g. mav.mission_item_int_encode(...)) for drone_id. Safe from any thread."""
+        with self.condition:
+            self._enqueue(drone_id, msg, priority)
+
+    def send_command(self, drone_id, command, params=(), priority=COMMAND, retries=0, ack_timeout=None):
+        """Queue a COMMAND_LONG and return a concurrent.futures.Future for its MAV_RESULT."""
+        params = (list(params) + [0] * 7)[:7]
+        msg = self.mav.command_long_encode(drone_id, 0, command, 0, *params)
+        future = concurrent.futures.Future()
+        with self.condition:
+            key = (drone_id, command)
+            previous = self.pending_acks.get(key)
+            # one COMMAND_ACK answers every copy of the same command still in flight
+            futures = previous["futures"] + [future] if previous is not None else [future]
+            self.pending_acks[key] = {
+                "msg": msg, "priority": priority, "futures": futures, "retries": retries,
+                "timeout": ack_timeout or self.ack_timeout, "first_sent": None, "deadline": None,
+            }
+            self._enqueue(drone_id, msg, priority)
+        return future
+
+    def on_command_ack(self, drone_id, command, result):
+        """Resolve the command waiting on this COMMAND_ACK. Safe from any thread."""
+        with self.condition:
+            entry = self.pending_acks.get((drone_id, command))
+            if entry is None:
+                return
+            if result == mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+                entry["deadline"] = time.monotonic() + entry["timeout"]  # still working on it, don't resend
+                return
+            del self.pending_acks[(drone_id, command)]
+            if entry["first_sent"] is not None:
+                self.acks += 1
+                self.ack_time += time.monotonic() - entry["first_sent"]
+        for future in entry["futures"]:
+            future.set_result(result)
+
+    def queued(self, drone_id=None):
+        """Messages waiting to be written, for one drone or all of them."""
+        with self.condition:
+            return sum(len(queue) for queues in self.queues.values()
+                       for key, queue in queues.items() if drone_id is None or key == drone_id)
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            pending = list(self.pending_acks.values())
+            self.pending_acks.clear()
+            self.condition.notify()
+        self.thread.join(timeout=2)
+        for entry in pending:
+            for future in entry["futures"]:
+                future.cancel()
+
+    def _enqueue(self, drone_id, msg, priority):
+        queue = self.queues[priority].setdefault(drone_id, collections.deque())
+        if len(queue) >= self.max_queue:
+            dropped, _ = queue.popleft()
+            self.dropped += 1
+            if dropped.get_type() == "COMMAND_LONG":
+                entry = self.pending_acks.get((drone_id, dropped.command))
+                if entry is not None and entry["msg"] is dropped:
+                    entry["deadline"] = time.monotonic()  # counts as unanswered, resent or failed by _check_acks
+            print(f"Outbound {self.PRIORITY_NAMES[priority]} queue for drone {drone_id} is full, dropped its oldest message")
+        queue.append((msg, time.monotonic()))
+        self.condition.notify()
+
+    def _run(self):
+        """Sender thread: write the most urgent message the bucket allows, otherwise sleep until one is due."""
+        while True:
+            with self.condition:
+                while True:
+                    if self.stopped:
+                        return
+                    now = time.monotonic()
+                    self._check_acks(now)
+                    message, wait = self._next(now)
+                    if message is not None:
+                        break
+                    self.condition.wait(wait)
+            drone_id, priority, msg, queued_at = message
+            try:
+                self.mav.send(msg)
+            except Exception as e:
+                print(f"Failed to send {msg.get_type()} to drone {drone_id}: {e}")
+                continue
+            sent_at = time.monotonic()
+            with self.condition:
+                size = len(msg.get_msgbuf())
+                if self.rate is not None:
+                    self.tokens -= size
+                self.sent[priority] += 1
+                self.sent_bytes += size
+                self.max_wait[priority] = max(self.max_wait[priority], sent_at - queued_at)
+                if msg.get_type() == "COMMAND_LONG":
+                    entry = self.pending_acks.get((drone_id, msg.command))
+                    if entry is not None and entry["msg"] is msg:
+                        if entry["first_sent"] is None:
+                            entry["first_sent"] = sent_at
+                        entry["deadline"] = sent_at + entry["timeout"]
+
+    def _next(self, now):
+        """The (drone_id, priority, msg, queued_at) to write now, or None and how long to sleep."""
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+        for priority in self.PRIORITIES:
+            queues = self.queues[priority]
+            if not queues:
+                continue
+            if priority != self.SAFETY and self.rate is not None and self.tokens <= 0:
+                # a SAFETY message arriving meanwhile notifies the condition and goes first
+                return None, self._wait_for_ack(now, -self.tokens / self.rate)
+            drone_id, queue = next(iter(queues.items()))
+            msg, queued_at = queue.popleft()
+            if queue:
+                queues.move_to_end(drone_id)  # the other drones go next
+            else:
+                del queues[drone_id]
+            return (drone_id, priority, msg, queued_at), None
+        return None, self._wait_for_ack(now, None)
+
+    def _wait_for_ack(self, now, wait):
+        """Shorten wait to the next ack deadline, so a missing COMMAND_ACK is resent on time."""
+        deadlines = [entry["deadline"] for entry in self.pending_acks.values() if entry["deadline"] is not None]
+        if not deadlines:
+            return wait
+        until_deadline = max(0.0, min(deadlines) - now)
+        return until_deadline if wait is None else min(wait, until_deadline)
+
+    def _check_acks(self, now):
+        for key, entry in list(self.pending_acks.items()):
+            if entry["deadline"] is None or entry["deadline"] > now:
+                continue
+            drone_id, command = key
+            if entry["retries"] <= 0:
+                del self.pending_acks[key]
+                self.ack_timeouts += 1
+                for future in entry["futures"]:
+                    future.set_exception(TimeoutError(f"drone {drone_id} did not acknowledge command {command}"))
+                continue
+            entry["retries"] -= 1
+            entry["deadline"] = None  # restarts when the resend is written
+            entry["msg"].confirmation = min(entry["msg"].confirmation + 1, 255)
+            self.resends += 1
+            self._enqueue(drone_id, entry["msg"], entry["priority"])
+
+    def get_stats(self):
+        with self.condition:
+            elapsed = time.monotonic() - self.started_at
+            return {
+                "sent": {self.PRIORITY_NAMES[p]: count for p, count in self.sent.items()},
+                "bytes_per_second": self.sent_bytes / elapsed if elapsed > 0 else 0.0,
+                "max_queue_wait": {self.PRIORITY_NAMES[p]: wait for p, wait in self.max_wait.items()},
+                "queued": sum(len(queue) for queues in self.queues.values() for queue in queues.values()),
+                "dropped": self.dropped,
+                "acks": self.acks,
+                "mean_ack_time": self.ack_time / self.acks if self.acks else None,
+                "resends": self.resends,
+                "ack_timeouts": self.ack_timeouts,
+                "pending_acks": len(self.pending_acks),
+            }
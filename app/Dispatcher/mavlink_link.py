@@ -0,0 +1,193 @@
+import select
+import threading
+import time
+
+from pymavlink import mavutil
+
+from Dispatcher.command_scheduler import CommandScheduler
+
+
+class MavlinkLink:
+    """
+    One MAVLink connection (TCP, UDP or serial) with its own receive worker and outbound scheduler.
+
+    The worker thread waits for the link to be readable, parses everything buffered in one pass and
+    hands each batch to deliver(link, batch); a None batch means the link closed. Each link has its
+    own CommandScheduler, so its token bucket paces only the traffic that goes out on it.
+    """
+
+    def __init__(self, connection_string, link_rate=None, baud=57600, reader_timeout=0.5, read_chunk_size=65536):
+        self.connection_string = connection_string
+        self.name = connection_string
+        self.link_rate = link_rate  # outbound bytes per second, None for serial links to follow the baud rate
+        self.baud = baud
+        self.reader_timeout = reader_timeout  # seconds the worker blocks before re-checking for shutdown
+        self.read_chunk_size = read_chunk_size  # bytes pulled from the link per readiness event
+        self.connection = None
+        self.outbound = None
+        self.stream = False  # TCP: an empty read means the peer closed; UDP and serial just had nothing
+        self.deliver = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.messages = 0
+        self.batches = 0
+        self.parse_time = 0.0
+
+    def connect(self, heartbeat_timeout=None):
+        """Open the link and wait for a heartbeat. Returns False if either fails."""
+        try:
+            self.connection = mavutil.mavlink_connection(self.connection_string, baud=self.baud, mavlink_version="2.0")
+            if self.connection.wait_heartbeat(timeout=heartbeat_timeout) is None:
+                print(f"No heartbeat on MAVLink link {self.name}")
+                self.close()
+                return False
+        except Exception as e:
+            print(f"Error connecting to MAVLink link {self.name}: {e}")
+            self.close()
+            return False
+        self.stream = isinstance(self.connection, (mavutil.mavtcp, mavutil.mavtcpin))
+        rate = self.link_rate
+        if rate is None and isinstance(self.connection, mavutil.mavserial):
+            rate = self.connection.baud / 10  # 8N1 puts ten bits on the wire per byte
+        self.outbound = CommandScheduler(self.connection.mav, rate=rate)
+        return True
+
+    def start(self, deliver):
+        """Start the receive worker; deliver(link, batch) is called on the worker thread."""
+        self.deliver = deliver
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._receive_worker, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2 * self.reader_timeout)
+        self.thread = None
+
+    def close(self):
+        self.stop()
+        if self.outbound is not None:
+            self.outbound.stop()
+        if self.connection is not None:
+            self.connection.close()
+
+    def _receive_worker(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.connection.fd is None:
+                    # Links without a selectable descriptor (e.g. serial on Windows) fall back to a blocking read
+                    msg = self.connection.recv_match(blocking=True, timeout=self.reader_timeout)
+                    batch = [msg] if msg else []
+                else:
+                    readable, _, _ = select.select([self.connection.fd], [], [], self.reader_timeout)
+                    if not readable:
+                        continue
+                    batch = self.read_available()
+                    if batch is None:
+                        print(f"MAVLink link {self.name} closed.")
+                        break
+                if batch:
+                    self.messages += len(batch)
+                    self.batches += 1
+                    self.deliver(self, batch)
+        except Exception as e:
+            if not self.stop_event.is_set():
+                print(f"MAVLink reader error on {self.name}: {e}")
+        finally:
+            self.deliver(self, None)
+
+    def read_available(self):
+        """Read everything buffered on the link and parse every complete frame in one pass.
+
+        Returns None when the peer has closed the connection."""
+        data = self.connection.recv(self.read_chunk_size)
+        if not data:
+            return None if self.stream else []
+        start = time.perf_counter()
+        if self.connection.first_byte:
+            self.connection.auto_mavlink_version(data)
+        messages = self.connection.mav.parse_buffer(data) or []
+        for msg in messages:
+            self.connection.post_message(msg)  # Keeps pymavlink's per-system state and loss counters up to date
+        self.parse_time += time.perf_counter() - start
+        return messages
+
+    def get_stats(self):
+        return {
+            "messages": self.messages,
+            "batches": self.batches,
+            "parse_time": self.parse_time,
+            "outbound": self.outbound.get_stats() if self.outbound is not None else None,
+        }
+
+
+class LinkRouter:
+    """
+    The Dispatcher's MAVLink links, and which of them reaches each drone.
+
+    A drone is routed to the first link it is heard on (drones not heard yet go out on the first
+    link) and stays there while that link keeps hearing it. It only moves to another link once its
+    own has been silent for route_timeout seconds, so a vehicle heard on two links at once (a radio
+    and a GCS mirror forwarding it) doesn't flip between them on every message. send/send_command
+    take the same arguments as CommandScheduler's and go to that link's scheduler, so callers
+    address drones and never pick a link themselves.
+    """
+
+    def __init__(self, route_timeout=3.0):
+        self.links = []
+        self.routes = {}  # sysid -> MavlinkLink
+        self.route_timeout = route_timeout  # seconds; three missed 1 Hz heartbeats
+        self.heard_at = {}  # sysid -> when its routed link last heard it
+
+    def add(self, link):
+        self.links.append(link)
+
+    def route(self, sysid, link, now=None):
+        """Note that sysid was heard on link; called for every received message."""
+        now = time.monotonic() if now is None else now
+        current = self.routes.get(sysid)
+        if current is not link:
+            if current is not None and now - self.heard_at[sysid] < self.route_timeout:
+                return  # its current link still hears it
+            if current is not None:
+                print(f"Drone {sysid} is now heard on {link.name}")
+            self.routes[sysid] = link
+        self.heard_at[sysid] = now
+
+    def link_for(self, drone_id):
+        link = self.routes.get(drone_id)
+        if link is None:
+            if not self.links:
+                raise RuntimeError("MAVLink is not connected")
+            link = self.links[0]
+        return link
+
+    def send(self, drone_id, msg, priority=CommandScheduler.MISSION):
+        self.link_for(drone_id).outbound.send(drone_id, msg, priority)
+
+    def send_command(self, drone_id, command, params=(), priority=CommandScheduler.COMMAND, retries=0, ack_timeout=None):
+        return self.link_for(drone_id).outbound.send_command(drone_id, command, params, priority, retries, ack_timeout)
+
+    def on_command_ack(self, drone_id, command, result):
+        # the command may have gone out on the drone's previous link
+        for link in self.links:
+            link.outbound.on_command_ack(drone_id, command, result)
+
+    def queued(self, drone_id=None):
+        return sum(link.outbound.queued(drone_id) for link in self.links)
+
+    def get_stats(self):
+        """Per link: messages received, batches, seconds parsing, the drones routed to it and its outbound stats."""
+        stats = {}
+        for link in self.links:
+            stats[link.name] = link.get_stats()
+            stats[link.name]["drones"] = sorted(sysid for sysid, routed in self.routes.items() if routed is link)
+        return stats
+
+    def close(self):
+        for link in self.links:
+            link.close()
+        self.links = []
+        self.routes = {}
+        self.heard_at = {}
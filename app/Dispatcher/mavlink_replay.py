@@ -0,0 +1,168 @@
+import argparse
+import math
+import socket
+import threading
+import time
+
+from pymavlink import mavutil
+
+
+class MavlinkReplayServer:
+    """Local stand-in for the Mission Planner TCP mirror.
+
+    Listens like Mission Planner's "TCP Host - 14550" mirror and streams either a recorded
+    telemetry log (.tlog) or synthetic swarm telemetry to the first client that connects.
+    """
+
+    def __init__(self, host="127.0.0.1", port=14550, num_drones=4, rate_hz=10, tlog_path=None, speed=1.0, on_send=None,
+                 first_sysid=1):
+        self.host = host
+        self.port = port
+        self.num_drones = num_drones
+        self.first_sysid = first_sysid
+        self.rate_hz = rate_hz
+        self.tlog_path = tlog_path
+        self.speed = speed
+        self.on_send = on_send  # optional callback(sysid, seq, send_time), called just before the bytes go out
+        self.streaming = threading.Event()  # cleared to keep the link open but silent (idle measurements)
+        self.streaming.set()
+        self.stop_event = threading.Event()
+        self.client = None
+        self.listen_socket = None
+        self.thread = None
+        self.encoders = {}
+
+    def start(self):
+        self.listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listen_socket.bind((self.host, self.port))
+        self.listen_socket.listen(1)
+        self.port = self.listen_socket.getsockname()[1]  # resolves port 0 to the assigned port
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.stop_event.set()
+        if self.listen_socket:
+            self.listen_socket.close()
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.client:
+            self.client.close()
+
+    def pause(self):
+        self.streaming.clear()
+
+    def resume(self):
+        self.streaming.set()
+
+    def _serve(self):
+        try:
+            self.client, addr = self.listen_socket.accept()
+        except OSError:
+            return
+        self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        print(f"Replay client connected from {addr}")
+        try:
+            if self.tlog_path:
+                self._replay_tlog()
+            else:
+                self._stream_synthetic()
+        except OSError:
+            print("Replay client disconnected")
+
+    def _pack(self, sysid, sent, msg):
+        """Pack one message and remember its (sysid, seq) for on_send."""
+        mav = self._encoder(sysid)
+        buf = msg.pack(mav)
+        mav.seq = (mav.seq + 1) % 256  # pack() does not advance the sequence number, only send() does
+        sent.append((sysid, msg.get_seq()))
+        return buf
+
+    def _encoder(self, sysid):
+        if sysid not in self.encoders:
+            self.encoders[sysid] = mavutil.mavlink.MAVLink(None, srcSystem=sysid, srcComponent=1)
+        return self.encoders[sysid]
+
+    def _stream_synthetic(self):
+        """Each drone flies a small circle; one burst per tick carries every drone's telemetry."""
+        period = 1.0 / self.rate_hz
+        tick = 0
+        next_tick = time.perf_counter()
+        while not self.stop_event.is_set():
+            if not self.streaming.is_set():
+                self.streaming.wait(0.1)
+                next_tick = time.perf_counter()
+                continue
+            burst = bytearray()
+            sent = []
+            for sysid in range(self.first_sysid, self.first_sysid + self.num_drones):
+                mav = self._encoder(sysid)
+                t = tick * period
+                if tick % max(1, int(self.rate_hz)) == 0:
+                    burst += self._pack(sysid, sent, mav.heartbeat_encode(
+                        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+                        mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, 4, mavutil.mavlink.MAV_STATE_ACTIVE))
+                angle = 0.2 * t + sysid
+                lat = 28.6026251 + 0.0005 * math.cos(angle)
+                lon = -81.1999887 + 0.0005 * math.sin(angle)
+                burst += self._pack(sysid, sent, mav.global_position_int_encode(
+                    int(t * 1000), int(lat * 1e7), int(lon * 1e7), 30000, 20000,
+                    int(500 * math.cos(angle)), int(500 * math.sin(angle)), 0,
+                    int(math.degrees(angle) * 100) % 36000))
+                burst += self._pack(sysid, sent, mav.attitude_encode(int(t * 1000), 0.05 * math.sin(t), 0.05 * math.cos(t), angle % (2 * math.pi), 0, 0, 0))
+            if self.on_send is not None:
+                send_time = time.perf_counter()
+                for sysid, seq in sent:
+                    self.on_send(sysid, seq, send_time)
+            self.client.sendall(burst)
+            tick += 1
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _replay_tlog(self):
+        """Re-send a recorded telemetry log with its original inter-message timing."""
+        log = mavutil.mavlink_connection(self.tlog_path)
+        first_log_time = None
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            msg = log.recv_match()
+            if msg is None:
+                break
+            if msg.get_type() == "BAD_DATA":
+                continue
+            if first_log_time is None:
+                first_log_time = msg._timestamp
+            delay = (msg._timestamp - first_log_time) / self.speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            self.streaming.wait()
+            if self.on_send is not None:
+                self.on_send(msg.get_srcSystem(), msg.get_seq(), time.perf_counter())
+            self.client.sendall(msg.get_msgbuf())
+        print("Replay finished")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve MAVLink telemetry on a local TCP port in place of Mission Planner.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=14550)
+    parser.add_argument("--drones", type=int, default=4, help="number of synthetic drones")
+    parser.add_argument("--rate", type=float, default=10, help="telemetry rate per drone in Hz")
+    parser.add_argument("--tlog", default=None, help="replay this telemetry log instead of synthetic data")
+    parser.add_argument("--speed", type=float, default=1.0, help="tlog playback speed multiplier")
+    args = parser.parse_args()
+
+    server = MavlinkReplayServer(args.host, args.port, args.drones, args.rate, args.tlog, args.speed)
+    server.start()
+    print(f"Serving MAVLink on tcp:{args.host}:{server.port}")
+    try:
+        while server.thread.is_alive():
+            server.thread.join(timeout=1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
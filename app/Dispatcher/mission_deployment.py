@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+
+class MissionDeployment:
+    """
+    Missions for several drones, uploaded at the same time and launched together.
+
+    Every drone switches to GUIDED and uploads at once. The drones whose mission was accepted are
+    launched together once every upload has finished, so one slow link no longer staggers the whole
+    takeoff. get_progress() can be polled from any thread while the deployment runs.
+    """
+
+    WAITING = "waiting"
+    SWITCHING_MODE = "switching mode"
+    UPLOADING = "uploading"
+    UPLOADED = "uploaded"
+    LAUNCHING = "launching"
+    TAKING_OFF = "taking off"
+    AIRBORNE = "airborne"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, missions):
+        self.missions = missions  # drone_id -> waypoints
+        self.phases = {drone_id: self.WAITING for drone_id in missions}
+        self.transfers = {}  # drone_id -> MissionTransfer
+        self.airborne_at = {}
+        self.started_at = time.monotonic()
+        self.uploads_done = asyncio.Event()  # created before the mission loop runs it; binds to that loop on first wait
+        self.finished = threading.Event()  # every drone is airborne, failed or cancelled
+        self.lock = threading.Lock()
+
+    def set_phase(self, drone_id, phase):
+        with self.lock:
+            self.phases[drone_id] = phase
+            if phase == self.AIRBORNE:
+                self.airborne_at.setdefault(drone_id, time.monotonic())
+            self._check_progress()
+
+    def set_transfer(self, drone_id, transfer):
+        with self.lock:
+            self.transfers[drone_id] = transfer
+
+    def mark_airborne(self, drone_id):
+        """Called when a drone in this deployment reaches its takeoff altitude."""
+        if self.phases.get(drone_id) == self.TAKING_OFF:
+            self.set_phase(drone_id, self.AIRBORNE)
+
+    def _check_progress(self):
+        phases = self.phases.values()
+        if all(phase not in (self.WAITING, self.SWITCHING_MODE, self.UPLOADING) for phase in phases):
+            self.uploads_done.set()  # set_phase is only called on the mission loop
+        if all(phase in (self.AIRBORNE, self.FAILED, self.CANCELLED) for phase in phases):
+            self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def get_progress(self):
+        with self.lock:
+            drones = {}
+            for drone_id, phase in self.phases.items():
+                transfer = self.transfers.get(drone_id)
+                progress = transfer.get_progress() if transfer is not None else {}
+                airborne_at = self.airborne_at.get(drone_id)
+                drones[drone_id] = {
+                    "phase": phase,
+                    "items": progress.get("items", len(self.missions[drone_id]) + 1),
+                    "items_sent": progress.get("items_sent", 0),
+                    "acks": progress.get("acks", 0),
+                    "retries": progress.get("retries", 0),
+                    "upload_latency": progress.get("latency"),
+                    "time_to_airborne": airborne_at - self.started_at if airborne_at is not None else None,
+                }
+        return {"elapsed": time.monotonic() - self.started_at, "finished": self.finished.is_set(), "drones": drones}
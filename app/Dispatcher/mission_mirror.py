@@ -0,0 +1,61 @@
+from collections import namedtuple
+
+# kind is one of MissionMirror.SET_CURRENT / PARTIAL / FULL; start and end are item indices (end inclusive)
+MissionUpdate = namedtuple("MissionUpdate", ["kind", "start", "end"])
+
+
+class MissionMirror:
+    """
+    The mission each drone's autopilot holds, as far as the Dispatcher knows, and the cheapest way
+    to turn it into a new one.
+
+    A mission is the list of items sent to the drone, home/takeoff first. A drone's entry is only
+    set once the drone has accepted an upload, and is dropped whenever its mission may have changed
+    behind our back (an upload in progress or failed, or a count that doesn't match).
+
+    Only the last accepted mission is known. A job resumed straight after a pause or a requeue can
+    skip the upload, but after an interrupting job (e.g. a POI investigation) the drone holds that
+    job's mission instead, so resuming the interrupted one is a full upload again.
+    """
+
+    SET_CURRENT = "set current"  # the drone already holds these items from start on
+    PARTIAL = "partial"  # same length, rewrite items start..end
+    FULL = "full"
+
+    def __init__(self):
+        self.missions = {}  # drone_id -> list of items
+
+    def get(self, drone_id):
+        return self.missions.get(drone_id)
+
+    def set(self, drone_id, items):
+        self.missions[drone_id] = list(items)
+
+    def invalidate(self, drone_id):
+        self.missions.pop(drone_id, None)
+
+    def check_count(self, drone_id, count):
+        """Forget the drone's mission if it reports a different number of items than we think it holds."""
+        mission = self.missions.get(drone_id)
+        if mission is not None and len(mission) != count:
+            print(f"Drone {drone_id} holds {count} mission items, expected {len(mission)}; will re-upload next time")
+            self.invalidate(drone_id)
+
+    def plan(self, drone_id, items, partial_write=False):
+        """Smallest change that leaves the drone flying items from their first waypoint."""
+        current = self.missions.get(drone_id)
+        if current is None or not items or current[0] != items[0]:
+            return MissionUpdate(self.FULL, 0, len(items) - 1)
+
+        # resuming: the new waypoints are the tail of the mission already on board
+        offset = len(current) - len(items) + 1
+        if len(items) > 1 and offset >= 1 and current[offset:] == items[1:]:
+            return MissionUpdate(self.SET_CURRENT, offset, len(current) - 1)
+
+        if current == items:
+            return MissionUpdate(self.SET_CURRENT, 0, len(current) - 1)  # e.g. a single-item mission sent again
+
+        if partial_write and len(current) == len(items):
+            changed = [i for i, (old, new) in enumerate(zip(current, items)) if old != new]
+            return MissionUpdate(self.PARTIAL, changed[0], changed[-1])
+        return MissionUpdate(self.FULL, 0, len(items) - 1)
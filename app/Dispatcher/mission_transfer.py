@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from pymavlink import mavutil
+
+
+class MissionTransfer:
+    """
+    One mission upload to one drone, driven by the MISSION_REQUEST(_INT) and MISSION_ACK messages
+    the drone sends back rather than by fixed sleeps.
+
+    run() sends MISSION_COUNT, answers every item request as soon as it arrives and finishes on the
+    final MISSION_ACK. If a step hears nothing back it resends whatever the drone should be
+    answering (the count, or the last item), and it gives up after `retries` silent steps in a row.
+    How long a step waits follows the drone's measured reply time, between min_timeout and timeout,
+    so a lost packet on a fast link costs a fraction of a second. Several transfers can run at once
+    on the same event loop, one per drone.
+
+    With start > 0 only items start..count-1 are exchanged, for a MISSION_WRITE_PARTIAL_LIST that
+    rewrites part of the mission already on board.
+
+    send_count(count) opens the exchange (MISSION_COUNT or MISSION_WRITE_PARTIAL_LIST) and send_item(seq)
+    answers a request. on_request/on_ack must be called on the loop running run(); the Dispatcher
+    hands them over with call_soon_threadsafe.
+    """
+
+    SENDING_COUNT = "sending count"
+    SENDING_ITEMS = "sending items"
+    WAITING_ACK = "waiting for ack"
+    ACCEPTED = "accepted"
+    FAILED = "failed"
+
+    def __init__(self, drone_id, count, send_count, send_item, timeout=1.5, retries=3, min_timeout=0.25, start=0):
+        self.drone_id = drone_id
+        self.count = count
+        self.start = start
+        self.send_count = send_count
+        self.send_item = send_item
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.retries = retries
+        self.reply_time = None  # smoothed seconds between a send and the drone's answer
+        self.sent_at = None
+        self.events = asyncio.Queue()
+        self.state = None
+        self.last_sent = start - 1
+        self.error = None
+
+        # progress
+        self.items_sent = 0
+        self.acks = 0
+        self.retries_used = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def on_request(self, seq):
+        self.events.put_nowait(("request", seq))
+
+    def on_ack(self, ack_type):
+        self.events.put_nowait(("ack", ack_type))
+
+    async def run(self):
+        """Upload the mission. Returns True once the drone has accepted it."""
+        self.started_at = time.monotonic()
+        self.state = self.SENDING_COUNT
+        self.send_count(self.count)
+        self.sent_at = time.monotonic()
+        silent_steps = 0
+        while self.state not in (self.ACCEPTED, self.FAILED):
+            try:
+                kind, value = await asyncio.wait_for(self.events.get(), self.step_timeout())
+            except asyncio.TimeoutError:
+                silent_steps += 1
+                if silent_steps > self.retries:
+                    self._finish(self.FAILED, f"no reply while {self.state} after {self.retries} retries")
+                    break
+                self.retries_used += 1
+                self._resend()
+                self.sent_at = None  # no reply time from a resend, the answer may be to the original
+                continue
+
+            if kind == "request":
+                if not self.start <= value < self.count:
+                    print(f"Drone {self.drone_id} requested mission item {value} of {self.count}, ignoring")
+                    continue
+                silent_steps = 0
+                self._measure_reply()
+                if value <= self.last_sent:
+                    self.retries_used += 1  # the drone missed an item and asked again
+                self.send_item(value)
+                self.sent_at = time.monotonic()
+                self.items_sent += 1
+                self.last_sent = value
+                self.state = self.WAITING_ACK if value == self.count - 1 else self.SENDING_ITEMS
+            elif kind == "ack":
+                self.acks += 1
+                if value != mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                    self._finish(self.FAILED, f"drone rejected the mission with error code {value}")
+                elif self.state == self.WAITING_ACK:
+                    self._finish(self.ACCEPTED)
+                # an ACCEPTED ack before every item went out is left over from an earlier exchange
+        return self.state == self.ACCEPTED
+
+    def step_timeout(self):
+        if self.reply_time is None:
+            return self.timeout
+        return min(self.timeout, max(self.min_timeout, 4 * self.reply_time))
+
+    def _measure_reply(self):
+        if self.sent_at is None:
+            return
+        elapsed = time.monotonic() - self.sent_at
+        self.reply_time = elapsed if self.reply_time is None else 0.875 * self.reply_time + 0.125 * elapsed
+
+    def _resend(self):
+        if self.state == self.SENDING_COUNT:
+            print(f"No mission request from drone {self.drone_id}, resending MISSION_COUNT")
+            self.send_count(self.count)
+        else:
+            print(f"Drone {self.drone_id} went quiet after item {self.last_sent}, resending it")
+            self.send_item(self.last_sent)
+            self.items_sent += 1
+
+    def _finish(self, state, error=None):
+        self.state = state
+        self.error = error
+        self.finished_at = time.monotonic()
+
+    def get_progress(self):
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return {
+            "state": self.state,
+            "items": self.count - self.start,
+            "items_sent": self.items_sent,
+            "acks": self.acks,
+            "retries": self.retries_used,
+            "latency": end - self.started_at if self.started_at is not None else None,
+            "reply_time": self.reply_time,
+            "error": self.error,
+        }
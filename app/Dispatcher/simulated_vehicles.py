@@ -0,0 +1,294 @@
+import heapq
+import math
+import os
+import random
+import select
+import socket
+import threading
+import time
+import tty
+
+from pymavlink import mavutil
+
+mavlink = mavutil.mavlink
+
+
+class SimulatedVehicle:
+    """Just enough of an ArduCopter for the dispatcher: modes, arming, takeoff and mission upload."""
+
+    def __init__(self, sysid, lat, lon, climb_rate):
+        self.sysid = sysid
+        self.lat = lat
+        self.lon = lon
+        self.climb_rate = climb_rate
+        self.mode = 5  # LOITER
+        self.armed = False
+        self.altitude = 0.0  # metres above home
+        self.target_altitude = None
+        self.mission = []
+        self.mission_current = 0
+        self.mission_count = None  # items announced by the MISSION_COUNT being uploaded
+        self.partial_write = None  # (next item, last item) of a MISSION_WRITE_PARTIAL_LIST in progress
+        self.encoder = mavlink.MAVLink(None, srcSystem=sysid, srcComponent=1)
+
+    @property
+    def system_status(self):
+        return mavlink.MAV_STATE_ACTIVE if self.altitude > 0.5 else mavlink.MAV_STATE_STANDBY
+
+    def heartbeat(self):
+        base_mode = mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+        if self.armed:
+            base_mode |= mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+        return self.encoder.heartbeat_encode(mavlink.MAV_TYPE_QUADROTOR, mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+                                             base_mode, self.mode, self.system_status)
+
+    def position(self, time_boot_ms):
+        return self.encoder.global_position_int_encode(time_boot_ms, int(self.lat * 1e7), int(self.lon * 1e7),
+                                                       int(self.altitude * 1000), int(self.altitude * 1000), 0, 0, 0, 0)
+
+    def current(self):
+        if "total" not in mavlink.MAVLink_mission_current_message.fieldnames:
+            return self.encoder.mission_current_encode(self.mission_current)  # MAVLink 1 dialect
+        # like ArduPilot, the total leaves out the home item
+        return self.encoder.mission_current_encode(self.mission_current, max(len(self.mission) - 1, 0))
+
+    def step(self, dt):
+        if self.target_altitude is not None and self.altitude < self.target_altitude:
+            self.altitude = min(self.target_altitude, self.altitude + self.climb_rate * dt)
+
+    def handle(self, msg):
+        """Replies to one message addressed to this vehicle."""
+        msg_type = msg.get_type()
+        if msg_type == "COMMAND_LONG":
+            return self._handle_command(msg)
+        if msg_type == "SET_MODE":
+            self.mode = msg.custom_mode
+            return [self.heartbeat()]
+        if msg_type == "MISSION_CLEAR_ALL":
+            self.mission = []
+            return [self.encoder.mission_ack_encode(255, 0, mavlink.MAV_MISSION_ACCEPTED)]
+        if msg_type == "MISSION_COUNT":
+            self.mission_count = msg.count
+            self.partial_write = None
+            self.mission = []
+            self.mission_current = 0
+            return [self.encoder.mission_request_int_encode(255, 0, 0)]
+        if msg_type == "MISSION_WRITE_PARTIAL_LIST":
+            if not 0 < msg.start_index <= msg.end_index < len(self.mission):
+                return [self.encoder.mission_ack_encode(255, 0, mavlink.MAV_MISSION_ERROR)]
+            self.partial_write = [msg.start_index, msg.end_index]
+            return [self.encoder.mission_request_int_encode(255, 0, msg.start_index)]
+        if msg_type in ("MISSION_ITEM_INT", "MISSION_ITEM") and self.partial_write is not None:
+            if msg.seq == self.partial_write[0]:
+                self.mission[msg.seq] = msg
+                self.partial_write[0] += 1
+            if self.partial_write[0] <= self.partial_write[1]:
+                return [self.encoder.mission_request_int_encode(255, 0, self.partial_write[0])]
+            self.partial_write = None
+            return [self.encoder.mission_ack_encode(255, 0, mavlink.MAV_MISSION_ACCEPTED)]
+        if msg_type == "MISSION_SET_CURRENT":
+            if msg.seq < len(self.mission):
+                self.mission_current = msg.seq
+            return [self.current()]
+        if msg_type in ("MISSION_ITEM_INT", "MISSION_ITEM") and self.mission_count is not None:
+            if msg.seq == len(self.mission):
+                self.mission.append(msg)
+            if len(self.mission) < self.mission_count:
+                # asks again for the item it is missing if this one was out of order
+                return [self.encoder.mission_request_int_encode(255, 0, len(self.mission))]
+            self.mission_count = None
+            return [self.encoder.mission_ack_encode(255, 0, mavlink.MAV_MISSION_ACCEPTED)]
+        return []
+
+    def _handle_command(self, msg):
+        result = mavlink.MAV_RESULT_ACCEPTED
+        if msg.command == mavlink.MAV_CMD_DO_SET_MODE:
+            self.mode = int(msg.param2)
+        elif msg.command == mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
+            self.armed = msg.param1 == 1
+        elif msg.command == mavlink.MAV_CMD_NAV_TAKEOFF:
+            if self.armed and self.mode == 4:
+                self.target_altitude = msg.param7
+            else:
+                result = mavlink.MAV_RESULT_FAILED
+        elif msg.command == mavlink.MAV_CMD_MISSION_START:
+            if not self.mission:
+                result = mavlink.MAV_RESULT_FAILED
+        elif msg.command == mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH:
+            self.mode = 6
+        return [self.encoder.command_ack_encode(msg.command, result), self.heartbeat()]
+
+
+class SimulatedSwarm:
+    """Simulated drones behind one local link, standing in for a Mission Planner mirror or a radio.
+
+    link is "tcp" (a server like Mission Planner's TCP mirror), "udp" (sends to a dispatcher
+    listening on udpin, like SITL's --out) or "pty" (a pseudo-terminal the dispatcher opens as a
+    serial port). start() returns the connection string for Dispatcher.connect. Vehicles answer
+    commands and the mission protocol like ArduCopter. Every message in either direction is delayed
+    by `latency` seconds and dropped with probability `loss`, to look like a radio link.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, num_drones=4, rate_hz=5, latency=0.0, loss=0.0, climb_rate=2.5,
+                 origin=(28.6026251, -81.1999887), link="tcp", first_sysid=1):
+        self.host = host
+        self.port = port
+        self.link = link
+        self.rate_hz = rate_hz
+        self.latency = latency
+        self.loss = loss
+        self.vehicles = {
+            sysid: SimulatedVehicle(sysid, origin[0] + 0.0002 * sysid, origin[1], climb_rate)
+            for sysid in range(first_sysid, first_sysid + num_drones)
+        }
+        self.lock = threading.Lock()  # vehicles are touched by the receive and telemetry threads
+        self.outbox = []  # heap of (due time, order, bytes)
+        self.outbox_ready = threading.Condition()
+        self.order = 0
+        self.stop_event = threading.Event()
+        self.listen_socket = None
+        self.client = None  # TCP connection or UDP socket
+        self.pty_fds = None  # (controller, terminal) file descriptors of the pseudo-terminal
+        self.threads = []
+
+    def start(self):
+        """Open the link and return the connection string the dispatcher should use."""
+        if self.link == "udp":
+            if not self.port:
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                    probe.bind((self.host, 0))
+                    self.port = probe.getsockname()[1]  # a free port for the dispatcher to listen on
+            self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.client.bind((self.host, 0))
+            connection_string = f"udpin:{self.host}:{self.port}"
+            target = self._receive_loop
+        elif self.link == "pty":
+            self.pty_fds = os.openpty()
+            tty.setraw(self.pty_fds[1])  # no echo or line editing before the dispatcher opens it
+            connection_string = os.ttyname(self.pty_fds[1])
+            target = self._receive_loop
+        else:
+            self.listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.listen_socket.bind((self.host, self.port))
+            self.listen_socket.listen(1)
+            self.port = self.listen_socket.getsockname()[1]  # resolves port 0 to the assigned port
+            connection_string = f"tcp:{self.host}:{self.port}"
+            target = self._serve
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        return connection_string
+
+    def stop(self):
+        self.stop_event.set()
+        with self.outbox_ready:
+            self.outbox_ready.notify()
+        if self.listen_socket:
+            self.listen_socket.close()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        if self.client:
+            self.client.close()
+        if self.pty_fds:
+            for fd in self.pty_fds:
+                os.close(fd)
+
+    def airborne(self, altitude):
+        with self.lock:
+            return [sysid for sysid, vehicle in self.vehicles.items() if vehicle.altitude >= altitude]
+
+    def in_mode(self, mode):
+        with self.lock:
+            return [sysid for sysid, vehicle in self.vehicles.items() if vehicle.mode == mode]
+
+    def _serve(self):
+        try:
+            self.client, _ = self.listen_socket.accept()
+        except OSError:
+            return
+        self.client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._receive_loop()
+
+    def _receive_loop(self):
+        for target in (self._send_worker, self._telemetry_worker):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        parser = mavlink.MAVLink(None)
+        parser.robust_parsing = True
+        source = self.pty_fds[0] if self.pty_fds else self.client
+        try:
+            while not self.stop_event.is_set():
+                readable, _, _ = select.select([source], [], [], 0.2)
+                if not readable:
+                    continue
+                data = os.read(source, 65536) if self.pty_fds else self.client.recv(65536)
+                if not data and self.link == "tcp":
+                    break
+                for msg in parser.parse_buffer(data) or []:
+                    self._receive(msg)
+        except OSError:
+            pass
+
+    def _receive(self, msg):
+        vehicle = self.vehicles.get(getattr(msg, "target_system", None))
+        if vehicle is None or random.random() < self.loss:
+            return
+        due = time.monotonic() + self.latency  # uplink delay, then the reply pays the downlink delay
+        with self.lock:
+            replies = vehicle.handle(msg)
+        for reply in replies:
+            self._send(vehicle, reply, due + self.latency, lossy=True)
+
+    def _send(self, vehicle, msg, due, lossy=False):
+        if lossy and random.random() < self.loss:
+            return
+        data = msg.pack(vehicle.encoder)
+        vehicle.encoder.seq = (vehicle.encoder.seq + 1) % 256  # pack() does not advance the sequence number
+        with self.outbox_ready:
+            heapq.heappush(self.outbox, (due, self.order, data))
+            self.order += 1
+            self.outbox_ready.notify()
+
+    def _send_worker(self):
+        while not self.stop_event.is_set():
+            with self.outbox_ready:
+                while not self.outbox and not self.stop_event.is_set():
+                    self.outbox_ready.wait()
+                if self.stop_event.is_set():
+                    return
+                due, _, data = self.outbox[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self.outbox_ready.wait(delay)
+                    continue
+                heapq.heappop(self.outbox)
+            try:
+                self._write(data)
+            except OSError:
+                return
+
+    def _write(self, data):
+        if self.link == "udp":
+            self.client.sendto(data, (self.host, self.port))
+        elif self.link == "pty":
+            while data:
+                data = data[os.write(self.pty_fds[0], data):]
+        else:
+            self.client.sendall(data)
+
+    def _telemetry_worker(self):
+        period = 1.0 / self.rate_hz
+        start = time.monotonic()
+        tick = 0
+        while not self.stop_event.wait(period):
+            now = time.monotonic()
+            with self.lock:
+                for vehicle in self.vehicles.values():
+                    vehicle.step(period)
+                    if tick % math.ceil(self.rate_hz) == 0:
+                        self._send(vehicle, vehicle.heartbeat(), now + self.latency)
+                        self._send(vehicle, vehicle.current(), now + self.latency)
+                    self._send(vehicle, vehicle.position(int((now - start) * 1000)), now + self.latency)
+            tick += 1
@@ -9,7 +9,9 @@ import ast
 import math
 from LangGraph import langChainMain
 from concurrent.futures import ThreadPoolExecutor
-from TerrainPreProcessing.check_internet import has_internet
+from TerrainPreProcessing.check_internet import get_connectivity_monitor
+from Utils.drone_registry import DroneRegistry
+from GUI.update_bus import GuiUpdateBus
 
 
 class Drone:
@@ -24,6 +26,7 @@ class Drone:
         self.position = None
         self.marker = None
         self.heading_path = None
+        self.last_drawn_position = None  # (position, heading tip) the canvas items were last moved to
         self.altitude = None
         self.relative_altitude = None
         self.heading = None
@@ -64,27 +67,43 @@ class Drone:
         self.vx = vx
         self.vy = vy
         self.vz = vz
-        # set marker on map
-        if self.marker is None:
-            self.marker = self.map_widget.set_marker(converted_lat, converted_lon, icon_anchor ="center", text=f"Drone {self.id}", icon=self._load_icon("./assets/camera-drone.png"), font = ("Arial", 12, "bold"))
-        else:
-            self.marker.set_position(converted_lat, converted_lon)
-        
-        # create heading path on map
-        #calculate 10m point based on heading
+        # heading indicator runs ~50m from the drone along its heading
         heading_rad = math.radians(converted_heading)
         lat_offset = 0.0005 * math.cos(heading_rad)
         lon_offset = 0.0005 * math.sin(heading_rad)
-        if self.heading_path is not None:
-            self.heading_path.delete()
-            self.heading_path = None
-        self.heading_path = self.map_widget.set_path(position_list = [(converted_lat, converted_lon), (converted_lat + lat_offset, converted_lon + lon_offset)], width=2, color="red")
+        heading_tip = (converted_lat + lat_offset, converted_lon + lon_offset)
+
+        # move the existing canvas items in place, and only when something would visibly change
+        if not self._moved_less_than_a_pixel(self.position, heading_tip):
+            if self.marker is None:
+                self.marker = self.map_widget.set_marker(converted_lat, converted_lon, icon_anchor ="center", text=f"Drone {self.id}", icon=self._load_icon("./assets/camera-drone.png"), font = ("Arial", 12, "bold"))
+            else:
+                self.marker.set_position(converted_lat, converted_lon)
+
+            if self.heading_path is None:
+                self.heading_path = self.map_widget.set_path(position_list = [self.position, heading_tip], width=2, color="red")
+            else:
+                self.heading_path.set_position_list([self.position, heading_tip])
+            self.last_drawn_position = (self.position, heading_tip)
 
         # calculate velocity
         velocity = math.hypot(vx, vy)
         velocity = velocity * 0.01 # convert cm/s to m/s
         # update info widget
         self.info_widget.updatePos(self.position, self.relative_altitude, velocity, converted_heading)
+
+    def _moved_less_than_a_pixel(self, position, heading_tip):
+        """True when neither the marker nor the heading tip would move a whole pixel at the current zoom."""
+        if self.last_drawn_position is None or self.marker is None:
+            return False
+        zoom = round(self.map_widget.zoom)
+        pixels_per_tile = self.map_widget.width / (self.map_widget.lower_right_tile_pos[0] - self.map_widget.upper_left_tile_pos[0])
+        for new, old in zip((position, heading_tip), self.last_drawn_position):
+            new_x, new_y = tkintermapview.decimal_to_osm(*new, zoom)
+            old_x, old_y = tkintermapview.decimal_to_osm(*old, zoom)
+            if abs(new_x - old_x) * pixels_per_tile >= 1 or abs(new_y - old_y) * pixels_per_tile >= 1:
+                return False
+        return True
         
     def setTelemetry(self, roll, pitch, yaw):
         self.roll = roll
@@ -667,7 +686,7 @@ class MapPage(customtkinter.CTkFrame):
         self.gui_ref = gui_ref
         self.switch_to_home = switch_to_home
         self.polygons = []
-        self.drones = []
+        self.drones = DroneRegistry()
         self.polygon_points = []
         self.jobs = []
         self.pois = []
@@ -731,9 +750,12 @@ class MapPage(customtkinter.CTkFrame):
             self.map_frame, width=600, height=600, corner_radius=20
         )
 
-        #Use this for offline demonstrations. 
-        if not has_internet():
-            self.map_widget.set_tile_server("http://localhost:8080/tile/{z}/{x}/{y}.png")
+        #Use the local tile server for offline demonstrations. Connectivity is checked in the background,
+        #so startup assumes online tiles until the monitor says otherwise (see GUI._apply_connectivity).
+        self.online_tile_server = self.map_widget.tile_server
+        self.offline_tile_server = "http://localhost:8080/tile/{z}/{x}/{y}.png"
+        self.using_offline_tiles = False
+        self.set_offline_tiles(not get_connectivity_monitor().is_online(default=True))
         self.map_widget.pack(fill="both", expand=False, padx=20, pady=20)
         #UCF Position: 28.6026251, -81.1999887
         self.map_widget.set_position(28.5477810,-80.8481593)
@@ -874,7 +896,7 @@ class MapPage(customtkinter.CTkFrame):
 
     def _add_drone(self, drone_id, system_status):
         newdrone = Drone(self.map_widget, self.drone_info_container, self.bottom_frame, drone_id, system_status, self.gui_ref)
-        self.drones.append(newdrone)
+        self.drones.add(drone_id, newdrone)
 
     def left_click_event(self, coordinates_tuple):
         if self.gui_ref.isAddingDetectionPoints:
@@ -911,7 +933,7 @@ class MapPage(customtkinter.CTkFrame):
 
     def move_marker(self):
         if self.drones:
-            self.drones[0].move(0.0001, 0.0001)
+            self.drones.ordered()[0].move(0.0001, 0.0001)
     def create_drone_job(self, job_name, drone_id, waypoints, spacing=0):
         #convert waypoints to list of tuples
         list_of_tuples = [tuple(i) for i in ast.literal_eval(waypoints)]
@@ -953,6 +975,12 @@ class MapPage(customtkinter.CTkFrame):
     def get_polygon_points(self):
         return self.polygon_points
 
+    def set_offline_tiles(self, offline):
+        if offline == self.using_offline_tiles:
+            return
+        self.using_offline_tiles = offline
+        self.map_widget.set_tile_server(self.offline_tile_server if offline else self.online_tile_server)
+
     
     def add_poi(self, lat, lon, name, description=""):
         poi_count = len(self.pois) + 1
@@ -1018,6 +1046,14 @@ class GUI:
 
         # Show the home page initially
         self.home_page.pack(fill="both", expand=True)
+
+        # Telemetry from the dispatcher thread is coalesced and drawn at a fixed frame rate
+        self.update_bus = GuiUpdateBus(self.app, rate_hz=15)
+        self._register_update_handlers()
+        self.update_bus.start()
+
+        # Switch map tiles when the background connectivity monitor sees the connection come or go
+        get_connectivity_monitor().subscribe(lambda online: self.update_bus.post(None, "connectivity", online))
         
     def show_home_page(self):
         self.map_page.pack_forget()
@@ -1091,28 +1127,64 @@ class GUI:
         self.missionState.addMissionPolygon(polygon_points)
 
     
+    # Drone updates arrive from the MAVLink threads; they are posted to the update bus and
+    # applied to the widgets on the Tk main thread by the _apply_* handlers below.
     def updateDronePosition(self, drone_id, lat, lon, altitude, relative_altitude, heading, vx, vy, vz):
-        drone = next((drone for drone in self.map_page.drones if drone.id == drone_id), None)
-        if drone is not None:
-            drone.setPosition(lat, lon, altitude, relative_altitude, heading, vx, vy, vz)
+        self.update_bus.post(drone_id, "position", lat, lon, altitude, relative_altitude, heading, vx, vy, vz)
 
     def updateDroneTelemetry(self, drone_id, roll, pitch, yaw):
-        drone = next((drone for drone in self.map_page.drones if drone.id == drone_id), None)
-        if drone is not None:
-            drone.setTelemetry(roll, pitch, yaw)
+        self.update_bus.post(drone_id, "telemetry", roll, pitch, yaw)
 
     def addDrone(self, drone_id, system_status):
-        self.map_page._add_drone(drone_id, system_status)
+        self.update_bus.post(drone_id, "add", system_status)
 
     def updateDroneStatus(self, drone_id, system_status):
-        drone = next((drone for drone in self.map_page.drones if drone.id == drone_id), None)
-        if drone is not None:
-            drone.setStatus(system_status)
+        self.update_bus.post(drone_id, "status", system_status)
     
     def updateJobs(self, drone_id, active_job, job_list):
-        drone = next((drone for drone in self.map_page.drones if drone.id == drone_id), None)
-        if drone is not None:
-            drone.update_jobs(active_job, job_list)
+        self.update_bus.post(drone_id, "jobs", active_job, job_list)
+
+    def _register_update_handlers(self):
+        self.update_bus.register("add", self._apply_add_drone)
+        self.update_bus.register("status", self._apply_drone_status)
+        self.update_bus.register("position", self._apply_drone_position)
+        self.update_bus.register("telemetry", self._apply_drone_telemetry)
+        self.update_bus.register("jobs", self._apply_drone_jobs)
+        self.update_bus.register("connectivity", self._apply_connectivity)
+
+    def _apply_add_drone(self, drone_id, system_status):
+        if drone_id not in self.map_page.drones:
+            self.map_page._add_drone(drone_id, system_status)
+
+    def _apply_drone_position(self, drone_id, lat, lon, altitude, relative_altitude, heading, vx, vy, vz):
+        drone = self.map_page.drones.get(drone_id)
+        if drone is None:
+            return False
+        drone.setPosition(lat, lon, altitude, relative_altitude, heading, vx, vy, vz)
+
+    def _apply_drone_telemetry(self, drone_id, roll, pitch, yaw):
+        drone = self.map_page.drones.get(drone_id)
+        if drone is None:
+            return False
+        drone.setTelemetry(roll, pitch, yaw)
+
+    def _apply_drone_status(self, drone_id, system_status):
+        drone = self.map_page.drones.get(drone_id)
+        if drone is None:
+            return False
+        drone.setStatus(system_status)
+
+    def _apply_drone_jobs(self, drone_id, active_job, job_list):
+        drone = self.map_page.drones.get(drone_id)
+        if drone is None:
+            return False
+        drone.update_jobs(active_job, job_list)
+
+    def _apply_connectivity(self, _, online):
+        self.map_page.set_offline_tiles(not online)
+
+    def get_update_stats(self):
+        return self.update_bus.get_stats()
     
     def callAddPoiInMissionState(self, poi):
         self.missionState.addPOI(poi)
@@ -1121,6 +1193,14 @@ class GUI:
         #check if poi is already in the list
         if poi not in self.map_page.pois:
             self.map_page.add_poi(poi.lat, poi.lon, poi.name)
+
+    # POI events from the detection workers; the widgets are created on the Tk main thread
+    def addDetectedPOI(self, lat, lon, name, description, on_created):
+        """Create a POI on the map from any thread; on_created(poi_id) runs on the Tk thread once it exists."""
+        self.update_bus.call(lambda: on_created(self.map_page.add_poi(lat, lon, name, description)))
+
+    def markPOITargetFound(self, poi, drone_id):
+        self.update_bus.call(poi.target_found, drone_id)
     
     def create_system_chat_message(self, text):
         """Add a system message bubble to the chat window."""
@@ -0,0 +1,112 @@
+import collections
+import threading
+
+
+class GuiUpdateBus:
+    """
+    Thread-safe hand-off of drone updates from the MAVLink threads to the Tk main loop.
+
+    Producers post the latest value for a (drone, field) pair from any thread. Only the newest
+    value per pair is kept until the Tk thread flushes everything pending on a fixed-rate
+    after() tick, so widget work scales with the frame rate instead of the packet rate.
+    One-off events that must not be coalesced (e.g. creating a POI) go through call() instead and
+    run in the order they were posted.
+    """
+
+    def __init__(self, widget, rate_hz=15):
+        self.widget = widget  # any Tk widget, used to schedule the flush tick with after()
+        self.interval_ms = max(1, int(1000 / rate_hz))
+        self.handlers = {}  # field -> handler(drone_id, *args), returns False if the update had no target
+        self.pending = {}  # (drone_id, field) -> args, in first-posted order
+        self.calls = collections.deque()  # (function, args) to run on the next flush, never coalesced
+        self.lock = threading.Lock()
+        self.running = False
+        self.after_id = None
+
+        # counters
+        self.posted = 0
+        self.coalesced = 0  # posts that replaced an update not yet flushed
+        self.dropped = 0  # updates discarded: bus stopped, unknown field, missing target or handler error
+        self.applied = 0
+        self.frames = 0
+
+    def register(self, field, handler):
+        self.handlers[field] = handler
+
+    def post(self, drone_id, field, *args):
+        """Queue the latest value of a field for a drone. Safe to call from any thread."""
+        key = (drone_id, field)
+        with self.lock:
+            self.posted += 1
+            if not self.running or field not in self.handlers:
+                self.dropped += 1
+                return
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = args
+
+    def call(self, function, *args):
+        """Run function(*args) on the Tk thread at the next flush. Safe to call from any thread."""
+        with self.lock:
+            self.posted += 1
+            if not self.running:
+                self.dropped += 1
+                return False
+            self.calls.append((function, args))
+        return True
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        self.running = False
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _tick(self):
+        self.flush()
+        if self.running:
+            self.after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def flush(self):
+        """Apply every pending update. Must run on the Tk main thread."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            calls, self.calls = self.calls, collections.deque()
+        applied_count = 0
+        dropped_count = 0
+        for (drone_id, field), args in pending.items():
+            try:
+                applied = self.handlers[field](drone_id, *args)
+            except Exception as e:
+                print(f"GUI update '{field}' for drone {drone_id} failed: {e}")
+                applied = False
+            if applied is False:
+                dropped_count += 1
+            else:
+                applied_count += 1
+        for function, args in calls:
+            try:
+                function(*args)
+                applied_count += 1
+            except Exception as e:
+                print(f"GUI call {getattr(function, '__name__', function)} failed: {e}")
+                dropped_count += 1
+        with self.lock:
+            self.frames += 1
+            self.applied += applied_count
+            self.dropped += dropped_count
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "posted": self.posted,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "applied": self.applied,
+                "frames": self.frames,
+                "pending": len(self.pending) + len(self.calls),
+            }
@@ -0,0 +1,85 @@
+"""Benchmark search_grid_with_drones against the original max()/list.remove implementation.
+
+Run from the app directory:
+    python -m PathPlanning.benchmark_path --sizes 16 32 64 128 256
+Every size is timed on both grid layouts, the list of Tile objects and the columnar SearchGrid
+built by terrain_queries, and the two results must be identical. The original implementation is
+only timed up to --legacy-max-size because it is O(cells^2).
+"""
+import argparse
+import random
+import time
+
+from PathPlanning.path import heuristic, search_grid_with_drones
+from TerrainPreProcessing.geometry_utils import SearchGrid, Tile
+
+
+def legacy_search_grid_with_drones(grid, drone_positions, viable_grid_positions):
+    """The assignment loop as it was before, kept for comparison."""
+    precomp_destinations = {x: [] for x in range(len(drone_positions))}
+    viable_grid_positions = list(viable_grid_positions)
+    while(len(viable_grid_positions) > 0):
+        for drone_id in range(len(drone_positions)):
+            if(len(viable_grid_positions) == 0):
+                break
+            start = drone_positions[drone_id]
+            highest_priority_cell = max(viable_grid_positions, key=lambda x: grid[x[0]][x[1]].total_count*10 - (heuristic(start, x)))
+            cell_coordinate = grid[highest_priority_cell[0]][highest_priority_cell[1]].polygon.centroid
+            precomp_destinations[drone_id].append(cell_coordinate)
+            viable_grid_positions.remove(highest_priority_cell)
+    return precomp_destinations
+
+
+def make_grid(size, seed):
+    """A square grid with clustered feature counts and an irregular search area, like a real mission.
+
+    Returns the same cells twice: as a list of Tile objects and as a columnar SearchGrid."""
+    rng = random.Random(seed)
+    columnar = SearchGrid(size, [], (51.5, -0.1), 10)
+    grid = [[Tile() for _ in range(size)] for _ in range(size)]
+    viable_grid_positions = []
+    for i in range(size):
+        for j in range(size):
+            tile = grid[i][j]
+            tile.total_count = rng.choice((0, 0, 0, 1, 1, 2, 3, 5, 8))
+            tile.polygon = columnar.polygons[i, j]
+            tile.in_searcharea = (i - size / 2) ** 2 + (j - size / 2) ** 2 < (size / 2) ** 2
+            columnar.total_count[i, j] = tile.total_count
+            columnar.in_searcharea[i, j] = tile.in_searcharea
+            if tile.in_searcharea:
+                viable_grid_positions.append((i, j))
+    drone_positions = [(rng.uniform(0, size), rng.uniform(0, size)) for _ in range(4)]
+    return grid, columnar, drone_positions, viable_grid_positions
+
+
+def same_destinations(a, b):
+    return a.keys() == b.keys() and all(
+        len(a[k]) == len(b[k]) and all(p.equals_exact(q, 0) for p, q in zip(a[k], b[k])) for k in a
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--legacy-max-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        grid, columnar, drone_positions, viable = make_grid(size, args.seed)
+        start = time.perf_counter()
+        result = search_grid_with_drones(grid, drone_positions, list(viable))
+        new_time = time.perf_counter() - start
+        start = time.perf_counter()
+        columnar_result = search_grid_with_drones(columnar, drone_positions, list(viable))
+        columnar_time = time.perf_counter() - start
+        assert same_destinations(columnar_result, result), f"SearchGrid and Tile grid results differ at size {size}"
+        line = (f"{size:>4}x{size:<4} {len(viable):>6} cells  new {new_time * 1000:9.1f} ms"
+                f"  columnar {columnar_time * 1000:9.1f} ms")
+        if size <= args.legacy_max_size:
+            start = time.perf_counter()
+            expected = legacy_search_grid_with_drones(grid, drone_positions, viable)
+            legacy_time = time.perf_counter() - start
+            status = "identical" if same_destinations(result, expected) else "MISMATCH"
+            line += f"  legacy {legacy_time * 1000:9.1f} ms  {status}"
+        print(line)
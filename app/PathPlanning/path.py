@@ -1,9 +1,6 @@
 import random
-from GUI import GUI
-from Dispatcher import Dispatcher
-import asyncio
-import threading
-import heapq
+import numpy as np
+import shapely
 
 # Define grid size and priorities
 
@@ -14,6 +11,18 @@ DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
+def cell_priority_order(total_counts, rows, cols, start):
+    """
+    Order candidate cells from best to worst for a drone starting at `start`.
+
+    The score is the same as before, total_count*10 - Manhattan distance to the start,
+    and ties go to the cell listed first, exactly as max() over the candidate list did.
+    """
+    distance = np.abs(start[0] - rows) + np.abs(start[1] - cols)
+    scores = total_counts * 10 - distance
+    # lexsort sorts by the last key first: highest score, then original position
+    return np.lexsort((np.arange(len(scores)), -scores))
+
 # Function to make drones search a grid based on priority
 def search_grid_with_drones(grid, drone_positions = None, viable_grid_positions = None, num_drones = 4):
     GRID_SIZE = len(grid)
@@ -24,51 +33,50 @@ def search_grid_with_drones(grid, drone_positions = None, viable_grid_positions
 
     if not viable_grid_positions:
         viable_grid_positions = []
-        #Inefficient, but works for now. 
         for i in range(len(grid)):
             for j in range(len(grid[0])):
-                #print(f"Test:({i},{j}) - InArea:{grid[i][j].in_searcharea}, Priority: {grid[i][j].contains_count}")
                 if(not grid[i][j].in_searcharea or grid[i][j].total_count == 0):
                     continue
                 viable_grid_positions.append((i,j))
 
-    #print(f"Potential Search Areas: {len(viable_grid_positions)}")
+    if len(viable_grid_positions) == 0:
+        return precomp_destinations
 
-    while(len(viable_grid_positions) > 0):
-        for drone_id in range(len(drone_positions)):
-            if(len(viable_grid_positions) == 0):
-                break
-            start = drone_positions[drone_id]
-            highest_priority_cell = max(viable_grid_positions, key=lambda x: grid[x[0]][x[1]].total_count*10 - (heuristic(start, x)))
-            
-            cell_coordinate = grid[highest_priority_cell[0]][highest_priority_cell[1]].polygon.centroid
+    cells = np.array(viable_grid_positions)
+    rows, cols = cells[:, 0], cells[:, 1]
+    columnar = isinstance(getattr(grid, "total_count", None), np.ndarray)  # SearchGrid from terrain_queries
+    if columnar:
+        total_counts = grid.total_count[rows, cols].astype(np.float64)
+    else:
+        total_counts = np.array([grid[i][j].total_count for i, j in viable_grid_positions], dtype=np.float64)
 
-            precomp_destinations[drone_id].append(cell_coordinate)
-            viable_grid_positions.remove(highest_priority_cell)
+    # Each drone's score for a cell never changes, so every drone gets its full ranking up front and
+    # walks it in turn, skipping cells another drone has already claimed (a priority queue with lazy deletion).
+    rankings = [cell_priority_order(total_counts, rows, cols, start).tolist() for start in drone_positions]
+    cursors = [0] * len(drone_positions)
+    taken = bytearray(len(viable_grid_positions))
+    assignments = {x: [] for x in range(len(drone_positions))}
+    remaining = len(viable_grid_positions)
 
-    """
-    while len(visited) < GRID_SIZE*GRID_SIZE:
-        for drone_id in range(num_drones):
-            start = drone_positions[drone_id]
-            # Find the highest-priority cell
-            visited.add(start)
-            highest_priority_cell = max([(i, j) for i in range(GRID_SIZE) for j in range(GRID_SIZE) if (i,j) not in visited and grid[i][j].in_searcharea], key=lambda x: grid[x[0]][x[1]].total_count*10 - heuristic(start, x))
-            visited.add(highest_priority_cell)
-            print(f"Drone {drone_id+1} starts at {start} and is going to {highest_priority_cell}.")
-
-            precomp_destinations[drone_id].append(highest_priority_cell)
-            #path = astar(grid, start, highest_priority_cell)
+    while remaining > 0:
+        for drone_id in range(len(drone_positions)):
+            if remaining == 0:
+                break
+            ranking = rankings[drone_id]
+            cursor = cursors[drone_id]
+            while taken[ranking[cursor]]:
+                cursor += 1
+            cell = ranking[cursor]
+            cursors[drone_id] = cursor + 1
+            taken[cell] = 1
+            remaining -= 1
+            assignments[drone_id].append(cell)
 
-            # Mark the visited squares
-            #for pos in path:
-            #    visited.add(pos)
-            #    print(f"Drone {drone_id+1} visited {pos} with priority {grid[pos[0]][pos[1]]}")
+    for drone_id, cell_indices in assignments.items():
+        if columnar:
+            polygons = grid.polygons[rows[cell_indices], cols[cell_indices]]
+        else:
+            polygons = np.array([grid[rows[c]][cols[c]].polygon for c in cell_indices], dtype=object)
+        precomp_destinations[drone_id] = list(shapely.centroid(polygons))
 
-            # Mark the highest priority cell as visited for future drones
-            #visited.add(highest_priority_cell)
-            
-            print(f"Drone {drone_id+1} completed its search.")"
-    """
-    #for drone_id in range(len(drone_positions)):
-    #    print(f"Drone ID: {drone_id}, Locations: {precomp_destinations[drone_id]}")
     return precomp_destinations
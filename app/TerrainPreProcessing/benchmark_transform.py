@@ -0,0 +1,96 @@
+"""Benchmark the EPSG:3857 -> EPSG:4326 transform used when loading PostGIS features.
+
+Run from the app directory:
+    python -m TerrainPreProcessing.benchmark_transform --counts 1000 5000 20000
+Compares the original per-geometry, per-coordinate transform against the cached bulk transform
+and checks that both agree (the original dropped interior rings, so only exteriors are compared).
+"""
+import argparse
+import random
+import time
+
+from pyproj import Transformer
+from shapely.geometry import Point, Polygon, MultiPolygon, LineString
+
+from TerrainPreProcessing.postgis_handler import transform_geometries_3857_to_4326
+
+
+def legacy_transform_geometry_3857_to_4326(geometry):
+    """The transform as it was before, kept for comparison."""
+    transformer = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+    if isinstance(geometry, Point):
+        lon, lat = transformer.transform(geometry.x, geometry.y)
+        return Point(lon, lat)
+    elif isinstance(geometry, Polygon):
+        return Polygon([transformer.transform(x, y) for x, y in geometry.exterior.coords])
+    elif isinstance(geometry, MultiPolygon):
+        return MultiPolygon([
+            Polygon([transformer.transform(x, y) for x, y in polygon.exterior.coords])
+            for polygon in geometry.geoms
+        ])
+    elif isinstance(geometry, LineString):
+        return LineString([transformer.transform(x, y) for x, y in geometry.coords])
+    raise TypeError(f"Input geometry must be a Point, Polygon, or MultiPolygon, got: {type(geometry)}")
+
+
+def make_building(rng, x, y):
+    """A footprint around (x, y) in web mercator metres, sometimes with a courtyard."""
+    w, h = rng.uniform(8, 40), rng.uniform(8, 40)
+    shell = [(x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)]
+    if rng.random() < 0.2:
+        hole = [(x + w * 0.3, y + h * 0.3), (x + w * 0.7, y + h * 0.3), (x + w * 0.7, y + h * 0.7), (x + w * 0.3, y + h * 0.7)]
+        return Polygon(shell, [hole])
+    return Polygon(shell)
+
+
+def make_features(count, seed):
+    """A mix of the geometry types planet_osm_polygon and planet_osm_line return, around UCF."""
+    rng = random.Random(seed)
+    geometries = []
+    for _ in range(count):
+        x, y = rng.uniform(-9040000, -9038000), rng.uniform(3326000, 3328000)
+        kind = rng.random()
+        if kind < 0.7:
+            geometries.append(make_building(rng, x, y))
+        elif kind < 0.8:
+            geometries.append(MultiPolygon([make_building(rng, x, y), make_building(rng, x + 60, y)]))
+        elif kind < 0.95:
+            geometries.append(LineString([(x + 15 * k, y + rng.uniform(-5, 5)) for k in range(rng.randint(2, 30))]))
+        else:
+            geometries.append(Point(x, y))
+    return geometries
+
+
+def exteriors_match(legacy, bulk):
+    """Compare the parts the original transform kept, within a micro-degree tolerance."""
+    if isinstance(bulk, Polygon):
+        bulk = Polygon(bulk.exterior)
+    elif isinstance(bulk, MultiPolygon):
+        bulk = MultiPolygon([Polygon(polygon.exterior) for polygon in bulk.geoms])
+    return legacy.equals_exact(bulk, 1e-9)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--legacy-max-count", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    transform_geometries_3857_to_4326(make_features(1, args.seed))  # build the cached transformer outside the timing
+    for count in args.counts:
+        geometries = make_features(count, args.seed)
+        vertices = sum(len(g.exterior.coords) + sum(len(r.coords) for r in g.interiors) if isinstance(g, Polygon)
+                       else sum(len(p.exterior.coords) for p in g.geoms) if isinstance(g, MultiPolygon)
+                       else len(g.coords) for g in geometries)
+        start = time.perf_counter()
+        result = transform_geometries_3857_to_4326(geometries)
+        bulk_time = time.perf_counter() - start
+        line = f"{count:>6} geometries {vertices:>8} vertices  bulk {bulk_time * 1000:9.1f} ms ({count / bulk_time:10.0f} geom/s)"
+        if count <= args.legacy_max_count:
+            start = time.perf_counter()
+            expected = [legacy_transform_geometry_3857_to_4326(g) for g in geometries]
+            legacy_time = time.perf_counter() - start
+            status = "identical" if all(exteriors_match(a, b) for a, b in zip(expected, result)) else "MISMATCH"
+            line += f"  legacy {legacy_time * 1000:9.1f} ms ({count / legacy_time:8.0f} geom/s)  {status}"
+        print(line)
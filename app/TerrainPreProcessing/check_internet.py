@@ -1,8 +1,115 @@
 import socket
+import threading
+import time
 
-def has_internet():
+# Result of the last check, so repeated callers don't each wait out the socket timeout
+_last_result = None
+_last_checked = 0.0
+
+def has_internet(max_age=60):
+    """Whether 8.8.8.8:53 is reachable. Blocks for up to 3 s; prefer get_connectivity_monitor().is_online()."""
+    global _last_result, _last_checked
+    if _last_result is not None and time.monotonic() - _last_checked < max_age:
+        return _last_result
     try:
-        socket.create_connection(("8.8.8.8", 53), timeout=3)
-        return True
+        socket.create_connection(("8.8.8.8", 53), timeout=3).close()
+        _last_result = True
     except OSError:
-        return False
\ No newline at end of file
+        _last_result = False
+    _last_checked = time.monotonic()
+    return _last_result
+
+
+class ConnectivityMonitor:
+    """
+    Checks connectivity on a background thread so nobody else waits on the network.
+
+    is_online() answers from the last result, which is trusted for ttl seconds. Subscribers are
+    called with the new state, on the monitor thread, whenever it changes.
+    """
+
+    def __init__(self, interval=15, ttl=45, probe=None):
+        self.interval = interval
+        self.ttl = ttl
+        self.probe = probe or (lambda: has_internet(max_age=0))
+        self.online = None
+        self.checked_at = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="connectivity-monitor", daemon=True)
+                self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+
+    def check_now(self):
+        """Ask for a check without waiting for the next interval. Doesn't block."""
+        self.wake.set()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                online = bool(self.probe())
+            except Exception as e:
+                print(f"Connectivity check failed: {e}")
+                online = False
+            self._record(online)
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def _record(self, online):
+        with self.lock:
+            changed = online != self.online
+            self.online = online
+            self.checked_at = time.monotonic()
+            subscribers = list(self.subscribers) if changed else []
+        for callback in subscribers:
+            try:
+                callback(online)
+            except Exception as e:
+                print(f"Connectivity subscriber failed: {e}")
+
+    def status(self):
+        """True/False from a check younger than ttl, otherwise None (unknown)."""
+        with self.lock:
+            if self.checked_at is None or time.monotonic() - self.checked_at > self.ttl:
+                return None
+            return self.online
+
+    def is_online(self, default=False):
+        status = self.status()
+        return default if status is None else status
+
+    def subscribe(self, callback):
+        """Call callback(online) on every change, and right away if the state is already known."""
+        with self.lock:
+            self.subscribers.append(callback)
+            known = self.online
+        if known is not None:
+            callback(known)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_connectivity_monitor():
+    """The process-wide monitor, started on first use."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = ConnectivityMonitor().start()
+        return _monitor
@@ -6,6 +6,10 @@ import matplotlib.pyplot as plt
 from rtree import index
 from shapely.geometry import Polygon, MultiPolygon, box
 from shapely.ops import unary_union
+from shapely import STRtree
+from collections import namedtuple
+import shapely
+import numpy as np
 import random
 
 
@@ -17,6 +21,248 @@ class Tile:
         self.total_count = 0
 
 
+class SearchGrid:
+    """
+    Columnar search grid: one NumPy array per attribute instead of a Tile object per cell.
+
+    Cell polygons are only built when first needed, and the tag values behind each cell are kept
+    as indices into one shared feature list. grid[i][j] returns a read-only TileView with the
+    same attributes as Tile, so code written against the list-of-lists grid keeps working.
+    """
+
+    def __init__(self, grid_length, search_tags, top_left, square_size):
+        self.grid_length = grid_length
+        self.search_tags = list(search_tags)
+        self.top_left = top_left
+        self.square_size = square_size
+        shape = (grid_length, grid_length)
+        self.tag_counts = {tag: np.zeros(shape, dtype=np.int32) for tag in self.search_tags}
+        self.total_count = np.zeros(shape, dtype=np.int32)
+        self.in_searcharea = np.ones(shape, dtype=bool)
+        # features touching each cell, CSR style: flat cell c owns cell_features[feature_offsets[c]:feature_offsets[c + 1]]
+        self.feature_offsets = np.zeros(grid_length * grid_length + 1, dtype=np.int64)
+        self.cell_features = np.zeros(0, dtype=np.int64)
+        self.feature_tags = []  # per feature: [(tag, value), ...] for its non-null search tags
+        self._polygons = None
+
+    @property
+    def polygons(self):
+        """(n, n) array of cell polygons, built on first use."""
+        if self._polygons is None:
+            self._polygons = grid_cell_polygons(self.top_left, self.square_size, self.grid_length).reshape(self.grid_length, self.grid_length)
+        return self._polygons
+
+    def set_cell_features(self, cell_idx, feature_idx, feature_tags):
+        """Record which features touch which flat cell indices and derive the tag counts from it."""
+        cell_count = self.grid_length * self.grid_length
+        tag_matrix = np.zeros((len(feature_tags), len(self.search_tags)), dtype=bool)
+        tag_column = {tag: k for k, tag in enumerate(self.search_tags)}
+        for f, tagged_values in enumerate(feature_tags):
+            for tag, _ in tagged_values:
+                tag_matrix[f, tag_column[tag]] = True
+
+        # features without any search tag don't count towards a cell, so they aren't stored either
+        keep = tag_matrix.any(axis=1)[feature_idx]
+        cell_idx, feature_idx = cell_idx[keep], feature_idx[keep]
+        order = np.lexsort((feature_idx, cell_idx))
+        cell_idx, feature_idx = cell_idx[order], feature_idx[order]
+
+        self.feature_tags = feature_tags
+        self.cell_features = feature_idx
+        self.feature_offsets = np.concatenate(([0], np.cumsum(np.bincount(cell_idx, minlength=cell_count))))
+        for k, tag in enumerate(self.search_tags):
+            counts = np.bincount(cell_idx, weights=tag_matrix[feature_idx, k], minlength=cell_count)
+            self.tag_counts[tag] = counts.astype(np.int32).reshape(self.grid_length, self.grid_length)
+        self.total_count = sum(self.tag_counts.values(), np.zeros((self.grid_length, self.grid_length), dtype=np.int32))
+
+    def to_arrays(self):
+        """Everything but the feature tags as plain arrays, e.g. for np.savez."""
+        return {
+            "tag_counts": np.stack([self.tag_counts[tag] for tag in self.search_tags]) if self.search_tags else np.zeros((0, self.grid_length, self.grid_length), dtype=np.int32),
+            "total_count": self.total_count,
+            "in_searcharea": self.in_searcharea,
+            "feature_offsets": self.feature_offsets,
+            "cell_features": self.cell_features,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, search_tags, top_left, square_size, feature_tags):
+        """Rebuild a grid saved with to_arrays; feature_tags must come from the same features."""
+        grid = cls(len(arrays["total_count"]), search_tags, top_left, square_size)
+        grid.tag_counts = {tag: arrays["tag_counts"][k] for k, tag in enumerate(grid.search_tags)}
+        grid.total_count = arrays["total_count"]
+        grid.in_searcharea = arrays["in_searcharea"]
+        grid.feature_offsets = arrays["feature_offsets"]
+        grid.cell_features = arrays["cell_features"]
+        grid.feature_tags = feature_tags
+        return grid
+
+    def cell_contains(self, i, j):
+        """Tag values of the features touching cell (i, j), grouped by tag."""
+        contains = {tag: list() for tag in self.search_tags}
+        c = i * self.grid_length + j
+        for f in self.cell_features[self.feature_offsets[c]:self.feature_offsets[c + 1]]:
+            for tag, value in self.feature_tags[f]:
+                contains[tag].append(value)
+        return contains
+
+    def cell_contains_count(self, i, j):
+        return {tag: int(counts[i, j]) for tag, counts in self.tag_counts.items()}
+
+    def viable_positions(self):
+        """(i, j) of every cell in the search area, row-major."""
+        return [tuple(position) for position in np.argwhere(self.in_searcharea).tolist()]
+
+    def __len__(self):
+        return self.grid_length
+
+    def __getitem__(self, i):
+        if not -self.grid_length <= i < self.grid_length:
+            raise IndexError("grid row out of range")
+        return GridRow(self, i % self.grid_length)
+
+    def __iter__(self):
+        return (GridRow(self, i) for i in range(self.grid_length))
+
+
+class GridRow:
+    """One row of a SearchGrid, so grid[i][j] indexing keeps working."""
+    __slots__ = ("grid", "i")
+
+    def __init__(self, grid, i):
+        self.grid = grid
+        self.i = i
+
+    def __len__(self):
+        return self.grid.grid_length
+
+    def __getitem__(self, j):
+        if not -self.grid.grid_length <= j < self.grid.grid_length:
+            raise IndexError("grid column out of range")
+        return TileView(self.grid, self.i, j % self.grid.grid_length)
+
+    def __iter__(self):
+        return (TileView(self.grid, self.i, j) for j in range(self.grid.grid_length))
+
+
+class TileView:
+    """Read-only view of one SearchGrid cell with the attributes of a Tile."""
+    __slots__ = ("grid", "i", "j")
+
+    def __init__(self, grid, i, j):
+        self.grid = grid
+        self.i = i
+        self.j = j
+
+    @property
+    def contains(self):
+        return self.grid.cell_contains(self.i, self.j)
+
+    @property
+    def contains_count(self):
+        return self.grid.cell_contains_count(self.i, self.j)
+
+    @property
+    def in_searcharea(self):
+        return bool(self.grid.in_searcharea[self.i, self.j])
+
+    @property
+    def total_count(self):
+        return int(self.grid.total_count[self.i, self.j])
+
+    @property
+    def polygon(self):
+        return self.grid.polygons[self.i, self.j]
+
+
+def feature_search_tags(features, search_tags):
+    """(tag, value) pairs each feature contributes to a grid; NaN/None tags don't count."""
+    return [
+        [(tag, data[tag]) for tag in search_tags if tag in data and not pd.isna(data[tag])]
+        for data in features
+    ]
+
+
+# What FeatureIndex.intersection(..., objects=True) yields, shaped like rtree's Item
+FeatureHit = namedtuple("FeatureHit", ["id", "bbox", "object"])
+
+
+class FeatureIndex:
+    """
+    Spatial index over the terrain features of a search area.
+
+    Features live in a side table (a plain list, so a feature's id is its position) and the tree
+    only holds their bounding boxes, bulk-built in a single STRtree pass instead of one R-tree
+    insert with a pickled payload per feature. bounds and intersection() behave like
+    rtree.index.Index, so plotting code can keep treating it as the R-tree it replaced.
+    """
+
+    def __init__(self):
+        self.features = []
+        self._box_batches = []  # bounding boxes of each extend() call, merged on the next query
+        self._boxes = np.empty((0, 4))
+        self._tree = None
+
+    def load(self, features):
+        """Replace the index contents with features, dicts that hold at least a 'geometry'."""
+        self.features = []
+        self._box_batches = []
+        self._boxes = np.empty((0, 4))
+        self._tree = None
+        self.extend(features)
+
+    def extend(self, features):
+        """Add a batch of features. The tree is rebuilt in one pass the next time it is queried."""
+        features = list(features)
+        if not features:
+            return
+        geometries = np.empty(len(features), dtype=object)
+        geometries[:] = [feature["geometry"] for feature in features]
+        self._box_batches.append(shapely.bounds(geometries).reshape(-1, 4))
+        self.features.extend(features)
+
+    @property
+    def boxes(self):
+        if self._box_batches:
+            self._boxes = np.concatenate([self._boxes, *self._box_batches])
+            self._box_batches = []
+            self._tree = None
+        return self._boxes
+
+    @property
+    def tree(self):
+        boxes = self.boxes
+        if self._tree is None and len(boxes):
+            self._tree = STRtree(shapely.box(*boxes.T))
+        return self._tree
+
+    @property
+    def bounds(self):
+        """[minx, miny, maxx, maxy] around every feature; inverted like rtree's when empty."""
+        if not self.features:
+            return [np.inf, np.inf, -np.inf, -np.inf]
+        return [*self.boxes[:, :2].min(axis=0).tolist(), *self.boxes[:, 2:].max(axis=0).tolist()]
+
+    def query(self, geometries):
+        """(input index, feature id) pairs for every geometry whose envelope meets a feature's box."""
+        if self.tree is None:
+            return np.empty((2, 0), dtype=np.intp)
+        return self.tree.query(geometries)
+
+    def intersection(self, coordinates, objects=False):
+        """Ids (or FeatureHits when objects=True) of the features whose box meets coordinates."""
+        if self.tree is None or not np.all(np.isfinite(coordinates)):
+            ids = []
+        else:
+            ids = np.sort(self.tree.query(shapely.box(*coordinates))).tolist()
+        if not objects:
+            return ids
+        return [FeatureHit(i, self.boxes[i].tolist(), self.features[i]) for i in ids]
+
+    def __len__(self):
+        return len(self.features)
+
+
 def haversine(lat1, lon1, lat2, lon2):
     """Compute the great-circle distance between two points using the Haversine formula."""
     R = 6371000  # Earth's radius in meters
@@ -67,4 +313,32 @@ def find_extreme_coordinates(coords):
         "highest_latitude": max_lat,
         "leftmost_longitude": min_lon,
         "rightmost_longitude": max_lon
-    }
\ No newline at end of file
+    }
+
+def grid_cell_polygons(top_left, square_size, grid_length):
+    """
+    Build every cell polygon of the grid at once, row-major.
+
+    Corners are computed as NumPy arrays with the same formulas as add_meters_to_latitude and
+    add_meters_to_longitude: each cell's left edge is offset at its top latitude and its right
+    edge at its bottom latitude, as the per-cell loop did.
+    """
+    steps = np.arange(grid_length)
+    top_lat = top_left[0] + (steps * -square_size) / 111320
+    bottom_lat = top_left[0] + ((steps + 1) * -square_size) / 111320
+    # one longitude scale per row, with math.cos so values match the scalar helpers exactly
+    top_scale = np.array([111320 * math.cos(math.radians(lat)) for lat in top_lat])
+    bottom_scale = np.array([111320 * math.cos(math.radians(lat)) for lat in bottom_lat])
+    left_lon = top_left[1] + (steps * square_size)[None, :] / top_scale[:, None]
+    right_lon = top_left[1] + ((steps + 1) * square_size)[None, :] / bottom_scale[:, None]
+
+    top = np.broadcast_to(top_lat[:, None], left_lon.shape)
+    bottom = np.broadcast_to(bottom_lat[:, None], left_lon.shape)
+    # (lon, lat) rings in the original corner order: top-left, top-right, bottom-right, bottom-left
+    rings = np.stack([
+        np.stack([left_lon, top], axis=-1),
+        np.stack([right_lon, top], axis=-1),
+        np.stack([right_lon, bottom], axis=-1),
+        np.stack([left_lon, bottom], axis=-1),
+    ], axis=2).reshape(-1, 4, 2)
+    return shapely.polygons(rings)
@@ -0,0 +1,154 @@
+"""
+Local, pre-extracted OSM feature store, so search areas can be built with no network and no database.
+
+The store is a single GeoParquet file of EPSG:4326 features with their bounding boxes as plain columns.
+Rows are sorted along a Hilbert curve and written in small row groups, so the min/max statistics of
+each group act as a coarse spatial index and a bbox query only reads the groups near the search area.
+The file is memory-mapped when read.
+
+Build a store once while online, from OSMnx or from any extract GeoPandas can read (GeoPackage,
+Shapefile, or an .osm.pbf layer through GDAL), then copy it to the field laptop:
+    python -m TerrainPreProcessing.local_feature_store --bbox -81.22 28.58 -81.18 28.62
+    python -m TerrainPreProcessing.local_feature_store --from-file florida.gpkg --layer multipolygons
+"""
+import argparse
+import os
+import threading
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import Polygon
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+DEFAULT_TAGS = ["building", "water", "highway"]
+LOCAL_FEATURE_STORE_PATH = os.environ.get(
+    "VITALS_LOCAL_FEATURE_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_features.parquet"),
+)
+BBOX_COLUMNS = ["minx", "miny", "maxx", "maxy"]
+
+
+class LocalFeatureStore:
+    """Spatial queries over a GeoParquet file written by build_local_feature_store."""
+
+    def __init__(self, path=LOCAL_FEATURE_STORE_PATH):
+        if not HAS_PYARROW:
+            raise RuntimeError("pyarrow is required for the local feature store")
+        self.path = path
+        self.columns = set(pq.read_schema(path).names)
+
+    def query(self, search_tags, polygon_points):
+        """
+        Features intersecting polygon_points ((lon, lat) pairs) that match any search tag,
+        as the same dicts the OSMnx and PostGIS loaders produce.
+        """
+        search_area = Polygon(polygon_points)
+        minx, miny, maxx, maxy = search_area.bounds
+        tag_columns = [tag for tag in search_tags if tag in self.columns]
+        if not tag_columns:
+            return []
+
+        tag_filters = []
+        for tag in tag_columns:
+            condition = search_tags[tag]
+            tag_filters.append(pc.field(tag).is_valid() if condition is True else pc.field(tag) == str(condition))
+        tag_filter = tag_filters[0]
+        for expression in tag_filters[1:]:
+            tag_filter = tag_filter | expression
+        bbox_filter = ((pc.field("maxx") >= minx) & (pc.field("minx") <= maxx)
+                       & (pc.field("maxy") >= miny) & (pc.field("miny") <= maxy))
+
+        table = pq.read_table(self.path, columns=["osm_id", "geometry", *tag_columns],
+                              filters=bbox_filter & tag_filter, memory_map=True)
+        geometries = shapely.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False))
+        shapely.prepare(search_area)
+        # bbox overlap isn't enough: keep what really meets the polygon, as ST_Intersects does for PostGIS
+        keep = np.flatnonzero(shapely.intersects(search_area, geometries))
+
+        osm_ids = table.column("osm_id").to_pylist()
+        tag_values = {tag: table.column(tag).to_pylist() for tag in tag_columns}
+        features = []
+        for i in keep.tolist():
+            feature = {tag: values[i] for tag, values in tag_values.items()}
+            feature["geometry"] = geometries[i]
+            feature["osm_id"] = osm_ids[i]
+            feature["source"] = "local"
+            features.append(feature)
+        return features
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_local_feature_store(path=LOCAL_FEATURE_STORE_PATH):
+    """The store at path, opened once per process, or None if it doesn't exist."""
+    if not os.path.exists(path):
+        return None
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = LocalFeatureStore(path)
+        return _stores[path]
+
+
+def tag_text(value):
+    """A tag value as text, or None when it's missing (None, NaN, pd.NA or NaT)."""
+    # lists aren't scalars, and pd.isna on one would give an array
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    return str(value)
+
+
+def build_local_feature_store(features, output_path=LOCAL_FEATURE_STORE_PATH, tags=DEFAULT_TAGS, row_group_size=4096):
+    """Write a GeoDataFrame of OSM features (EPSG:4326, OSMnx layout or flat) as a local feature store."""
+    features = features.to_crs("EPSG:4326") if features.crs is not None else features.set_crs("EPSG:4326")
+    features = features[features.geometry.notna() & ~features.geometry.is_empty]
+
+    if "osm_id" in features.columns:
+        osm_ids = features["osm_id"]
+    elif features.index.nlevels > 1:
+        osm_ids = features.index.get_level_values(-1)  # OSMnx indexes by (element, id)
+    else:
+        osm_ids = features.index
+    store = features[[tag for tag in tags if tag in features.columns]].copy()
+    for tag in store.columns:
+        # OSM tags are text; OSMnx sometimes hands back lists or numbers
+        store[tag] = store[tag].map(tag_text).astype(object)
+    store["osm_id"] = pd.to_numeric(pd.Series(np.asarray(osm_ids), index=store.index), errors="coerce").astype("Int64")
+    store = gpd.GeoDataFrame(store, geometry=features.geometry, crs="EPSG:4326")
+    store[BBOX_COLUMNS] = features.geometry.bounds.to_numpy()
+
+    store = store.iloc[np.argsort(store.geometry.hilbert_distance(), kind="stable")].reset_index(drop=True)
+    store.to_parquet(output_path, row_group_size=row_group_size)
+    with _stores_lock:
+        _stores.pop(output_path, None)
+    return len(store)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--bbox", type=float, nargs=4, metavar=("WEST", "SOUTH", "EAST", "NORTH"), help="download with OSMnx")
+    source.add_argument("--from-file", help="any file GeoPandas can read")
+    parser.add_argument("--layer", action="append", help="layer(s) to read from --from-file")
+    parser.add_argument("--tags", nargs="+", default=DEFAULT_TAGS)
+    parser.add_argument("--output", default=LOCAL_FEATURE_STORE_PATH)
+    args = parser.parse_args()
+
+    if args.bbox:
+        import osmnx as ox
+        frame = ox.features_from_bbox(tuple(args.bbox), {tag: True for tag in args.tags})
+    else:
+        layers = args.layer or [None]
+        frame = pd.concat([gpd.read_file(args.from_file, layer=layer) for layer in layers], ignore_index=True)
+        frame = gpd.GeoDataFrame(frame, geometry="geometry", crs=frame.crs)
+    count = build_local_feature_store(frame, args.output, args.tags)
+    print(f"Wrote {count} features to {args.output}")
@@ -1,16 +1,13 @@
 import pandas as pd
 
 def osmnx_load_rtree(rtree_index,search_tags, results):
-    i = 0
-    for idx, landmark_row in results.iterrows():
-        geom = landmark_row['geometry']
-        #print(idx)
-        #id = landmark_row["osmid"]
-        #store only the relevant tags into the filtered_dict, none of the other stuff
-        filtered_dict = {key: landmark_row[key] if not pd.isna(landmark_row[key]) else None for key in search_tags.keys() if key in landmark_row}
-        # Optionally, if you want to also include geometry in the stored object:
-        filtered_dict['geometry'] = landmark_row['geometry']
-        #filtered_dict['geometry'] = landmark_row['osm_id']
-        filtered_dict['osm_id'] = idx[1]
-        rtree_index.insert(i, geom.bounds, obj=filtered_dict)
-        i+=1
\ No newline at end of file
+    #store only the relevant tags for each feature, none of the other stuff.
+    #Whole columns are converted at once; iterrows builds a Series per row and is far slower.
+    tag_columns = [key for key in search_tags.keys() if key in results.columns]
+    tags = results[tag_columns].astype(object)
+    features = tags.where(tags.notna(), None).to_dict("records")
+    osm_ids = results.index.get_level_values(1).tolist()
+    for feature, geometry, osm_id in zip(features, results.geometry.array, osm_ids):
+        feature['geometry'] = geometry
+        feature['osm_id'] = osm_id
+    rtree_index.load(features)
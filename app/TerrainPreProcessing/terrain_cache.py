@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import geopandas as gpd
+import numpy as np
+
+from .geometry_utils import SearchGrid, FeatureIndex, feature_search_tags
+
+try:
+    import pyarrow  # noqa: F401  GeoParquet needs it
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "terrain_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_VERSION = 1  # bump when the stored layout changes so old entries are ignored
+
+
+class TerrainCache:
+    """
+    Persistent cache of fetched terrain features and the search grid built from them.
+
+    An entry is a directory holding the features as GeoParquet, the grid arrays as .npz and a
+    small JSON header. Entries are keyed by the rounded bounding box, the search tags and the
+    grid sizing parameters. Loading an entry refreshes its mtime, and the least recently used
+    entries are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, bbox_decimals=5):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bbox_decimals = bbox_decimals  # 5 decimals is about a metre, so a re-drawn area still hits
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, extremes, search_tags, maximum_square_size, minimum_grid_size, server_side_geometry=False,
+                 polygon_points=(), feature_source=None):
+        """
+        Key for a search area. PostGIS and the local store return only the features intersecting
+        the exact polygon (clipped to it with server_side_geometry), so its rounded vertices are part
+        of the key as well as the bbox, and so is the feature source the caller asked for.
+        """
+        bbox = [round(extremes[name], self.bbox_decimals) for name in
+                ("lowest_latitude", "leftmost_longitude", "highest_latitude", "rightmost_longitude")]
+        polygon = [[round(float(x), self.bbox_decimals), round(float(y), self.bbox_decimals)] for x, y in polygon_points]
+        description = json.dumps({
+            "version": CACHE_VERSION,
+            "bbox": bbox,
+            "polygon": polygon,
+            "feature_source": feature_source,
+            "search_tags": sorted((str(tag), str(condition)) for tag, condition in search_tags.items()),
+            "maximum_square_size": maximum_square_size,
+            "minimum_grid_size": minimum_grid_size,
+            # clipped, simplified features give a different grid from full-resolution ones
+            **({"server_side_geometry": True} if server_side_geometry else {}),
+        }, sort_keys=True)
+        return hashlib.sha1(description.encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """(FeatureIndex, SearchGrid) stored under key, or None."""
+        if not HAS_PYARROW:
+            return None
+        path = self._entry_path(key)
+        with self.lock:
+            if not os.path.isdir(path):
+                self.misses += 1
+                return None
+            try:
+                with open(os.path.join(path, "header.json")) as f:
+                    header = json.load(f)
+                features_frame = gpd.read_parquet(os.path.join(path, "features.parquet"))
+                with np.load(os.path.join(path, "grid.npz")) as stored:
+                    arrays = {name: stored[name] for name in stored.files}
+            except Exception as e:
+                print(f"Discarding unreadable terrain cache entry {key}: {e}")
+                shutil.rmtree(path, ignore_errors=True)
+                self.misses += 1
+                return None
+            os.utime(path)  # mark as recently used
+            self.hits += 1
+
+        features_frame = features_frame.astype(object).where(features_frame.notna(), None)
+        features = features_frame.to_dict("records")
+        rtree_index = FeatureIndex()
+        rtree_index.load(features)
+        search_tags = header["search_tags"]
+        grid = SearchGrid.from_arrays(arrays, search_tags, tuple(header["top_left"]), header["square_size"],
+                                      feature_search_tags(features, search_tags))
+        return rtree_index, grid
+
+    def store(self, key, rtree_index, grid):
+        if not HAS_PYARROW:
+            print("pyarrow is not installed, the terrain cache is disabled")
+            return
+        path = self._entry_path(key)
+        staging = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(staging, exist_ok=True)
+            gpd.GeoDataFrame(rtree_index.features, geometry="geometry", crs="EPSG:4326").to_parquet(
+                os.path.join(staging, "features.parquet"))
+            np.savez_compressed(os.path.join(staging, "grid.npz"), **grid.to_arrays())
+            with open(os.path.join(staging, "header.json"), "w") as f:
+                json.dump({
+                    "search_tags": grid.search_tags,
+                    "top_left": list(grid.top_left),
+                    "square_size": grid.square_size,
+                    "feature_count": len(rtree_index),
+                    "created": time.time(),
+                }, f)
+        except Exception as e:
+            print(f"Unable to write terrain cache entry: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        with self.lock:
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(staging, path)
+            self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if not os.path.isdir(entry) or name.endswith(".tmp"):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), entry, size))
+            total += size
+        for _, entry, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def get_stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_terrain_cache = None
+
+def get_terrain_cache():
+    global _terrain_cache
+    if _terrain_cache is None:
+        _terrain_cache = TerrainCache()
+    return _terrain_cache
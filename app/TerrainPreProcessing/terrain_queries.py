@@ -1,20 +1,59 @@
-from .geometry_utils import find_extreme_coordinates, rectangle_side_lengths, add_meters_to_latitude, add_meters_to_longitude, Tile
+from .geometry_utils import find_extreme_coordinates, rectangle_side_lengths, SearchGrid, FeatureIndex, feature_search_tags
+from .terrain_cache import get_terrain_cache
 from .osmnx_handler import osmnx_load_rtree
-from .postgis_handler import query_osm_features, postgis_load_rtree,query_osm_features_all
+from .postgis_handler import query_osm_features, postgis_load_rtree,query_osm_features_all, stream_osm_features_all, format_query_timings
 from .visualization import plot_postGIS_data, plot_search_area
-from .check_internet import has_internet
-from rtree import index
+from .check_internet import get_connectivity_monitor
+from .local_feature_store import get_local_feature_store
 from shapely import Polygon
+import shapely
 import osmnx as ox
 import pandas as pd
+import os
+
+
+#Which backend get_features reads terrain from:
+#  "auto"    - the local feature store if its file exists and has features for the area, otherwise
+#              (or if reading it fails) OSMnx (when asked for and online) or PostGIS
+#  "local"   - only the local feature store
+#  "osmnx"   - OSMnx, falling back to PostGIS when offline
+#  "postgis" - only PostGIS
+FEATURE_SOURCE = os.environ.get("VITALS_FEATURE_SOURCE", "auto")
 
 
     
-def get_features(rtree_index, useOSMNX: bool, osmnx_points, postGIS_points, search_tags):
+def get_features(rtree_index, useOSMNX: bool, osmnx_points, postGIS_points, search_tags, server_side_geometry = False, simplify_tolerance = 0.0):
+
+    local_store = get_local_feature_store() if FEATURE_SOURCE in ("auto", "local") else None
+    if local_store is not None:
+        print("Getting information from the local feature store")
+        try:
+            features = local_store.query(search_tags, postGIS_points)
+        except Exception as e:
+            print(f"Unexpected local feature store Error: {e}")
+            features = None
+        if features:
+            rtree_index.load(features)
+            print(f"Loaded {len(features)} features into R-tree from the local feature store.")
+            return True
+        if FEATURE_SOURCE == "local":
+            print("Local feature store returned no features.")
+            return False
+        #A partial or stale store shouldn't break areas the online sources still cover
+        print("Local feature store has no features for this area, falling back to OSMnx/PostGIS")
+    elif FEATURE_SOURCE == "local":
+        print("No local feature store found, unable to get features")
+        return False
+    if FEATURE_SOURCE == "osmnx":
+        useOSMNX = True
+    elif FEATURE_SOURCE == "postgis":
+        useOSMNX = False
 
     if useOSMNX:
         print("Getting information from OSMNX")
-        if not has_internet():
+        #Answered from the background monitor's last check, so this never waits on the network.
+        #Until the first check has finished the connection counts as down.
+        if not get_connectivity_monitor().is_online(default=False):
             useOSMNX = False
             print("No Internet! Attempting to use PostGIS database")
 
@@ -45,15 +84,18 @@ def get_features(rtree_index, useOSMNX: bool, osmnx_points, postGIS_points, sear
         print("Getting information from PostGIS database")
         try:
             print("Attempt to query POSTGIS")
-            info = query_osm_features_all(search_tags, postGIS_points)
+            #Features are indexed batch by batch as they stream in, so the full result set is never held as rows.
+            feature_count = stream_osm_features_all(
+                search_tags, postGIS_points,
+                lambda batch: postgis_load_rtree(rtree_index, batch, transform=not server_side_geometry),
+                server_side_geometry=server_side_geometry, simplify_tolerance=simplify_tolerance)
             print("Got past?")
-            if info is None or not info:
+            if not feature_count:
                 print("PostGIS returned no features. Skipping PostGIS processing.")
                 return False  # No data from PostGIS either
 
-            #plot_postGIS_data(info)
-            print(f"Loaded {len(info)} features into R-tree from PostGIS.")
-            postgis_load_rtree(rtree_index, info)
+            print(f"Loaded {feature_count} features into R-tree from PostGIS.")
+            print(f"PostGIS stage timings: {format_query_timings()}")
             return True
 
         except Exception as e:
@@ -64,8 +106,23 @@ def get_features(rtree_index, useOSMNX: bool, osmnx_points, postGIS_points, sear
     
 
 
-def create_search_area(polygon_points, search_tags, useOSMX = True,maximum_square_size = 60, minimum_grid_size = 8):
+def create_search_area(polygon_points, search_tags, useOSMX = True,maximum_square_size = 60, minimum_grid_size = 8, use_cache = True, server_side_geometry = False):
     extremes = find_extreme_coordinates(polygon_points)
+    postGIS_points = [(lat,lon) for lon,lat in polygon_points]
+
+    #A repeat mission over the same area is answered from disk, without OSMnx or PostGIS.
+    #PostGIS and the local store filter (and may clip) features by the exact polygon, not its bbox,
+    #so the polygon and the requested feature source are part of the key.
+    cache = get_terrain_cache() if use_cache else None
+    feature_source = f"{FEATURE_SOURCE}:{'osmnx' if useOSMX else 'postgis'}"
+    cache_key = cache.make_key(extremes, search_tags, maximum_square_size, minimum_grid_size, server_side_geometry,
+                               polygon_points=polygon_points, feature_source=feature_source) if cache else None
+    cached = cache.load(cache_key) if cache else None
+    if cached is not None:
+        rtree_index, grid = cached
+        print(f"Loaded {len(rtree_index)} features and a {len(grid)}x{len(grid)} grid from the terrain cache")
+        mark_search_area(grid, postGIS_points)
+        return rtree_index, grid, grid.viable_positions()
 
     top_left = (extremes["highest_latitude"],extremes["leftmost_longitude"])
     bottom_right = (extremes["lowest_latitude"], extremes["rightmost_longitude"])
@@ -93,8 +150,6 @@ def create_search_area(polygon_points, search_tags, useOSMX = True,maximum_squar
         temp = size/minimum_grid_size
         grid_length = minimum_grid_size
 
-    grid = [[Tile() for _ in range(grid_length)] for _ in range(grid_length)]
-
     square_size = temp
 
     print(f"Square Size (in metters): {square_size}")
@@ -103,68 +158,45 @@ def create_search_area(polygon_points, search_tags, useOSMX = True,maximum_squar
     bottom_left, top_right = (extremes["lowest_latitude"],extremes["leftmost_longitude"]),(extremes["highest_latitude"],extremes["rightmost_longitude"])
 
     osmnx_points = (*bottom_left[::-1], *top_right[::-1])
-    postGIS_points = [(lat,lon) for lon,lat in polygon_points]
     #gather the data from osmnx
     #results = ox.features_from_bbox(points,search_tags)
     #results.plot()
-    rtree_index = index.Index()
+    rtree_index = FeatureIndex()
     #osmnx_load_rtree(rtree_index,search_tags,results)
-    success = get_features(rtree_index, useOSMX, osmnx_points,postGIS_points, search_tags)
+    #With server_side_geometry PostGIS clips, simplifies and reprojects the features itself.
+    #Detail much finer than a grid cell doesn't change which cells a feature touches.
+    success = get_features(rtree_index, useOSMX, osmnx_points,postGIS_points, search_tags,
+                           server_side_geometry=server_side_geometry, simplify_tolerance=square_size / 4)
 
     if not success:
         print("unable to create a search area")
         return None,None,None
 
-    viable_grid_positions = fill_grid_data(rtree_index, grid, top_left, square_size, search_tags, postGIS_points)
+    grid = SearchGrid(grid_length, search_tags, top_left, square_size)
+    viable_grid_positions = fill_grid_data(rtree_index, grid, postGIS_points)
+
+    if cache:
+        cache.store(cache_key, rtree_index, grid)
 
     return rtree_index, grid, viable_grid_positions
     # Generate tiles and fetch OSM features
 
 
-def fill_grid_data(rtree_index, grid, top_left, square_size, search_tags,postGIS_points):
-    #Note. I need to make it so that if a square doesn't intersect with the search area, that it's marked as Unavailable. 
-    #This will let the drone know that although this grid is here, it's not part of the search area, and thus shouldn't be explored. 
-    count = 0
-    t_left = [0,0]
-    b_right = [0,0]
+def mark_search_area(grid, postGIS_points):
+    #If a square doesn't intersect with the search area it's marked as not in the search area,
+    #so the drones know that although the grid cell is here, it shouldn't be explored.
     actual_search_area = Polygon(postGIS_points)
-    viable_grid_positions = []
-    for i in range(len(grid)):
-        t_left[0] = top_left[0] if i == 0 else add_meters_to_latitude(top_left[0],(i*(-square_size)))
-        b_right[0] = add_meters_to_latitude(top_left[0],((i+1)*(-square_size)))
-        for j in range(len(grid)):
-            t_left[1] = top_left[1] if j == 0 else add_meters_to_longitude(t_left[0], top_left[1], j*square_size)
-            b_right[1] = add_meters_to_longitude(b_right[0], top_left[1], (j+1)*square_size)
-            #'28.6178539,-81.2237312,#00FF00,marker,"Point # T_L"'
-            
-            b_left = [b_right[0], t_left[1]]
-            t_right = [t_left[0],b_right[1]]
-            
-            #minx, miny, maxx, maxy
-            #minLongitude, minLatitude, MaxLongitude, MaxLatitude
-            search_bb = (b_left[1],b_left[0],t_right[1],t_right[0])
-            result = list(rtree_index.intersection(search_bb,objects=True))
-            grid[i][j].contains_count = {tag: 0 for tag in search_tags}
-            grid[i][j].contains = {tag: list() for tag in search_tags}
-            grid[i][j].total_count = 0
-            for r in result:
-                data = r.object
-                for tag in search_tags:
-                        if tag not in data:
-                            continue
-                        if not pd.isna(data[tag]):
-                            #Only increase to the count, and add to the contains if it wasn't nan
-                            grid[i][j].contains_count[tag] += 1
-                            grid[i][j].total_count += 1
-                            grid[i][j].contains[tag].append(data[tag])
-                            #grid[i][j].contains[tag].append(data["geometry"])
-            #print(f"Total Count: {grid[i][j].total_count}")
-            flipped_coordinates = [(lon, lat) for lat, lon in [t_left,t_right,b_right,b_left]]
-            grid[i][j].polygon = Polygon(flipped_coordinates)
-            grid[i][j].in_searcharea = actual_search_area.intersects(grid[i][j].polygon)
-            count+= 1
-            if grid[i][j].in_searcharea:
-                viable_grid_positions.append((i,j))
-            #print(f'{t_left[0]},{t_left[1]},#00FF00,marker,"Point #{i},{j} T_L"')
-            #print(f'{b_right[0]},{b_right[1]},#00FF00,marker,"Point #{i},{j} B_R"')
-    return viable_grid_positions
\ No newline at end of file
+    shapely.prepare(actual_search_area)
+    grid.in_searcharea = shapely.intersects(actual_search_area, grid.polygons)
+
+
+def fill_grid_data(rtree_index, grid, postGIS_points):
+    mark_search_area(grid, postGIS_points)
+
+    # One bulk query matches every cell against every feature bounding box, the same
+    # bounding-box test the per-cell rtree intersection did.
+    if len(rtree_index):
+        cell_idx, feature_idx = rtree_index.query(grid.polygons.ravel())
+        grid.set_cell_features(cell_idx, feature_idx, feature_search_tags(rtree_index.features, grid.search_tags))
+
+    return grid.viable_positions()
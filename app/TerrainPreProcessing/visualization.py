@@ -373,7 +373,7 @@ class Interactive_Visualization:
 
         if drone_paths:
             self.display_drone_paths(drone_paths)
-            current_drone = self.missionState.drones[0]
+            current_drone = self.missionState.drones.ordered()[0]
             x,y = current_drone.longitude / 10**7,current_drone.latitude/ 10**7
             
             point, = self.ax.plot([x], [y], marker="o", color="green", markersize=15)  # Blue dot as an example
@@ -391,7 +391,7 @@ class Interactive_Visualization:
                 x_coords = []
                 y_coords = []
                 for drone_id in drone_paths:
-                    current_drone = self.missionState.drones[drone_id]
+                    current_drone = self.missionState.drones.ordered()[drone_id]
                     x,y = current_drone.longitude / 10**7,current_drone.latitude/ 10**7
                     x_coords.append(x)
                     y_coords.append(y)
@@ -0,0 +1,57 @@
+import bisect
+
+
+class DroneRegistry:
+    """
+    Drones keyed by MAVLink system id, with an id-ordered view kept on the side.
+
+    Lookups by id are a single dict access, so per-packet handlers stay constant-time
+    as the swarm grows. Iterating the registry yields drones in ascending id order,
+    which is the order path planning assigns search routes in.
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._ids = []  # sorted drone ids
+        self._ordered = []  # drones in the same order as _ids
+
+    def add(self, drone_id, drone):
+        """Add or replace the drone registered under drone_id."""
+        if drone_id in self._by_id:
+            self._ordered[bisect.bisect_left(self._ids, drone_id)] = drone
+        else:
+            position = bisect.bisect_left(self._ids, drone_id)
+            self._ids.insert(position, drone_id)
+            self._ordered.insert(position, drone)
+        self._by_id[drone_id] = drone
+
+    def remove(self, drone_id):
+        drone = self._by_id.pop(drone_id, None)
+        if drone is not None:
+            position = bisect.bisect_left(self._ids, drone_id)
+            del self._ids[position]
+            del self._ordered[position]
+        return drone
+
+    def get(self, drone_id, default=None):
+        return self._by_id.get(drone_id, default)
+
+    def ids(self):
+        """Registered drone ids in ascending order."""
+        return list(self._ids)
+
+    def ordered(self):
+        """Registered drones in ascending id order."""
+        return list(self._ordered)
+
+    def __contains__(self, drone_id):
+        return drone_id in self._by_id
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(list(self._ordered))  # snapshot, so handlers may add drones while iterating
+
+    def __bool__(self):
+        return bool(self._by_id)
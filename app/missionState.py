@@ -9,10 +9,12 @@ from TerrainPreProcessing.visualization import plot_search_area, plot_advanced,
 from TerrainPreProcessing.visualization import Interactive_Visualization
 from PathPlanning.path import search_grid_with_drones
 from LangGraph import langChainMain
-import concurrent.futures
+import time
 from Utils import coordinate_estimation
+from Utils.drone_registry import DroneRegistry
 import heapq
 from ComputerVision import objectDetection
+from ComputerVision.detection_pipeline import DetectionPipeline, DetectionCapture
 import cv2
 import threading
 
@@ -87,14 +89,12 @@ class Drone:
             self.pauseJob()
         job.status = "loading"
         self.active_job = job
-        waypoint_payload = []
-        # append waypoints from last waypoint to the end of the list
+        # waypoints from the last one reached (mission item n is waypoint n - 1) to the end of the list
         if self.active_job.last_waypoint > 1:
-            for i in range(self.active_job.last_waypoint, len(self.active_job.waypoints)):
-                waypoint_payload.append(self.active_job.waypoints[i- 1])
+            waypoint_payload = self.active_job.waypoints[self.active_job.last_waypoint - 1:]
         else:
             waypoint_payload = self.active_job.waypoints
-        # send the waypoints to the drone
+        # send the waypoints to the drone; the dispatcher only sends what the drone doesn't already hold
         self.missionState.send_waypoints(self.drone_id, waypoint_payload)
         self.missionState.gui.updateJobs(self.drone_id, self.active_job, self.jobQueue.queue)
     
@@ -224,8 +224,10 @@ class jobPriorityQueue:
 class missionState:
 
     def __init__(self, gui):
-        self.drones = []
+        self.drones = DroneRegistry()
         self.pois = []
+        self.pending_pois = []  # new POIs the GUI thread hasn't created yet, so nearby detections don't duplicate them
+        self.poi_lock = threading.Lock()  # pois and pending_pois, shared by the detection workers and the Tk thread
         self.gcs_location = None  # Global Control Station location (latitude, longitude)
         
         self.missionPolygon = None
@@ -233,6 +235,8 @@ class missionState:
         self.gui = gui
         self.loop = asyncio.new_event_loop()
         self.dispatcher = Dispatcher.Dispatcher(self)
+        self.pending_deployment = None  # drone_id -> waypoints collected while deployInitialPaths assigns jobs
+        self.deployment = None  # last MissionDeployment, for its per-drone progress
         self.jobIDCounter = 100
         # TEST VALUES
         self.mission_waypoints = [(28.6013158, -81.2020057, 10, 0 ), (28.6031200, -81.1993369, 10, 0) , (28.6004825, -81.1942729, 10, 0)]
@@ -241,6 +245,16 @@ class missionState:
 
         #for simulation purposes
         self.detectionPoints = []
+
+        # Detection runs on its own workers so telemetry handlers never wait on YOLO or the LLM
+        self.detection_pipeline = DetectionPipeline(
+            detect=self.detect_capture,
+            locate=self.locate_detection,
+            merge=self.merge_detection,
+            describe=self.describe_poi,
+            workers=4,  # frames in flight together for the same model are batched by objectDetection's model registry
+        )
+        self.detection_pipeline.start()
         
         
     def connect_to_mavlink(self):
@@ -263,12 +277,11 @@ class missionState:
         self.loop.run_until_complete(self.dispatcher.receive_packets())
 
     def addDrone(self, drone_id, system_status):
-        self.drones.append(Drone(self, drone_id, system_status, 10 + (5 * len(self.drones))))
-        self.drones.sort(key=lambda x: x.drone_id)
+        self.drones.add(drone_id, Drone(self, drone_id, system_status, 10 + (5 * len(self.drones))))
         self.gui.addDrone(drone_id, system_status)
 
     def updateDronePosition(self, drone_id, latitude, longitude, altitude, relative_altitude, heading, vx, vy, vz):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             drone.updatePosition(latitude, longitude, altitude, relative_altitude, heading, vx, vy, vz)
             #check if drone is within 20 meters of the target detection points
@@ -287,7 +300,7 @@ class missionState:
 
 
     def updateDroneTelemetry(self, drone_id, roll, pitch, yaw):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             drone.updateTelemetry(roll, pitch, yaw)
 
@@ -343,14 +356,23 @@ class missionState:
         pass
 
     def deployInitialPaths(self):
-        for i, drone in enumerate(self.drones):
-            converted_waypoints = []
-            for j, coord in enumerate(self.drone_search_destinations[i]):
-                converted_waypoints.append((coord.y, coord.x, drone.operatingAltitude, 0))
-            self.create_job("Initial Search", converted_waypoints, 1, drone.drone_id)
+        # collect every drone's upload and send them as one deployment so the drones take off together
+        self.pending_deployment = {}
+        try:
+            for i, drone in enumerate(self.drones):
+                converted_waypoints = []
+                for j, coord in enumerate(self.drone_search_destinations[i]):
+                    converted_waypoints.append((coord.y, coord.x, drone.operatingAltitude, 0))
+                self.create_job("Initial Search", converted_waypoints, 1, drone.drone_id)
+        finally:
+            missions, self.pending_deployment = self.pending_deployment, None
+        if missions:
+            self.deployment = self.dispatcher.deploy_missions(missions)
 
 
     def startSearchMission(self):
+        # load each drone's vision model in the background so the first detection doesn't wait on it
+        objectDetection.get_model_registry().warm_up([drone.visionModel for drone in self.drones])
         self.deployInitialPaths()
 
 
@@ -360,7 +382,7 @@ class missionState:
 
     def updateDroneStatus(self, drone_id, system_status):
         # check if drone exists yet 
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is None:
             self.addDrone(drone_id, system_status)
         else:
@@ -370,7 +392,7 @@ class missionState:
         return self.drones
     
     def get_drone(self, drone_id):
-        return next((d for d in self.drones if d.drone_id == drone_id), None)
+        return self.drones.get(drone_id)
 
     def arm_mission(self, drone_id):
         self.dispatcher.arm_drone(drone_id)
@@ -381,6 +403,9 @@ class missionState:
     def send_waypoints(self, drone_id, waypoints):
 
         print("Sending waypoints")
+        if self.pending_deployment is not None:
+            self.pending_deployment[drone_id] = waypoints
+            return
         self.dispatcher.send_mission(drone_id, waypoints)
     
     def return_to_launch(self, drone_id):
@@ -393,12 +418,17 @@ class missionState:
         self.dispatcher.request_mission_list(drone_id)
     
     def handle_reached_waypoint(self, drone_id, waypoint):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             drone.setLastWaypoint(waypoint)
     
+    def handle_mission_upload_failed(self, drone_id):
+        drone = self.drones.get(drone_id)
+        if drone is not None and drone.active_job is not None:
+            drone.setJobFailedUpload()
+
     def handle_mission_state_update(self, drone_id, mission_state):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             if mission_state == 5:
                 if drone.last_mission_state != 5: # this ensures that the drone is not already in the state
@@ -406,13 +436,13 @@ class missionState:
             drone.last_mission_state = mission_state
             
     def create_job(self, job_type, waypoints, job_priority, drone_id):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             job = Job(job_type, "pending", waypoints, self, job_priority)
             drone.addJob(job)
     
     def test_add_job(self, drone_id, use_waypoints):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             if use_waypoints == 1:
                 job = Job("Automated Path", "pending", self.mission_waypoints, self, 1)
@@ -426,7 +456,7 @@ class missionState:
             
     
     def get_drone(self, drone_id):
-        return next((d for d in self.drones if d.drone_id == drone_id), None)
+        return self.drones.get(drone_id)
     
     def getDrones(self):
         """returns drone list in a readable format for llm"""
@@ -470,13 +500,13 @@ class missionState:
         poi = next((p for p in self.pois if p.id == int(poi_id)), None)
         print(f"POI: {poi}")
         if poi is not None:
-            drone = next((d for d in self.drones if d.drone_id == int(drone_id)), None)
+            drone = self.drones.get(int(drone_id))
             if drone is not None:
                 job = Job(f"Investigate POI {poi.id} ", "pending", [(poi.lat, poi.lon, int(drone.operatingAltitude), 2)], self, priority)
                 drone.addJob(job)
     
     def call_drone_home(self, drone_id):
-        drone = next((d for d in self.drones if d.drone_id == int(drone_id)), None)
+        drone = self.drones.get(int(drone_id))
         if drone is not None:
             drone.setDroneUnavailable()
             self.dispatcher.return_to_launch(int(drone_id))
@@ -497,59 +527,92 @@ class missionState:
         self.handle_image_detection(drone_id, image_path)
     
     def handle_image_detection(self, drone_id, image_path):
-        # Run the LLM in a separate thread to prevent UI freezing
-        def process_image():
-            result = langChainMain.give_image_description(image_path)
-            return result.content  # Extract the description
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(process_image)
-            description = future.result()  # Wait for the result in a non-blocking way
-
-        image, detections = objectDetection.detect_and_draw(image_path)
-        if detections is None or len(detections) == 0:
-            print("No objects detected in the image.")
-            return
-        else:
-            # Now process the estimated position
-            drone = next((d for d in self.drones if d.drone_id == drone_id), None)
-            if drone is None:
-                return
-            
-            
-            
-            estimated_lat, estimated_lon = coordinate_estimation.estimate_position( 
-                drone.latitude / 1e7, 
-                drone.longitude / 1e7, 
-                drone.altitude / 1000, 
-                -10, 
-                0, 
-                90,  # Assuming a FOV of 90 degrees for simplicity
-                960,  # x coordinate in the image (center)
-                540,  # y coordinate in the image (center)
-                drone.heading,
-                image_width=1920,
-                image_height=1080
-            )
-
-            # Check if the detected POI already exists within 20 meters
-            for poi in self.pois:
-                if coordinate_estimation.calculate_distance_between_points(estimated_lat, estimated_lon, poi.lat, poi.lon) < 40:
-                    os.makedirs(f"Missions/{self.missionID}/POIs/{poi.id}", exist_ok=True)
-                    cv2.imwrite(f"Missions/{self.missionID}/POIs/{poi.id}/{os.path.basename(image_path)}", image)
-                    poi.positive_flags += 1
-                    if poi.positive_flags >= 3:
-                        poi.target_found(drone_id)  # Mark the POI as found if it has enough positive flags
-                        
-                    return
+        """Snapshot where the drone is and queue the image for detection. Returns immediately."""
+        drone = self.drones.get(drone_id)
+        if drone is None or drone.latitude is None:
+            return False
+        capture = DetectionCapture(drone_id, image_path, drone.latitude, drone.longitude, drone.altitude, drone.heading, time.time(), drone.visionModel)
+        return self.detection_pipeline.submit(capture)
+
+    def detect_capture(self, capture):
+        return objectDetection.detect_and_draw(capture.image_path, capture.vision_model)
+
+    def locate_detection(self, capture, detections):
+        return coordinate_estimation.estimate_position(
+            capture.latitude / 1e7,
+            capture.longitude / 1e7,
+            capture.altitude / 1000,
+            -10,
+            0,
+            90,  # Assuming a FOV of 90 degrees for simplicity
+            960,  # x coordinate in the image (center)
+            540,  # y coordinate in the image (center)
+            capture.heading,
+            image_width=1920,
+            image_height=1080
+        )
+
+    def merge_detection(self, capture, position, image, detections):
+        """Add the detection to a POI within 40 meters or have the GUI create a new one.
+
+        Runs on the detection workers, so POI widgets are only touched through the GUI's update bus;
+        a new POI is described once the Tk thread has created it (_on_poi_created)."""
+        estimated_lat, estimated_lon = position
+        drone_id = capture.drone_id
+        image_name = os.path.basename(capture.image_path)
+
+        def is_near(lat, lon):
+            return coordinate_estimation.calculate_distance_between_points(estimated_lat, estimated_lon, lat, lon) < 40
+
+        with self.poi_lock:
+            # Check if the detected POI already exists within 40 meters
+            poi = next((poi for poi in self.pois if is_near(poi.lat, poi.lon)), None)
+            if poi is not None:
+                poi.positive_flags += 1
+                found = poi.positive_flags >= 3
+            else:
+                # or is still being created on the GUI thread
+                pending = next((pending for pending in self.pending_pois if is_near(pending["lat"], pending["lon"])), None)
+                if pending is not None:
+                    pending["images"].append((image_name, image))
+                    return None
+                pending = {"lat": estimated_lat, "lon": estimated_lon, "images": [(image_name, image)]}
+                self.pending_pois.append(pending)
 
-            # If no existing POI, create a new one
-            poi_id = self.gui.map_page.add_poi(estimated_lat, estimated_lon, "Detected POI", description)
-            self.create_poi_investigate_job(poi_id, drone_id, 5)
+        if poi is not None:
+            os.makedirs(f"Missions/{self.missionID}/POIs/{poi.id}", exist_ok=True)
+            cv2.imwrite(f"Missions/{self.missionID}/POIs/{poi.id}/{image_name}", image)
+            if found:
+                self.gui.markPOITargetFound(poi, drone_id)  # Mark the POI as found if it has enough positive flags
+            return None
+
+        # If no existing POI, create a new one; its description is filled in once the LLM answers
+        self.gui.addDetectedPOI(estimated_lat, estimated_lon, "Detected POI", "",
+                                lambda poi_id: self._on_poi_created(poi_id, pending, capture))
+        return None
+
+    def _on_poi_created(self, poi_id, pending, capture):
+        """Tk thread: the POI for a new detection exists; queue its investigation, images and description."""
+        with self.poi_lock:
+            self.pending_pois.remove(pending)
+            images = list(pending["images"])
+        poi = next((poi for poi in self.pois if poi.id == poi_id), None)
+        self.create_poi_investigate_job(poi_id, capture.drone_id, 5)
+
+        # Store images in POI directory
+        os.makedirs(f"Missions/{self.missionID}/POIs/{poi_id}", exist_ok=True)
+        for image_name, image in images:
+            cv2.imwrite(f"Missions/{self.missionID}/POIs/{poi_id}/{image_name}", image)
+        if poi is None:
+            return
+        poi.positive_flags += len(images) - 1  # detections that arrived while it was being created
+        if poi.positive_flags >= 3:
+            poi.target_found(capture.drone_id)
+        self.detection_pipeline.describe_later(capture, poi)
 
-            # Store image in POI directory
-            os.makedirs(f"Missions/{self.missionID}/POIs/{poi_id}", exist_ok=True)
-            cv2.imwrite(f"Missions/{self.missionID}/POIs/{poi_id}/{os.path.basename(image_path)}", image)
+    def describe_poi(self, capture, poi):
+        result = langChainMain.give_image_description(capture.image_path)
+        poi.description = result.content  # Extract the description
     
     def set_gcs_location(self, coordinates_tuple):
         self.gcs_location = coordinates_tuple
@@ -558,14 +621,14 @@ class missionState:
         self.detectionPoints = points
 
     def  get_drone_operatingAltitude(self, drone_id):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             return drone.get_operatingAltitude()
         else:
             return None
     
     def  set_drone_operatingAltitude(self, drone_id, altitude):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             drone.set_operatingAltitude(altitude)
             self.gui.updateDroneOperatingAltitude(drone_id, altitude)
@@ -573,20 +636,21 @@ class missionState:
             return None
     
     def get_drone_vision_model(self, drone_id):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             return drone.visionModel
         else:
             return None
     def set_drone_vision_model(self, drone_id, model):
-        drone = next((d for d in self.drones if d.drone_id == drone_id), None)
+        drone = self.drones.get(drone_id)
         if drone is not None:
             drone.visionModel = model
+            objectDetection.get_model_registry().warm_up([model])
             self.gui.updateDroneVisionModel(drone_id, model)
         else:
             return None
     def remove_poi_investigate_job(self, droneID):
-        drone = next((d for d in self.drones if d.drone_id == droneID), None)
+        drone = self.drones.get(droneID)
         if drone is not None and drone.active_job is not None:
             if drone.active_job.job_type.startswith("Investigate POI"):
                 print(f"Removing job {drone.active_job.job_id} for drone {droneID}")
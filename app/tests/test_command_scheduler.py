@@ -0,0 +1,131 @@
+import time
+
+import pytest
+from pymavlink import mavutil
+
+from Dispatcher.command_scheduler import CommandScheduler
+
+NAV_WAYPOINT = mavutil.mavlink.MAV_CMD_NAV_WAYPOINT
+RTL = mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH
+
+
+class FakeLink:
+    """Stands in for the socket: keeps every frame the encoder writes."""
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, data):
+        self.frames.append(bytes(data))
+
+    def messages(self):
+        parser = mavutil.mavlink.MAVLink(None)
+        return [parser.parse_char(frame) for frame in self.frames]
+
+
+def encoder():
+    link = FakeLink()
+    return link, mavutil.mavlink.MAVLink(link, 255, 0)
+
+
+def mission_item(mav, seq):
+    return mav.mission_item_int_encode(1, 0, seq, 3, NAV_WAYPOINT, 0, 1, 0, 0, 0, 0, 1, 1, 1)
+
+
+def idle_scheduler(**kwargs):
+    """A scheduler whose sender thread has exited, so _next can be stepped by hand."""
+    _, mav = encoder()
+    scheduler = CommandScheduler(mav, **kwargs)
+    scheduler.stop()
+    return scheduler, mav
+
+
+def drain(scheduler):
+    order = []
+    while True:
+        message, _ = scheduler._next(time.monotonic())
+        if message is None:
+            return order
+        order.append(message)
+
+
+def test_higher_priority_goes_first():
+    scheduler, mav = idle_scheduler()
+    scheduler.send(1, mission_item(mav, 0), CommandScheduler.MISSION)
+    scheduler.send(2, mission_item(mav, 1), CommandScheduler.COMMAND)
+    scheduler.send(3, mission_item(mav, 2), CommandScheduler.SAFETY)
+    assert [(drone_id, priority) for drone_id, priority, _, _ in drain(scheduler)] == [
+        (3, CommandScheduler.SAFETY), (2, CommandScheduler.COMMAND), (1, CommandScheduler.MISSION)]
+
+
+def test_drones_take_turns_and_keep_their_order():
+    scheduler, mav = idle_scheduler()
+    for seq in range(3):
+        scheduler.send(1, mission_item(mav, seq))
+    scheduler.send(2, mission_item(mav, 10))
+    assert [(drone_id, msg.seq) for drone_id, _, msg, _ in drain(scheduler)] == [(1, 0), (2, 10), (1, 1), (1, 2)]
+
+
+def test_empty_bucket_holds_back_all_but_safety():
+    scheduler, mav = idle_scheduler(rate=100)
+    scheduler.send(1, mission_item(mav, 0))
+    now = time.monotonic()
+    scheduler.tokens, scheduler.refilled_at = -10, now
+    message, wait = scheduler._next(now)
+    assert message is None
+    assert wait == pytest.approx(0.1)  # 10 bytes of debt at 100 bytes per second
+
+    scheduler.send(1, mission_item(mav, 1), CommandScheduler.SAFETY)
+    message, _ = scheduler._next(now)
+    assert message[1] == CommandScheduler.SAFETY
+
+
+def test_bucket_refills_at_the_link_rate():
+    scheduler, mav = idle_scheduler(rate=100, burst=50)
+    scheduler.send(1, mission_item(mav, 0))
+    now = time.monotonic()
+    scheduler.tokens, scheduler.refilled_at = -10, now
+    message, _ = scheduler._next(now + 0.2)
+    assert message is not None
+    assert scheduler.tokens == pytest.approx(10)
+    scheduler._next(now + 10)
+    assert scheduler.tokens == 50  # never more than the burst
+
+
+def test_full_queue_drops_the_oldest_message():
+    scheduler, mav = idle_scheduler(max_queue=2)
+    for seq in range(3):
+        scheduler.send(1, mission_item(mav, seq))
+    assert scheduler.queued(1) == 2
+    assert scheduler.get_stats()["dropped"] == 1
+    assert [msg.seq for _, _, msg, _ in drain(scheduler)] == [1, 2]
+
+
+def test_command_ack_resolves_the_future():
+    link, mav = encoder()
+    scheduler = CommandScheduler(mav, ack_timeout=5)
+    try:
+        future = scheduler.send_command(1, RTL, priority=CommandScheduler.SAFETY)
+        deadline = time.monotonic() + 2
+        while not link.frames and time.monotonic() < deadline:
+            time.sleep(0.001)
+        scheduler.on_command_ack(1, RTL, mavutil.mavlink.MAV_RESULT_ACCEPTED)
+        assert future.result(timeout=1) == mavutil.mavlink.MAV_RESULT_ACCEPTED
+        assert scheduler.get_stats()["acks"] == 1
+    finally:
+        scheduler.stop()
+
+
+def test_unanswered_command_is_resent_then_times_out():
+    link, mav = encoder()
+    scheduler = CommandScheduler(mav, ack_timeout=0.05)
+    try:
+        future = scheduler.send_command(1, RTL, retries=2)
+        with pytest.raises(TimeoutError):
+            future.result(timeout=2)
+        commands = [msg for msg in link.messages() if msg.get_type() == "COMMAND_LONG"]
+        assert [msg.confirmation for msg in commands] == [0, 1, 2]
+        stats = scheduler.get_stats()
+        assert (stats["resends"], stats["ack_timeouts"], stats["pending_acks"]) == (2, 1, 0)
+    finally:
+        scheduler.stop()
@@ -0,0 +1,53 @@
+from Utils.drone_registry import DroneRegistry
+
+
+def registry_of(*drone_ids):
+    registry = DroneRegistry()
+    for drone_id in drone_ids:
+        registry.add(drone_id, f"drone {drone_id}")
+    return registry
+
+
+def test_iterates_in_id_order_whatever_the_add_order():
+    registry = registry_of(5, 1, 3)
+    assert registry.ids() == [1, 3, 5]
+    assert list(registry) == ["drone 1", "drone 3", "drone 5"]
+    assert registry.ordered() == list(registry)
+
+
+def test_lookup_by_id():
+    registry = registry_of(2, 7)
+    assert registry.get(7) == "drone 7"
+    assert registry.get(4) is None
+    assert registry.get(4, "missing") == "missing"
+    assert 2 in registry and 4 not in registry
+    assert len(registry) == 2
+
+
+def test_adding_an_existing_id_replaces_the_drone():
+    registry = registry_of(1, 2)
+    registry.add(2, "new drone 2")
+    assert registry.ids() == [1, 2]
+    assert list(registry) == ["drone 1", "new drone 2"]
+    assert registry.get(2) == "new drone 2"
+
+
+def test_remove_keeps_the_order_consistent():
+    registry = registry_of(1, 2, 3)
+    assert registry.remove(2) == "drone 2"
+    assert registry.remove(2) is None
+    assert registry.ids() == [1, 3]
+    assert list(registry) == ["drone 1", "drone 3"]
+    registry.remove(1)
+    registry.remove(3)
+    assert not registry
+
+
+def test_iteration_is_a_snapshot():
+    registry = registry_of(1, 2)
+    seen = []
+    for drone in registry:
+        seen.append(drone)
+        registry.add(len(seen) + 10, "late drone")
+    assert seen == ["drone 1", "drone 2"]
+    assert len(registry) == 4
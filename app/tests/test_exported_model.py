@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")  # exported_model letterboxes with OpenCV
+
+from ComputerVision.exported_model import decode, normalize_names, output_layout
+
+CLASSES = 80
+ANCHORS = 2000
+NO_LETTERBOX = (np.ones(1), np.zeros((1, 2)), [(640, 640)])
+
+
+def yolov5_output(objectness=0.9, class_probability=0.8, class_id=3, anchor=7):
+    """(1, anchors, 5 + classes) as written by the repository's export.py, with one box at (100, 100)."""
+    output = np.zeros((1, ANCHORS, 5 + CLASSES), dtype=np.float32)
+    output[0, anchor, :4] = (100, 100, 20, 20)
+    output[0, anchor, 4] = objectness
+    output[0, anchor, 5 + class_id] = class_probability
+    return output
+
+
+def yolov8_output(score=0.8, class_id=3, anchor=7):
+    """(1, 4 + classes, anchors) as written by the Ultralytics exporter."""
+    output = np.zeros((1, 4 + CLASSES, ANCHORS), dtype=np.float32)
+    output[0, :4, anchor] = (100, 100, 20, 20)
+    output[0, 4 + class_id, anchor] = score
+    return output
+
+
+def test_layout_follows_the_class_count():
+    assert output_layout((1, ANCHORS, 5 + CLASSES), CLASSES) == "yolov5"
+    assert output_layout((1, 4 + CLASSES, ANCHORS), CLASSES) == "yolov8"
+    assert output_layout((1, ANCHORS, 5 + CLASSES)) == "yolov5"
+    assert output_layout((1, 4 + CLASSES, ANCHORS)) == "yolov8"
+
+
+def test_mismatched_class_count_is_an_error():
+    with pytest.raises(ValueError, match="80 classes"):
+        output_layout((1, ANCHORS, 5 + 3), CLASSES)
+    with pytest.raises(ValueError):
+        decode(yolov5_output(), *NO_LETTERBOX, num_classes=10)
+
+
+def test_yolov5_output_is_scaled_by_objectness():
+    [(boxes, scores, class_ids)] = decode(yolov5_output(), *NO_LETTERBOX, num_classes=CLASSES)
+    assert class_ids.tolist() == [3]
+    assert scores == pytest.approx([0.72])
+    np.testing.assert_allclose(boxes, [[90, 90, 110, 110]])
+
+    [(boxes, _, _)] = decode(yolov5_output(objectness=0.2), *NO_LETTERBOX, num_classes=CLASSES)
+    assert len(boxes) == 0  # 0.2 * 0.8 is under the confidence threshold
+
+
+def test_yolov8_output():
+    [(boxes, scores, class_ids)] = decode(yolov8_output(), *NO_LETTERBOX, num_classes=CLASSES)
+    assert class_ids.tolist() == [3]
+    assert scores == pytest.approx([0.8])
+    np.testing.assert_allclose(boxes, [[90, 90, 110, 110]])
+
+
+def test_names_from_a_list_or_a_dict():
+    assert normalize_names(["person", "car"]) == {0: "person", 1: "car"}
+    assert normalize_names({"0": "person"}) == {0: "person"}
+    assert normalize_names(None) == {}
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from ComputerVision.inference_service import InferenceService
+
+
+class FakeModel:
+    """Doubles each image and records the batch sizes; blocks while `gate` is cleared."""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.running = threading.Event()
+
+    def __call__(self, images):
+        self.batches.append(len(images))
+        self.running.set()
+        self.gate.wait(timeout=5)
+        return [image * 2 for image in images]
+
+
+def test_lone_frame_does_not_wait_for_the_deadline():
+    model = FakeModel()
+    service = InferenceService(model, max_batch_size=4, max_latency=2.0).start()
+    try:
+        start = time.monotonic()
+        assert service.detect(21, timeout=1) == 42
+        assert time.monotonic() - start < 1.0
+        assert model.batches == [1]
+    finally:
+        service.stop()
+
+
+def test_frames_queued_behind_a_running_batch_go_together():
+    model = FakeModel()
+    service = InferenceService(model, max_batch_size=3, max_latency=2.0).start()
+    try:
+        model.gate.clear()
+        first = service.submit(1)
+        assert model.running.wait(timeout=1)
+        rest = [service.submit(n) for n in (2, 3, 4)]
+        model.gate.set()
+        assert [future.result(timeout=1) for future in [first] + rest] == [2, 4, 6, 8]
+        assert model.batches == [1, 3]
+        assert service.get_stats()["mean_batch_size"] == 2.0
+    finally:
+        service.stop()
+
+
+def test_model_error_fails_the_batch_and_the_service_carries_on():
+    calls = []
+
+    def run_batch(images):
+        calls.append(images)
+        if len(calls) == 1:
+            raise ValueError("bad frame")
+        return images
+
+    service = InferenceService(run_batch).start()
+    try:
+        with pytest.raises(ValueError):
+            service.detect(1, timeout=1)
+        assert service.detect(2, timeout=1) == 2
+    finally:
+        service.stop()
+
+
+def test_submit_after_stop_fails():
+    service = InferenceService(lambda images: images).start()
+    service.stop()
+    with pytest.raises(RuntimeError):
+        service.detect(1, timeout=1)
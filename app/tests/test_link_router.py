@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import pytest
+
+from Dispatcher.mavlink_link import LinkRouter
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.sent = []
+        self.acks = []
+
+    def send(self, drone_id, msg, priority):
+        self.sent.append((drone_id, msg))
+
+    def on_command_ack(self, drone_id, command, result):
+        self.acks.append((drone_id, command, result))
+
+
+def fake_link(name):
+    return SimpleNamespace(name=name, outbound=FakeScheduler())
+
+
+@pytest.fixture
+def router():
+    router = LinkRouter(route_timeout=3.0)
+    router.radio = fake_link("radio")
+    router.mirror = fake_link("mirror")
+    router.add(router.radio)
+    router.add(router.mirror)
+    return router
+
+
+def test_unheard_drone_goes_out_on_the_first_link(router):
+    assert router.link_for(7) is router.radio
+    router.send(7, "msg")
+    assert router.radio.outbound.sent == [(7, "msg")]
+
+
+def test_no_links_is_an_error():
+    with pytest.raises(RuntimeError):
+        LinkRouter().link_for(1)
+
+
+def test_drone_heard_on_two_links_keeps_its_first_route(router, capsys):
+    for k in range(20):
+        now = k * 0.1
+        router.route(1, router.mirror, now)
+        router.route(1, router.radio, now + 0.05)
+    assert router.link_for(1) is router.mirror
+    assert capsys.readouterr().out == ""
+
+
+def test_route_moves_once_its_link_goes_silent(router, capsys):
+    router.route(1, router.radio, 0.0)
+    router.route(1, router.radio, 1.0)
+    router.route(1, router.mirror, 2.0)
+    assert router.link_for(1) is router.radio
+    router.route(1, router.mirror, 4.5)  # radio last heard it 3.5 s ago
+    assert router.link_for(1) is router.mirror
+    router.route(1, router.mirror, 5.0)
+    router.route(1, router.radio, 5.5)  # back in radio range, but the mirror still hears it
+    assert router.link_for(1) is router.mirror
+    assert capsys.readouterr().out == "Drone 1 is now heard on mirror\n"
+
+
+def test_command_ack_reaches_every_link(router):
+    router.on_command_ack(1, 20, 0)
+    assert router.radio.outbound.acks == router.mirror.outbound.acks == [(1, 20, 0)]
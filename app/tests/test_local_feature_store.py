@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("geopandas")
+pa = pytest.importorskip("pyarrow")
+
+import geopandas as gpd
+from shapely.geometry import Point
+
+from TerrainPreProcessing.local_feature_store import LocalFeatureStore, build_local_feature_store, tag_text
+
+SEARCH_AREA = [(-1, -1), (3, -1), (3, 3), (-1, 3)]
+ALL_TAGS = {"building": True, "water": True, "highway": True}
+
+
+def test_tag_text():
+    assert tag_text("yes") == "yes"
+    assert tag_text(3) == "3"
+    assert tag_text(["a", "b"]) == "['a', 'b']"
+    for missing in (None, float("nan"), pd.NA, pd.NaT):
+        assert tag_text(missing) is None
+
+
+def test_nullable_string_columns(tmp_path):
+    frame = gpd.GeoDataFrame({
+        "building": pd.array(["yes", pd.NA, None], dtype="string"),
+        "water": pd.Series([pd.NA, "lake", pd.NA], dtype=pd.ArrowDtype(pa.string())),
+        "highway": [["primary", "secondary"], 3, float("nan")],
+    }, geometry=[Point(0, 0), Point(1, 1), Point(2, 2)], crs="EPSG:4326")
+    path = str(tmp_path / "features.parquet")
+    assert build_local_feature_store(frame, path) == 3
+
+    features = LocalFeatureStore(path).query(ALL_TAGS, SEARCH_AREA)
+    # the third feature has no tag at all, so it doesn't match
+    assert [(f["building"], f["water"], f["highway"]) for f in features] == [
+        ("yes", None, "['primary', 'secondary']"),
+        (None, "lake", "3"),
+    ]
+
+
+def test_query_keeps_only_matching_tags_inside_the_polygon(tmp_path):
+    frame = gpd.GeoDataFrame({"building": ["yes", "house", None]},
+                             geometry=[Point(0, 0), Point(10, 10), Point(1, 1)], crs="EPSG:4326")
+    path = str(tmp_path / "features.parquet")
+    build_local_feature_store(frame, path)
+    store = LocalFeatureStore(path)
+    assert [f["building"] for f in store.query({"building": True}, SEARCH_AREA)] == ["yes"]
+    assert store.query({"building": "house"}, SEARCH_AREA) == []
+    assert store.query({"amenity": True}, SEARCH_AREA) == []
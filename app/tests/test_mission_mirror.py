@@ -0,0 +1,66 @@
+from Dispatcher.mission_mirror import MissionMirror
+
+HOME = (28.6, -81.2, 10, 1)
+
+
+def waypoints(count, shift=0.0):
+    return [(28.6 + 0.001 * k + shift, -81.2, 20, 0) for k in range(count)]
+
+
+def mirror_holding(items, drone_id=1):
+    mirror = MissionMirror()
+    mirror.set(drone_id, items)
+    return mirror
+
+
+def test_unknown_drone_is_a_full_upload():
+    items = [HOME] + waypoints(3)
+    assert MissionMirror().plan(1, items) == (MissionMirror.FULL, 0, 3)
+
+
+def test_identical_single_item_mission():
+    mirror = mirror_holding([HOME])
+    assert mirror.plan(1, [HOME], partial_write=True) == (MissionMirror.SET_CURRENT, 0, 0)
+    assert mirror.plan(1, [HOME], partial_write=False) == (MissionMirror.SET_CURRENT, 0, 0)
+
+
+def test_identical_mission_resumes_from_first_waypoint():
+    items = [HOME] + waypoints(4)
+    assert mirror_holding(items).plan(1, items, partial_write=True) == (MissionMirror.SET_CURRENT, 1, 4)
+
+
+def test_tail_resume_sets_current_item():
+    items = [HOME] + waypoints(5)
+    resumed = [HOME] + items[3:]  # last waypoint reached was mission item 3
+    assert mirror_holding(items).plan(1, resumed) == (MissionMirror.SET_CURRENT, 3, 5)
+
+
+def test_single_changed_item_is_a_partial_write():
+    items = [HOME] + waypoints(5)
+    changed = list(items)
+    changed[2] = (0.0, 0.0, 20, 0)
+    assert mirror_holding(items).plan(1, changed, partial_write=True) == (MissionMirror.PARTIAL, 2, 2)
+    # without MISSION_WRITE_PARTIAL_LIST support the whole mission goes again
+    assert mirror_holding(items).plan(1, changed, partial_write=False) == (MissionMirror.FULL, 0, 5)
+
+
+def test_different_home_or_length_is_a_full_upload():
+    items = [HOME] + waypoints(3)
+    moved_home = [(28.7, -81.2, 10, 1)] + waypoints(3)
+    assert mirror_holding(items).plan(1, moved_home, partial_write=True) == (MissionMirror.FULL, 0, 3)
+    longer = [HOME] + waypoints(4, shift=0.5)
+    assert mirror_holding(items).plan(1, longer, partial_write=True) == (MissionMirror.FULL, 0, 4)
+
+
+def test_resume_after_an_interrupting_mission_is_a_full_upload():
+    search = [HOME] + waypoints(5)
+    mirror = mirror_holding([HOME, (28.65, -81.25, 20, 2)])  # the POI mission replaced the search on board
+    assert mirror.plan(1, [HOME] + search[3:]) == (MissionMirror.FULL, 0, 3)
+
+
+def test_count_mismatch_forgets_the_mission():
+    mirror = mirror_holding([HOME] + waypoints(3))
+    mirror.check_count(1, 4)
+    assert mirror.get(1) is not None
+    mirror.check_count(1, 7)
+    assert mirror.get(1) is None
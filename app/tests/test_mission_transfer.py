@@ -0,0 +1,104 @@
+import asyncio
+
+from pymavlink import mavutil
+
+from Dispatcher.mission_transfer import MissionTransfer
+
+ACCEPTED = mavutil.mavlink.MAV_MISSION_ACCEPTED
+
+
+class FakeDrone:
+    """Answers a MissionTransfer like the autopilot: request every item in turn, then ack.
+
+    Sends listed in `lose` (("count", n) or ("item", seq)) are dropped, as on a lossy link."""
+
+    def __init__(self, lose=(), ack=ACCEPTED, silent=False):
+        self.lose = list(lose)
+        self.ack = ack
+        self.silent = silent
+        self.sent = []
+        self.transfer = None
+
+    def send_count(self, count):
+        self._received(("count", count), lambda: self.transfer.on_request(self.transfer.start))
+
+    def send_item(self, seq):
+        if seq == self.transfer.count - 1:
+            self._received(("item", seq), lambda: self.transfer.on_ack(self.ack))
+        else:
+            self._received(("item", seq), lambda: self.transfer.on_request(seq + 1))
+
+    def _received(self, message, reply):
+        self.sent.append(message)
+        if message in self.lose:
+            self.lose.remove(message)
+        elif not self.silent:
+            asyncio.get_running_loop().call_soon(reply)
+
+
+def upload(drone, count, **kwargs):
+    async def run():
+        transfer = MissionTransfer(1, count, drone.send_count, drone.send_item, **kwargs)
+        drone.transfer = transfer
+        return await transfer.run(), transfer
+    return asyncio.run(run())
+
+
+def test_clean_upload_sends_every_item_once():
+    drone = FakeDrone()
+    accepted, transfer = upload(drone, 4)
+    assert accepted
+    assert drone.sent == [("count", 4), ("item", 0), ("item", 1), ("item", 2), ("item", 3)]
+    progress = transfer.get_progress()
+    assert (progress["state"], progress["items_sent"], progress["retries"]) == (MissionTransfer.ACCEPTED, 4, 0)
+
+
+def test_lost_count_is_resent():
+    drone = FakeDrone(lose=[("count", 3)])
+    accepted, transfer = upload(drone, 3, timeout=0.05)
+    assert accepted
+    assert drone.sent[:2] == [("count", 3), ("count", 3)]
+    assert transfer.retries_used == 1
+
+
+def test_lost_item_is_resent_after_a_silent_step():
+    drone = FakeDrone(lose=[("item", 1)])
+    accepted, transfer = upload(drone, 3, timeout=0.05, min_timeout=0.01)
+    assert accepted
+    assert drone.sent == [("count", 3), ("item", 0), ("item", 1), ("item", 1), ("item", 2)]
+    assert transfer.retries_used == 1
+
+
+def test_silent_drone_fails_after_the_retries():
+    drone = FakeDrone(silent=True)
+    accepted, transfer = upload(drone, 3, timeout=0.02, retries=2)
+    assert not accepted
+    assert drone.sent == [("count", 3)] * 3
+    assert transfer.state == MissionTransfer.FAILED
+    assert "after 2 retries" in transfer.error
+
+
+def test_rejected_mission_fails():
+    drone = FakeDrone(ack=mavutil.mavlink.MAV_MISSION_NO_SPACE)
+    accepted, transfer = upload(drone, 2)
+    assert not accepted
+    assert "error code" in transfer.error
+
+
+def test_partial_write_starts_at_the_first_changed_item():
+    drone = FakeDrone()
+    accepted, transfer = upload(drone, 6, start=4)
+    assert accepted
+    assert drone.sent == [("count", 6), ("item", 4), ("item", 5)]
+    assert transfer.get_progress()["items"] == 2
+
+
+def test_step_timeout_follows_the_reply_time():
+    transfer = MissionTransfer(1, 3, None, None, timeout=1.5, min_timeout=0.25)
+    assert transfer.step_timeout() == 1.5  # nothing measured yet
+    transfer.reply_time = 0.1
+    assert transfer.step_timeout() == 0.4
+    transfer.reply_time = 0.01
+    assert transfer.step_timeout() == 0.25
+    transfer.reply_time = 1.0
+    assert transfer.step_timeout() == 1.5
@@ -0,0 +1,85 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from PathPlanning.path import cell_priority_order, heuristic, search_grid_with_drones
+
+
+def tile_grid(counts, in_searcharea=None):
+    """List-of-lists grid of Tile-like cells with unit-square polygons."""
+    return [[SimpleNamespace(total_count=count, polygon=box(j, -i - 1, j + 1, -i),
+                             in_searcharea=True if in_searcharea is None else in_searcharea[i][j])
+             for j, count in enumerate(row)] for i, row in enumerate(counts)]
+
+
+def reference_assignment(grid, drone_positions, viable):
+    """The original pick-the-best-remaining-cell loop, cell by cell."""
+    assigned = {drone_id: [] for drone_id in range(len(drone_positions))}
+    remaining = list(viable)
+    while remaining:
+        for drone_id, start in enumerate(drone_positions):
+            if not remaining:
+                break
+            best = max(remaining, key=lambda x: grid[x[0]][x[1]].total_count * 10 - heuristic(start, x))
+            assigned[drone_id].append(best)
+            remaining.remove(best)
+    return assigned
+
+
+def cells_of(grid, destinations):
+    """Map centroids back to the (i, j) of the unit cells they came from."""
+    return {drone_id: [(int(-p.y), int(p.x)) for p in points] for drone_id, points in destinations.items()}
+
+
+def test_priority_order_prefers_count_then_distance_then_list_order():
+    rows = np.array([0, 0, 3, 0])
+    cols = np.array([1, 2, 3, 1])
+    counts = np.array([1.0, 1.0, 2.0, 1.0])
+    # cell 2 wins on count despite the distance; cells 0 and 3 tie and keep their list order
+    assert cell_priority_order(counts, rows, cols, (0, 0)).tolist() == [2, 0, 3, 1]
+
+
+def test_matches_the_original_assignment():
+    rng = random.Random(3)
+    size = 12
+    counts = [[rng.choice((0, 1, 1, 2, 5)) for _ in range(size)] for _ in range(size)]
+    grid = tile_grid(counts)
+    viable = [(i, j) for i in range(size) for j in range(size)]
+    drone_positions = [(rng.uniform(0, size), rng.uniform(0, size)) for _ in range(3)]
+    result = search_grid_with_drones(grid, drone_positions, list(viable))
+    assert cells_of(grid, result) == reference_assignment(grid, drone_positions, viable)
+
+
+def test_default_search_area_skips_empty_and_outside_cells():
+    counts = [[0, 1], [2, 3]]
+    inside = [[True, True], [True, False]]
+    result = search_grid_with_drones(tile_grid(counts, inside), [(0, 0)])
+    assert cells_of(None, result) == {0: [(1, 0), (0, 1)]}
+
+
+def test_no_viable_cells_gives_empty_routes():
+    result = search_grid_with_drones(tile_grid([[0, 0], [0, 0]]), [(0, 0), (1, 1)])
+    assert result == {0: [], 1: []}
+
+
+def test_columnar_grid_gives_the_same_routes():
+    pytest.importorskip("osmnx")  # geometry_utils needs it
+    from TerrainPreProcessing.geometry_utils import SearchGrid
+
+    rng = random.Random(5)
+    size = 10
+    columnar = SearchGrid(size, [], (51.5, -0.1), 10)
+    columnar.total_count[:] = np.array([[rng.choice((0, 1, 2, 5)) for _ in range(size)] for _ in range(size)])
+    grid = [[SimpleNamespace(total_count=int(columnar.total_count[i, j]), polygon=columnar.polygons[i, j],
+                             in_searcharea=True) for j in range(size)] for i in range(size)]
+    viable = columnar.viable_positions()
+    drone_positions = [(2.5, 7.5), (8.0, 1.0)]
+    expected = search_grid_with_drones(grid, drone_positions, list(viable))
+    result = search_grid_with_drones(columnar, drone_positions, list(viable))
+    assert result.keys() == expected.keys()
+    for drone_id in result:
+        assert all(p.equals_exact(q, 0) for p, q in zip(result[drone_id], expected[drone_id]))
+        assert len(result[drone_id]) == len(expected[drone_id])
@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("osmnx")  # geometry_utils needs it
+pytest.importorskip("pyarrow")  # the cache is disabled without it
+
+from shapely.geometry import Point, Polygon, box
+
+from TerrainPreProcessing.geometry_utils import FeatureIndex, SearchGrid, feature_search_tags
+from TerrainPreProcessing import terrain_queries
+from TerrainPreProcessing.terrain_cache import TerrainCache
+
+TAGS = ["building", "natural"]
+EXTREMES = {"lowest_latitude": 28.6, "leftmost_longitude": -81.2, "highest_latitude": 28.61, "rightmost_longitude": -81.19}
+
+
+def sample_entry(size=4):
+    features = [
+        {"geometry": box(0, 0, 1, 1), "building": "yes", "natural": None},
+        {"geometry": Point(2, 2), "building": None, "natural": "wood"},
+        {"geometry": Point(3, 3), "building": None, "natural": None},  # carries no search tag
+    ]
+    index = FeatureIndex()
+    index.load(features)
+    grid = SearchGrid(size, TAGS, (28.61, -81.2), 25)
+    grid.set_cell_features(np.array([0, 5, 5, 10]), np.array([0, 0, 1, 2]), feature_search_tags(features, TAGS))
+    grid.in_searcharea[0, 3] = False
+    return index, grid
+
+
+def entries(cache):
+    return sorted(os.listdir(cache.directory))
+
+
+def test_round_trip(tmp_path):
+    cache = TerrainCache(directory=str(tmp_path))
+    index, grid = sample_entry()
+    key = cache.make_key(EXTREMES, {"building": True, "natural": True}, 25, 4)
+    cache.store(key, index, grid)
+
+    loaded_index, loaded_grid = cache.load(key)
+    assert len(loaded_index) == len(index)
+    assert loaded_index.features[0]["building"] == "yes"
+    assert loaded_index.features[0]["geometry"].equals(box(0, 0, 1, 1))
+    assert loaded_grid.search_tags == TAGS
+    assert loaded_grid.top_left == (28.61, -81.2)
+    assert loaded_grid.square_size == 25
+    for name, array in grid.to_arrays().items():
+        np.testing.assert_array_equal(loaded_grid.to_arrays()[name], array)
+    assert loaded_grid.cell_contains(1, 1) == {"building": ["yes"], "natural": ["wood"]}
+    assert cache.get_stats() == {"hits": 1, "misses": 0}
+
+
+def test_miss_and_unreadable_entry(tmp_path):
+    cache = TerrainCache(directory=str(tmp_path))
+    assert cache.load("absent") is None
+    os.makedirs(tmp_path / "broken")
+    assert cache.load("broken") is None
+    assert not (tmp_path / "broken").exists()  # discarded, so the next fetch rewrites it
+    assert cache.get_stats() == {"hits": 0, "misses": 2}
+
+
+def test_key_rounds_the_bounding_box(tmp_path):
+    cache = TerrainCache(directory=str(tmp_path))
+    tags = {"building": True}
+    nudged = dict(EXTREMES, lowest_latitude=EXTREMES["lowest_latitude"] + 1e-7)
+    assert cache.make_key(EXTREMES, tags, 25, 4) == cache.make_key(nudged, tags, 25, 4)
+    moved = dict(EXTREMES, lowest_latitude=EXTREMES["lowest_latitude"] + 1e-3)
+    assert cache.make_key(EXTREMES, tags, 25, 4) != cache.make_key(moved, tags, 25, 4)
+    assert cache.make_key(EXTREMES, tags, 25, 4) != cache.make_key(EXTREMES, {"natural": True}, 25, 4)
+    assert cache.make_key(EXTREMES, tags, 25, 4) != cache.make_key(EXTREMES, tags, 25, 4, server_side_geometry=True)
+    assert cache.make_key(EXTREMES, tags, 25, 4, feature_source="auto:osmnx") != cache.make_key(EXTREMES, tags, 25, 4, feature_source="postgis:postgis")
+
+
+# two triangles splitting the same bbox, as (lat, lon) like the GUI's polygon points
+LOWER_LEFT = [(28.600, -81.200), (28.602, -81.200), (28.600, -81.198)]
+UPPER_RIGHT = [(28.602, -81.200), (28.602, -81.198), (28.600, -81.198)]
+SOUTH_WEST_BUILDING = {"geometry": Point(-81.1998, 28.6002), "building": "yes"}
+NORTH_EAST_BUILDING = {"geometry": Point(-81.1982, 28.6018), "building": "yes"}
+
+
+def test_key_covers_the_polygon_not_just_its_bbox(tmp_path):
+    cache = TerrainCache(directory=str(tmp_path))
+    extremes = terrain_queries.find_extreme_coordinates(LOWER_LEFT)
+    assert extremes == terrain_queries.find_extreme_coordinates(UPPER_RIGHT)
+    tags = {"building": True}
+    assert (cache.make_key(extremes, tags, 25, 4, polygon_points=LOWER_LEFT)
+            != cache.make_key(extremes, tags, 25, 4, polygon_points=UPPER_RIGHT))
+    nudged = [(lat + 1e-7, lon) for lat, lon in LOWER_LEFT]
+    assert cache.make_key(extremes, tags, 25, 4, polygon_points=LOWER_LEFT) == cache.make_key(extremes, tags, 25, 4, polygon_points=nudged)
+
+
+def test_polygons_sharing_a_bbox_get_their_own_features(tmp_path, monkeypatch):
+    cache = TerrainCache(directory=str(tmp_path))
+    fetches = []
+
+    def get_features(rtree_index, useOSMNX, osmnx_points, postGIS_points, search_tags, **kwargs):
+        # like PostGIS: only the features intersecting the exact polygon
+        area = Polygon(postGIS_points)
+        fetches.append(postGIS_points)
+        rtree_index.load([f for f in (SOUTH_WEST_BUILDING, NORTH_EAST_BUILDING) if f["geometry"].intersects(area)])
+        return True
+
+    monkeypatch.setattr(terrain_queries, "get_features", get_features)
+    monkeypatch.setattr(terrain_queries, "get_terrain_cache", lambda: cache)
+
+    def features_for(polygon):
+        rtree_index, grid, _ = terrain_queries.create_search_area(polygon, {"building": True}, maximum_square_size=60, minimum_grid_size=4)
+        return [f["geometry"] for f in rtree_index.features], int(grid.total_count.sum())
+
+    assert features_for(LOWER_LEFT) == ([SOUTH_WEST_BUILDING["geometry"]], 1)
+    assert features_for(UPPER_RIGHT) == ([NORTH_EAST_BUILDING["geometry"]], 1)
+    assert len(fetches) == 2
+    assert features_for(LOWER_LEFT) == ([SOUTH_WEST_BUILDING["geometry"]], 1)
+    assert len(fetches) == 2  # answered from the cache
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TerrainCache(directory=str(tmp_path))
+    index, grid = sample_entry()
+    for key in ("a", "b", "c"):
+        cache.store(key, index, grid)
+    for age, key in enumerate(("a", "b", "c")):
+        os.utime(tmp_path / key, (1000 + age, 1000 + age))
+    entry_size = sum(os.path.getsize(tmp_path / "a" / name) for name in os.listdir(tmp_path / "a"))
+    cache.max_bytes = int(2.5 * entry_size)
+
+    cache._evict()
+    assert entries(cache) == ["b", "c"]
+
+    assert cache.load("b") is not None  # now the most recently used
+    cache.store("d", index, grid)
+    assert entries(cache) == ["b", "d"]
+
+
+def test_new_entry_is_kept_even_if_it_alone_is_too_big(tmp_path):
+    cache = TerrainCache(directory=str(tmp_path), max_bytes=1)
+    index, grid = sample_entry()
+    cache.store("a", index, grid)
+    cache.store("b", index, grid)
+    assert entries(cache) == ["b"]
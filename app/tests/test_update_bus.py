@@ -0,0 +1,59 @@
+from GUI.update_bus import GuiUpdateBus
+
+
+class FakeWidget:
+    """Stands in for the Tk root: after() callbacks are only run when the test flushes."""
+
+    def after(self, ms, callback):
+        return "tick"
+
+    def after_cancel(self, after_id):
+        pass
+
+
+def running_bus():
+    bus = GuiUpdateBus(FakeWidget())
+    bus.start()
+    return bus
+
+
+def test_posts_for_the_same_field_are_coalesced():
+    bus = running_bus()
+    seen = []
+    bus.register("position", lambda drone_id, lat: seen.append((drone_id, lat)))
+    bus.post(1, "position", 10)
+    bus.post(1, "position", 11)
+    bus.post(2, "position", 20)
+    bus.flush()
+    assert seen == [(1, 11), (2, 20)]
+    assert bus.get_stats()["coalesced"] == 1
+
+
+def test_calls_run_in_order_and_are_never_coalesced():
+    bus = running_bus()
+    seen = []
+    bus.call(seen.append, "first POI")
+    bus.call(seen.append, "second POI")
+    assert seen == []  # nothing runs until the Tk thread flushes
+    bus.flush()
+    assert seen == ["first POI", "second POI"]
+
+
+def test_failing_call_does_not_stop_the_rest():
+    bus = running_bus()
+    seen = []
+
+    def fail():
+        raise RuntimeError("widget gone")
+
+    bus.call(fail)
+    bus.call(seen.append, "after")
+    bus.flush()
+    assert seen == ["after"]
+    assert bus.get_stats()["dropped"] == 1
+
+
+def test_stopped_bus_drops_calls():
+    bus = GuiUpdateBus(FakeWidget())
+    assert bus.call(print, "never") is False
+    assert bus.get_stats()["dropped"] == 1